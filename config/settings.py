@@ -67,6 +67,9 @@ def get_atmquant_settings() -> Dict[str, Any]:
         "database.port": int(os.getenv("DATABASE_PORT", "0")),
         "database.user": os.getenv("DATABASE_USER", ""),
         "database.password": os.getenv("DATABASE_PASSWORD", ""),
+        "database.partition": os.getenv("DATABASE_PARTITION", ""),
+        "database.pool_size": int(os.getenv("DATABASE_POOL_SIZE", "0")),
+        "database.cache": os.getenv("DATABASE_CACHE", "false").lower() == "true",
     }
     
     return settings
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+因子数据集按时间区间查询性能测试
+对比过滤加排序与二分查找切片两种方式
+"""
+
+import sys
+import time
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from vnpy.alpha.dataset.template import query_by_time, sort_by_time
+from vnpy.alpha.dataset.utility import to_datetime
+
+
+def filter_by_time(df: pl.DataFrame, start: str, end: str) -> pl.DataFrame:
+    """过滤加排序的查询方式"""
+    df = df.filter(pl.col("datetime") >= to_datetime(start))
+    df = df.filter(pl.col("datetime") <= to_datetime(end))
+    return df.sort(["datetime", "vt_symbol"])
+
+
+def benchmark_query(symbol_count: int = 4000, day_count: int = 1000, column_count: int = 20, repeat: int = 10) -> None:
+    """测试数据集区间查询耗时"""
+    datetimes: pl.Series = pl.datetime_range(
+        datetime(2018, 1, 1), datetime(2022, 12, 31), "1d", eager=True
+    )[:day_count]
+    vt_symbols: list[str] = [f"{i:06d}.SSE" for i in range(symbol_count)]
+    row_count: int = symbol_count * day_count
+
+    df: pl.DataFrame = pl.DataFrame({
+        "datetime": np.repeat(datetimes.to_numpy(), symbol_count),
+        "vt_symbol": np.tile(vt_symbols, day_count),
+        **{f"feature_{i}": np.random.rand(row_count).astype(np.float32) for i in range(column_count)}
+    })
+
+    periods: list[tuple[str, str]] = [
+        ("2018-01-01", "2019-12-31"),
+        ("2020-01-01", "2020-06-30"),
+        ("2020-07-01", "2020-09-26")
+    ]
+
+    print(f"数据规模: {row_count}行, {column_count}个特征")
+    print("=" * 60)
+
+    start: float = time.time()
+    df = sort_by_time(df)
+    print(f"初始排序耗时: {time.time() - start:.3f}秒")
+
+    for name, func in [("过滤加排序", filter_by_time), ("二分查找切片", query_by_time)]:
+        start = time.time()
+
+        for _ in range(repeat):
+            for period in periods:
+                func(df, *period)
+
+        print(f"{name}: {repeat * len(periods)}次查询耗时{time.time() - start:.3f}秒")
+
+
+if __name__ == "__main__":
+    benchmark_query()
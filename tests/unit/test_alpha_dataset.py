@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+因子数据集单元测试
+"""
+
+import pickle
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+# 因子模块依赖alphalens
+pytest.importorskip("alphalens")
+
+from vnpy.alpha.dataset import (                                                          # noqa: E402
+    AlphaDataset,
+    Segment,
+    process_fill_na,
+    process_robust_zscore_norm
+)
+from vnpy.alpha.dataset.template import (                                                 # noqa: E402
+    filter_by_ranges,
+    merge_ranges,
+    query_by_time,
+    sort_by_time
+)
+from vnpy.alpha.lab import AlphaLab                                                      # noqa: E402
+
+
+FEATURES: dict[str, str] = {
+    "kmid": "(close - open) / open",
+    "ma_5": "ts_mean(close, 5) / close",
+    "std_10": "ts_std(close, 10) / close",
+    "rank_corr": "cs_rank(ts_corr(close, volume, 10))",
+    "nested": "ts_mean(cs_rank(close / ts_delay(close, 5)), 10)",
+    "rsi": "ta_rsi(close, 5)",
+    "atr_rank": "cs_rank(ta_atr(high, low, close, 5) / close)",
+}
+
+
+def create_data(symbol_count: int = 6, day_count: int = 120) -> pl.DataFrame:
+    """创建按时间和合约排序的日线数据"""
+    rng: np.random.Generator = np.random.default_rng(3)
+    rows: int = symbol_count * day_count
+
+    close: np.ndarray = 10 + np.abs(np.cumsum(rng.normal(0, 0.2, (symbol_count, day_count)), axis=1))
+    close = close.T.ravel()
+
+    dts: np.ndarray = np.datetime64("2024-01-01", "us") + np.arange(day_count).astype("timedelta64[D]")
+
+    return pl.DataFrame({
+        "datetime": np.repeat(dts, symbol_count),
+        "vt_symbol": [f"{i:06d}.SSE" for i in range(symbol_count)] * day_count,
+        "open": close * (1 + rng.normal(0, 0.01, rows)),
+        "high": close * (1 + np.abs(rng.normal(0, 0.02, rows))),
+        "low": close * (1 - np.abs(rng.normal(0, 0.02, rows))),
+        "close": close,
+        "volume": rng.integers(100, 10000, rows).astype(float),
+    })
+
+
+def create_dataset(df: pl.DataFrame) -> AlphaDataset:
+    """创建测试用因子数据集"""
+    dataset: AlphaDataset = AlphaDataset(
+        df,
+        train_period=("2024-01-01", "2024-02-29"),
+        valid_period=("2024-03-01", "2024-03-31"),
+        test_period=("2024-04-01", "2024-04-29")
+    )
+
+    for name, expression in FEATURES.items():
+        dataset.add_feature(name, expression)
+    dataset.set_label("ts_delay(close, -3) / ts_delay(close, -1) - 1")
+
+    dataset.add_processor("infer", partial(
+        process_robust_zscore_norm,
+        fit_start_time="2024-01-01",
+        fit_end_time="2024-02-29",
+        clip_outlier=True
+    ))
+    dataset.add_processor("infer", partial(process_fill_na, fill_value=0))
+
+    return dataset
+
+
+def assert_frame_close(left: pl.DataFrame, right: pl.DataFrame) -> None:
+    """比较数据表的数值，空值和NaN视为相等"""
+    assert left.columns == right.columns
+    assert left.select("datetime", "vt_symbol").equals(right.select("datetime", "vt_symbol"))
+
+    for name in left.columns[2:]:
+        np.testing.assert_allclose(
+            left[name].cast(pl.Float64).fill_null(np.nan).to_numpy(),
+            right[name].cast(pl.Float64).fill_null(np.nan).to_numpy(),
+            rtol=1e-6,
+            atol=1e-9,
+            equal_nan=True,
+            err_msg=name
+        )
+
+
+def test_append_data():
+    """测试逐日追加数据的结果与全部数据重新计算的结果一致"""
+    df: pl.DataFrame = create_data()
+    dates: list = df["datetime"].unique().sort().to_list()
+    split = dates[100]
+
+    full: AlphaDataset = create_dataset(df)
+    full.prepare_data()
+
+    dataset: AlphaDataset = create_dataset(df.filter(pl.col("datetime") < split))
+    dataset.prepare_data()
+
+    appended: list[pl.DataFrame] = []
+    for dt in dates[100:]:
+        appended.append(dataset.append_data(df.filter(pl.col("datetime") == dt)))
+
+    # 未来收益标签在追加时无法计算
+    columns: list[str] = ["datetime", "vt_symbol", *FEATURES]
+
+    expected: pl.DataFrame = full.infer_df.filter(pl.col("datetime") >= split)
+    assert_frame_close(pl.concat(appended).select(columns), expected.select(columns))
+
+    for name in ["raw_df", "infer_df"]:
+        result: pl.DataFrame = getattr(dataset, name).filter(pl.col("datetime") >= split)
+        expected = getattr(full, name).filter(pl.col("datetime") >= split)
+        assert_frame_close(result.select(columns), expected.select(columns))
+
+    assert dataset.df.height == df.height
+
+
+def test_append_existing_data():
+    """测试重复追加已有时间的数据不做处理"""
+    df: pl.DataFrame = create_data(symbol_count=3, day_count=40)
+
+    dataset: AlphaDataset = create_dataset(df)
+    dataset.prepare_data()
+
+    result: pl.DataFrame = dataset.append_data(df.tail(3))
+
+    assert result.is_empty()
+    assert dataset.df.height == df.height
+
+
+def test_prepare_data_in_pool():
+    """测试多进程计算与单进程计算的结果完全一致"""
+    df: pl.DataFrame = create_data(symbol_count=4, day_count=60)
+
+    datasets: list[AlphaDataset] = []
+    for max_workers in [1, 2]:
+        dataset: AlphaDataset = create_dataset(df)
+        dataset.add_feature("expr", pl.col("close").rolling_mean(5).over("vt_symbol") / pl.col("close"))
+        dataset.prepare_data(max_workers=max_workers)
+        datasets.append(dataset)
+
+    single, pooled = datasets
+
+    for name in ["result_df", "raw_df", "infer_df", "learn_df"]:
+        assert getattr(pooled, name).equals(getattr(single, name)), name
+
+
+def filter_by_loop(df: pl.DataFrame, filters: dict[str, list[tuple[datetime, datetime]]]) -> pl.DataFrame:
+    """逐个合约和时间范围筛选后合并，与改为asof join之前的筛选方式相同"""
+    filtered_df: pl.DataFrame = df.clear()
+
+    for vt_symbol, ranges in filters.items():
+        for start, end in ranges:
+            temp_df: pl.DataFrame = df.filter(
+                (pl.col("vt_symbol") == vt_symbol) & (pl.col("datetime") >= pl.lit(start)) & (pl.col("datetime") <= pl.lit(end))
+            )
+            filtered_df = pl.concat([filtered_df, temp_df])
+
+    # 时间范围重叠时原有方式会产生重复数据
+    return filtered_df.unique(maintain_order=True)
+
+
+def test_merge_ranges():
+    """测试合并重叠和相接的时间范围"""
+    d: list[datetime] = [datetime(2024, 1, i) for i in range(1, 11)]
+
+    assert merge_ranges([(d[5], d[7]), (d[0], d[2]), (d[2], d[3]), (d[6], d[9])]) == [(d[0], d[3]), (d[5], d[9])]
+    assert merge_ranges([(d[0], d[9]), (d[2], d[3])]) == [(d[0], d[9])]
+    assert merge_ranges([(d[0], d[1]), (d[2], d[3])]) == [(d[0], d[1]), (d[2], d[3])]
+    assert merge_ranges([("2024-01-03", "2024-01-05"), (d[0], d[2])]) == [(d[0], d[4])]
+    assert merge_ranges([]) == []
+
+
+def test_filter_by_ranges():
+    """测试按合约时间范围筛选的结果与逐个筛选合并的结果一致"""
+    df: pl.DataFrame = create_data(symbol_count=6, day_count=40)
+    symbols: list[str] = df["vt_symbol"].unique().sort().to_list()
+    d: list[datetime] = [datetime(2024, 1, i) for i in range(1, 32)]
+
+    filters: dict[str, list[tuple[datetime, datetime]]] = {
+        # 重叠的时间范围
+        symbols[0]: [(d[2], d[10]), (d[5], d[15]), (d[20], d[25])],
+        # 相接的时间范围，以及只包含一天的范围
+        symbols[1]: [(d[0], d[4]), (d[4], d[8]), (d[9], d[9])],
+        # 超出数据时间的范围
+        symbols[2]: [(datetime(2023, 12, 1), d[3]), (d[30], datetime(2024, 6, 1))],
+        # 没有时间范围的合约
+        symbols[3]: [],
+        # 不在数据中的合约
+        "999999.SSE": [(d[0], d[30])],
+        # 乱序的时间范围
+        symbols[4]: [(d[25], d[28]), (d[1], d[3])],
+    }
+
+    result: pl.DataFrame = filter_by_ranges(df, filters)
+    expected: pl.DataFrame = filter_by_loop(df, filters)
+
+    assert result.columns == df.columns
+    assert sort_by_time(result).equals(sort_by_time(expected))
+
+    # 范围边界的数据都被保留
+    rows: pl.DataFrame = result.filter(pl.col("vt_symbol") == symbols[1])
+    assert rows["datetime"].to_list() == d[:10]
+
+    assert result.filter(pl.col("vt_symbol").is_in([symbols[3], symbols[5]])).is_empty()
+
+
+def test_filter_by_ranges_empty():
+    """测试没有数据符合时间范围时返回保留数据列的空表"""
+    df: pl.DataFrame = create_data(symbol_count=2, day_count=10)
+
+    result: pl.DataFrame = filter_by_ranges(df, {"000000.SSE": [(datetime(2025, 1, 1), datetime(2025, 2, 1))]})
+    assert result.is_empty()
+    assert result.schema == df.schema
+
+    assert filter_by_ranges(df, {}).is_empty()
+
+
+def test_lab_prepare_dataset(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """测试通过研究实验室准备数据集时使用特征缓存，只计算新增的因子"""
+    lab: AlphaLab = AlphaLab(str(tmp_path))
+    df: pl.DataFrame = create_data(symbol_count=3, day_count=40)
+
+    first: AlphaDataset = create_dataset(df)
+    lab.prepare_dataset(first)
+
+    calculated: list[str] = []
+    calculate_expressions = AlphaDataset.calculate_expressions
+
+    def record_expressions(
+        self: AlphaDataset,
+        df: pl.DataFrame,
+        expressions: list,
+        max_workers: int | None = None
+    ) -> pl.DataFrame:
+        calculated.extend(name for name, _ in expressions)
+        return calculate_expressions(self, df, expressions, max_workers)
+
+    monkeypatch.setattr(AlphaDataset, "calculate_expressions", record_expressions)
+
+    second: AlphaDataset = create_dataset(df)
+    lab.prepare_dataset(second)
+
+    assert not calculated
+    assert second.infer_df.equals(first.infer_df)
+
+    third: AlphaDataset = create_dataset(df)
+    third.add_feature("ma_3", "ts_mean(close, 3) / close")
+    lab.prepare_dataset(third)
+
+    assert calculated == ["ma_3"]
+
+
+@pytest.mark.parametrize(("start", "end"), [
+    ("2024-01-10", "2024-01-20"),
+    ("2024-01-10", ""),
+    ("", "2024-01-20"),
+    ("", ""),
+    ("2025-01-01", ""),
+])
+def test_query_by_time(start: str, end: str):
+    """测试未排序的数据表按时间范围查询的结果与排序后的数据表一致"""
+    df: pl.DataFrame = create_data(symbol_count=4, day_count=30)
+
+    expected: pl.DataFrame = query_by_time(sort_by_time(df), start, end)
+
+    # 按合约排序、乱序和未标记排序的数据表
+    for unsorted in [
+        df.sort(["vt_symbol", "datetime"]),
+        df.sample(fraction=1, shuffle=True, seed=1),
+        df
+    ]:
+        assert not unsorted["datetime"].flags["SORTED_ASC"]
+        assert query_by_time(unsorted, start, end).equals(expected)
+
+
+def test_load_unsorted_dataset(tmp_path: Path):
+    """测试加载排序前保存的数据集时重新排序"""
+    df: pl.DataFrame = create_data(symbol_count=3, day_count=40)
+
+    dataset: AlphaDataset = create_dataset(df)
+    dataset.prepare_data()
+    expected: pl.DataFrame = dataset.fetch_infer(Segment.TEST)
+
+    dataset.infer_df = dataset.infer_df.sort(["vt_symbol", "datetime"])
+
+    lab: AlphaLab = AlphaLab(str(tmp_path))
+    with open(lab.dataset_path.joinpath("old.pkl"), mode="wb") as f:
+        pickle.dump(dataset, f)
+
+    loaded: AlphaDataset | None = lab.load_dataset("old")
+    assert loaded is not None
+    assert loaded.infer_df["datetime"].flags["SORTED_ASC"]
+    assert loaded.fetch_infer(Segment.TEST).equals(expected)
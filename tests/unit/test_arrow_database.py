@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Arrow文件数据库单元测试
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarBatch, TickBatch
+from vnpy_arrow import arrow_database
+from vnpy_arrow.arrow_database import ArrowDatabase, STAGE_SUFFIX, convert_batch_datetime, write_columns
+
+
+def create_batch(start: str, count: int, close: float = 0, step: str = "m") -> BarBatch:
+    """创建测试用K线数据"""
+    dts: np.ndarray = np.datetime64(start, "us") + np.arange(count).astype(f"timedelta64[{step}]")
+    return BarBatch(
+        "rb2501",
+        Exchange.SHFE,
+        dts,
+        interval=Interval.MINUTE,
+        close_price=np.arange(count) + close
+    )
+
+
+def load_batch(database: ArrowDatabase, start: datetime, end: datetime) -> BarBatch:
+    """读取测试用K线数据"""
+    return database.load_bar_batch("rb2501", Exchange.SHFE, Interval.MINUTE, start, end)
+
+
+def get_folder(database: ArrowDatabase) -> Path:
+    """获取测试用K线数据文件夹"""
+    return database.get_bar_folder("rb2501", Exchange.SHFE, Interval.MINUTE)
+
+
+def test_load_range(tmp_path: Path):
+    """测试按月份写入后跨月份读取时间范围内的数据"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    database.save_bar_batch(create_batch("2024-01-30", 5, step="D"))
+
+    assert sorted(p.name for p in get_folder(database).iterdir()) == ["202401.arrow", "202402.arrow"]
+
+    batch: BarBatch = load_batch(database, datetime(2024, 1, 31), datetime(2024, 2, 2))
+    assert batch.datetime.tolist() == [datetime(2024, 1, 31), datetime(2024, 2, 1), datetime(2024, 2, 2)]
+    assert batch.close_price.tolist() == [1, 2, 3]
+
+    assert not len(load_batch(database, datetime(2024, 3, 1), datetime(2024, 3, 31)))
+
+    # 时间范围在两条数据之间
+    assert not len(load_batch(database, datetime(2024, 1, 31, 1), datetime(2024, 1, 31, 2)))
+
+
+def test_save_overwrite(tmp_path: Path):
+    """测试重复时间的数据被新数据覆盖，汇总数据量只统计新增数据"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    database.save_bar_batch(create_batch("2024-01-02T09:00", 10))
+    database.save_bar_batch(create_batch("2024-01-02T09:05", 10, close=100))
+
+    batch: BarBatch = load_batch(database, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert len(batch) == 15
+    assert batch.close_price.tolist() == list(range(5)) + list(range(100, 110))
+
+    overview, = database.get_bar_overview()
+    assert overview.count == 15
+    assert overview.start == datetime(2024, 1, 2, 9, 0)
+    assert overview.end == datetime(2024, 1, 2, 9, 14)
+
+
+def test_stream_stage(tmp_path: Path):
+    """测试流式写入只追加暂存文件，读取时合并到数据文件"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    database.save_bar_batch(create_batch("2024-01-02T09:00", 10))
+
+    path: Path = get_folder(database).joinpath("202401.arrow")
+    stage_path: Path = path.with_suffix(STAGE_SUFFIX)
+    mtime: int = path.stat().st_mtime_ns
+
+    for i in range(5):
+        database.save_bar_batch(create_batch(f"2024-01-02T09:{8 + i * 2:02d}", 2, close=100 + i * 2), stream=True)
+
+    # 数据文件未被重写
+    assert path.stat().st_mtime_ns == mtime
+    assert stage_path.exists()
+
+    overview, = database.get_bar_overview()
+    assert overview.count == 20
+
+    batch: BarBatch = load_batch(database, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert len(batch) == 18
+    assert batch.close_price.tolist() == list(range(8)) + [100 + i for i in range(10)]
+
+    # 合并后删除暂存文件并修正汇总数据量
+    assert not stage_path.exists()
+    assert overview.count == 18
+
+
+def test_stream_truncated_stage(tmp_path: Path):
+    """测试暂存文件末尾不完整的记录批次被忽略"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    database.save_bar_batch(create_batch("2024-01-02T09:00", 5), stream=True)
+    database.save_bar_batch(create_batch("2024-01-02T09:05", 5, close=5), stream=True)
+
+    stage_path: Path = get_folder(database).joinpath("202401" + STAGE_SUFFIX)
+    data: bytes = stage_path.read_bytes()
+    stage_path.write_bytes(data[:-10])
+
+    batch: BarBatch = load_batch(database, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert batch.close_price.tolist() == list(range(5))
+
+
+def test_stream_tick_metadata(tmp_path: Path):
+    """测试流式写入的TICK数据保留合约名称"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+
+    dts: np.ndarray = np.datetime64("2024-01-02T09:00", "us") + np.arange(3).astype("timedelta64[s]")
+    batch: TickBatch = TickBatch("rb2501", Exchange.SHFE, dts, name="螺纹钢2501", last_price=[1, 2, 3])
+    database.save_tick_batch(batch, stream=True)
+
+    loaded: TickBatch = database.load_tick_batch("rb2501", Exchange.SHFE, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert loaded.meta["name"] == "螺纹钢2501"
+    assert loaded.last_price.tolist() == [1, 2, 3]
+
+
+def test_tick_localtime(tmp_path: Path):
+    """测试TICK数据的本地时间，早期写入的数据文件中没有本地时间列"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    folder: Path = database.get_tick_folder("rb2501", Exchange.SHFE)
+    folder.mkdir(parents=True)
+
+    dts: np.ndarray = np.datetime64("2024-01-02T09:00", "us") + np.arange(3).astype("timedelta64[s]")
+    write_columns(folder.joinpath("202401.arrow"), {"datetime": dts, "last_price": np.arange(3.0)}, {})
+
+    localtime: np.ndarray = dts + np.timedelta64(100, "ms")
+    localtime[1] = np.datetime64("NaT")
+    database.save_tick_batch(TickBatch("rb2501", Exchange.SHFE, dts[1:] + np.timedelta64(1, "s"), localtime=localtime[1:]))
+
+    loaded: TickBatch = database.load_tick_batch("rb2501", Exchange.SHFE, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert len(loaded) == 4
+    assert loaded.localtime[:3].tolist() == [None, None, None]
+    assert loaded.localtime[3] == localtime[2]
+    assert loaded.to_ticks()[3].localtime == datetime(2024, 1, 2, 9, 0, 2, 100000)
+
+
+def test_delete_and_init_overview(tmp_path: Path):
+    """测试删除数据时统计暂存数据，以及汇总文件缺失时扫描数据文件重建"""
+    database: ArrowDatabase = ArrowDatabase(tmp_path)
+    database.save_bar_batch(create_batch("2024-01-31T23:50", 20))
+    database.save_bar_batch(create_batch("2024-02-01T00:05", 10, close=100), stream=True)
+
+    database.bar_overview_path.unlink()
+    database = ArrowDatabase(tmp_path)
+
+    overview, = database.get_bar_overview()
+    assert overview.count == 25
+    assert overview.start == datetime(2024, 1, 31, 23, 50)
+    assert overview.end == datetime(2024, 2, 1, 0, 14)
+
+    database.save_bar_batch(create_batch("2024-02-01T00:15", 5), stream=True)
+    assert database.delete_bar_data("rb2501", Exchange.SHFE, Interval.MINUTE) == 30
+    assert not database.get_bar_overview()
+    assert not get_folder(database).exists()
+
+
+@pytest.mark.parametrize("tz", [
+    ZoneInfo("America/New_York"),
+    ZoneInfo("Australia/Lord_Howe"),
+    timezone(timedelta(hours=8)),
+])
+def test_convert_batch_datetime(monkeypatch: pytest.MonkeyPatch, tz):
+    """测试整列转换时区与逐条转换结果一致，包括夏令时切换时段"""
+    monkeypatch.setattr(arrow_database, "DB_TZ", ZoneInfo("Europe/London"))
+
+    dts: np.ndarray = np.arange(
+        np.datetime64("2024-03-01"), np.datetime64("2024-12-01"), np.timedelta64(17, "m")
+    ).astype("datetime64[us]")
+
+    batch: BarBatch = BarBatch("rb2501", Exchange.SHFE, dts, "DB", tz)
+
+    expected: list[datetime] = [
+        dt.replace(tzinfo=tz).astimezone(ZoneInfo("Europe/London")).replace(tzinfo=None)
+        for dt in dts.tolist()
+    ]
+    assert convert_batch_datetime(batch).tolist() == expected
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+K线合成引擎单元测试
+"""
+
+from datetime import datetime, time, timedelta
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.engine import BarEngine, get_bar_event_type
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import TickData, BarData
+
+
+class RecordingEventEngine(EventEngine):
+    """记录推送事件的事件引擎"""
+
+    def __init__(self) -> None:
+        """"""
+        super().__init__()
+
+        self.events: list[Event] = []
+
+    def put(self, event: Event) -> None:
+        """记录事件并直接分发"""
+        self.events.append(event)
+        self._process(event)
+
+
+def create_engine() -> tuple[BarEngine, RecordingEventEngine]:
+    """创建K线合成引擎"""
+    event_engine: RecordingEventEngine = RecordingEventEngine()
+    bar_engine: BarEngine = BarEngine(None, event_engine)        # type: ignore
+    return bar_engine, event_engine
+
+
+def put_ticks(event_engine: EventEngine, vt_symbol: str, minutes: int) -> None:
+    """推送每30秒一个的Tick数据"""
+    symbol, exchange = vt_symbol.split(".")
+    start: datetime = datetime(2025, 1, 2, 9, 0)
+
+    for i in range(minutes * 2 + 1):
+        tick: TickData = TickData(
+            symbol=symbol,
+            exchange=Exchange(exchange),
+            datetime=start + timedelta(seconds=30 * i),
+            last_price=3000 + i,
+            volume=i * 10,
+            gateway_name="TEST"
+        )
+        event_engine.put(Event(EVENT_TICK, tick))
+
+
+def get_bar_events(event_engine: RecordingEventEngine, event_type: str) -> list[Event]:
+    """获取指定类型的K线事件"""
+    return [e for e in event_engine.events if e.type == event_type]
+
+
+def test_subscribe_dedup():
+    """测试相同订阅只合成一次K线"""
+    bar_engine, event_engine = create_engine()
+
+    type1: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+    type2: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+    type3: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE, time(15, 0))
+
+    # 非日线的收盘时间不影响K线合成
+    assert type1 == type2 == type3
+    assert len(bar_engine.minute_generators) == 1
+    assert len(bar_engine.window_generators["rb2501.SHFE"]) == 1
+
+    put_ticks(event_engine, "rb2501.SHFE", 11)
+
+    assert len(get_bar_events(event_engine, get_bar_event_type("rb2501.SHFE"))) == 11
+    assert len(get_bar_events(event_engine, type1)) == 2
+
+
+def test_daily_end_event_type():
+    """测试不同日线收盘时间的订阅使用不同的事件类型"""
+    bar_engine, _ = create_engine()
+
+    type1: str = bar_engine.subscribe_bar("rb2501.SHFE", 1, Interval.DAILY, time(15, 0))
+    type2: str = bar_engine.subscribe_bar("rb2501.SHFE", 1, Interval.DAILY, time(23, 0))
+
+    assert type1 != type2
+    assert len(bar_engine.window_generators["rb2501.SHFE"]) == 2
+
+
+def test_subscribe_fan_out():
+    """测试同一K线事件推送给所有订阅者"""
+    bar_engine, event_engine = create_engine()
+
+    event_type: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+    bar_engine.subscribe_bar("hc2501.SHFE", 5, Interval.MINUTE)
+
+    received1: list[BarData] = []
+    received2: list[BarData] = []
+    event_engine.register(event_type, lambda event: received1.append(event.data))
+    event_engine.register(event_type, lambda event: received2.append(event.data))
+
+    put_ticks(event_engine, "rb2501.SHFE", 11)
+    put_ticks(event_engine, "hc2501.SHFE", 11)
+
+    assert len(received1) == 2
+    assert received1 == received2
+    assert all(bar.vt_symbol == "rb2501.SHFE" for bar in received1)
+    assert received1[0].datetime == datetime(2025, 1, 2, 9, 0)
+    assert received1[0].open_price == 3000
+    assert received1[0].high_price == 3009
+
+
+def test_unsubscribe():
+    """测试取消订阅后停止合成K线"""
+    bar_engine, event_engine = create_engine()
+
+    event_type: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+    bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+
+    # 仍有订阅时继续合成
+    bar_engine.unsubscribe_bar(event_type)
+    put_ticks(event_engine, "rb2501.SHFE", 6)
+    assert len(get_bar_events(event_engine, event_type)) == 1
+
+    # 全部取消后停止合成
+    bar_engine.unsubscribe_bar(event_type)
+    assert not bar_engine.minute_generators
+    assert not bar_engine.window_generators
+
+    event_engine.events.clear()
+    put_ticks(event_engine, "rb2501.SHFE", 6)
+    assert len(event_engine.events) == 13
+
+    # 重复取消不会出错
+    bar_engine.unsubscribe_bar(event_type)
+
+
+def test_unsubscribe_keep_minute_generator():
+    """测试取消1分钟K线订阅后窗口K线继续合成"""
+    bar_engine, event_engine = create_engine()
+
+    minute_type: str = bar_engine.subscribe_bar("rb2501.SHFE")
+    window_type: str = bar_engine.subscribe_bar("rb2501.SHFE", 5, Interval.MINUTE)
+
+    bar_engine.unsubscribe_bar(minute_type)
+    put_ticks(event_engine, "rb2501.SHFE", 6)
+
+    assert len(get_bar_events(event_engine, window_type)) == 1
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+本地缓存数据库单元测试
+"""
+
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import BarOverview
+from vnpy.trader.object import BarData, BarBatch
+from vnpy_arrow.cache_database import CacheDatabase, merge_ranges, subtract_ranges
+
+
+START: datetime = datetime(2024, 1, 2, 9, 0)
+
+
+class FakeDatabase:
+    """记录读取范围的远程数据库"""
+
+    def __init__(self, count: int = 100) -> None:
+        """"""
+        self.batches: dict[str, BarBatch] = {}
+        self.queries: list[tuple[str, datetime, datetime]] = []
+        self.saved: list[BarData] = []
+        self.load_callback = None
+
+        for symbol in ["rb2501", "hc2501"]:
+            self.add_bars(symbol, count)
+
+    def add_bars(self, symbol: str, count: int, close: float = 0) -> None:
+        """写入每分钟一根的K线数据"""
+        dts: np.ndarray = np.datetime64(START, "us") + np.arange(count).astype("timedelta64[m]")
+        self.batches[symbol] = BarBatch(
+            symbol,
+            Exchange.SHFE,
+            dts,
+            interval=Interval.MINUTE,
+            close_price=np.arange(count) + close
+        )
+
+    def save_bar_data(self, bars: list[BarData], stream: bool = False) -> bool:
+        """"""
+        self.saved.extend(bars)
+        return True
+
+    def load_bar_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarBatch:
+        """"""
+        self.queries.append((symbol, start, end))
+
+        if self.load_callback:
+            self.load_callback(symbol)
+
+        batch: BarBatch = self.batches[symbol]
+        ix: int = np.searchsorted(batch.datetime, np.datetime64(start, "us"), "left")
+        jx: int = np.searchsorted(batch.datetime, np.datetime64(end, "us"), "right")
+        return batch[ix:jx]
+
+    def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
+        """"""
+        return 0
+
+    def get_bar_overview(self) -> list[BarOverview]:
+        """"""
+        return [
+            BarOverview(
+                symbol=symbol,
+                exchange=Exchange.SHFE,
+                interval=Interval.MINUTE,
+                count=len(batch),
+                start=batch.datetime[0].item(),
+                end=batch.datetime[-1].item()
+            )
+            for symbol, batch in self.batches.items()
+        ]
+
+    def get_tick_overview(self) -> list:
+        """"""
+        return []
+
+
+def create_database(tmp_path: Path) -> tuple[CacheDatabase, FakeDatabase]:
+    """创建本地缓存数据库"""
+    remote: FakeDatabase = FakeDatabase()
+    database: CacheDatabase = CacheDatabase(remote, tmp_path, check_interval=0)      # type: ignore
+    return database, remote
+
+
+def load_bars(database: CacheDatabase, symbol: str, start: int, end: int) -> BarBatch:
+    """读取第start到第end分钟的K线数据"""
+    return database.load_bar_batch(
+        symbol,
+        Exchange.SHFE,
+        Interval.MINUTE,
+        START + timedelta(minutes=start),
+        START + timedelta(minutes=end)
+    )
+
+
+def get_queries(remote: FakeDatabase) -> list[tuple[int, int]]:
+    """获取远程读取的分钟范围"""
+    return [
+        ((start - START) // timedelta(minutes=1), (end - START) // timedelta(minutes=1))
+        for _, start, end in remote.queries
+    ]
+
+
+def test_merge_ranges():
+    """测试合并重叠和相接的时间范围"""
+    d: list[datetime] = [START + timedelta(minutes=i) for i in range(10)]
+
+    assert merge_ranges([(d[5], d[7]), (d[0], d[2]), (d[2], d[3]), (d[6], d[9])]) == [(d[0], d[3]), (d[5], d[9])]
+    assert merge_ranges([]) == []
+
+
+def test_subtract_ranges():
+    """测试计算未被已缓存范围覆盖的时间范围"""
+    d: list[datetime] = [START + timedelta(minutes=i) for i in range(10)]
+    ranges: list[tuple[datetime, datetime]] = [(d[2], d[4]), (d[6], d[7])]
+
+    assert subtract_ranges(ranges, d[0], d[9]) == [(d[0], d[2]), (d[4], d[6]), (d[7], d[9])]
+    assert subtract_ranges(ranges, d[3], d[6]) == [(d[4], d[6])]
+    assert subtract_ranges(ranges, d[2], d[4]) == []
+    assert subtract_ranges([], d[1], d[5]) == [(d[1], d[5])]
+
+    # 单个时间点
+    assert subtract_ranges(ranges, d[3], d[3]) == []
+    assert subtract_ranges(ranges, d[5], d[5]) == [(d[5], d[5])]
+
+
+def test_load_missing_ranges(tmp_path: Path):
+    """测试只从远程读取缓存中缺失的时间范围"""
+    database, remote = create_database(tmp_path)
+
+    batch: BarBatch = load_bars(database, "rb2501", 10, 20)
+    assert batch.close_price.tolist() == list(range(10, 21))
+
+    batch = load_bars(database, "rb2501", 15, 30)
+    assert batch.close_price.tolist() == list(range(15, 31))
+
+    batch = load_bars(database, "rb2501", 12, 25)
+    assert batch.close_price.tolist() == list(range(12, 26))
+
+    assert get_queries(remote) == [(10, 20), (20, 30)]
+
+
+def test_cache_until_watermark(tmp_path: Path):
+    """测试远程水位之后的范围不缓存，追加数据后继续读取"""
+    database, remote = create_database(tmp_path)
+
+    batch: BarBatch = load_bars(database, "rb2501", 90, 120)
+    assert len(batch) == 10
+
+    remote.add_bars("rb2501", 130)
+    batch = load_bars(database, "rb2501", 90, 120)
+    assert len(batch) == 31
+
+    # 第一次只缓存到水位99分钟为止
+    assert get_queries(remote) == [(90, 120), (99, 120)]
+
+
+def test_invalidate_on_change(tmp_path: Path):
+    """测试远程数据的水位变化不是追加数据时删除缓存重新读取"""
+    database, remote = create_database(tmp_path)
+
+    load_bars(database, "rb2501", 0, 50)
+
+    remote.add_bars("rb2501", 90, close=1000)
+    batch: BarBatch = load_bars(database, "rb2501", 0, 50)
+
+    assert batch.close_price[0] == 1000
+    assert len(remote.queries) == 2
+
+
+def test_fetch_without_lock(tmp_path: Path):
+    """测试远程读取期间不阻塞其他合约的读取"""
+    database, remote = create_database(tmp_path)
+
+    started: threading.Event = threading.Event()
+    release: threading.Event = threading.Event()
+
+    def block_rb(symbol: str) -> None:
+        if symbol == "rb2501":
+            started.set()
+            release.wait(5)
+
+    remote.load_callback = block_rb
+
+    result: list[BarBatch] = []
+    thread: threading.Thread = threading.Thread(
+        target=lambda: result.append(load_bars(database, "rb2501", 0, 10))
+    )
+    thread.start()
+    assert started.wait(5)
+
+    # rb2501的远程读取未完成时，hc2501可以正常读取
+    batch: BarBatch = load_bars(database, "hc2501", 0, 10)
+    assert len(batch) == 11
+    assert thread.is_alive()
+
+    release.set()
+    thread.join(5)
+
+    assert len(result[0]) == 11
+
+    # 两个合约都已写入缓存
+    load_bars(database, "rb2501", 0, 10)
+    load_bars(database, "hc2501", 0, 10)
+    assert len(remote.queries) == 2
+
+
+def test_invalidate_during_fetch(tmp_path: Path):
+    """测试远程读取期间缓存被删除时不写入缓存"""
+    database, remote = create_database(tmp_path)
+
+    def delete_data(symbol: str) -> None:
+        remote.load_callback = None
+        database.delete_bar_data(symbol, Exchange.SHFE, Interval.MINUTE)
+
+    remote.load_callback = delete_data
+
+    batch: BarBatch = load_bars(database, "rb2501", 0, 10)
+    assert batch.close_price.tolist() == list(range(11))
+
+    # 删除后的读取结果没有写入缓存
+    assert not database.records
+    assert not database.cache.get_bar_overview()
+
+
+def create_bars(symbol: str, minutes: list[int], close: float) -> list[BarData]:
+    """创建指定分钟的K线数据"""
+    return [
+        BarData(
+            gateway_name="DB",
+            symbol=symbol,
+            exchange=Exchange.SHFE,
+            datetime=START + timedelta(minutes=minute),
+            interval=Interval.MINUTE,
+            close_price=close
+        )
+        for minute in minutes
+    ]
+
+
+def test_save_without_record(tmp_path: Path):
+    """测试没有缓存记录的合约保存时只写入远程数据库"""
+    database, remote = create_database(tmp_path)
+
+    assert database.save_bar_data(create_bars("rb2501", [5, 6], 500))
+    assert len(remote.saved) == 2
+
+    assert not database.records
+    assert not database.cache.get_bar_overview()
+
+
+def test_save_with_record(tmp_path: Path):
+    """测试已有缓存记录的合约保存时更新缓存，删除时一并清除"""
+    database, remote = create_database(tmp_path)
+    load_bars(database, "rb2501", 0, 10)
+
+    database.save_bar_data(create_bars("rb2501", [5], 500))
+
+    batch: BarBatch = load_bars(database, "rb2501", 0, 10)
+    assert batch.close_price[5] == 500
+    assert len(remote.queries) == 1
+
+    database.delete_bar_data("rb2501", Exchange.SHFE, Interval.MINUTE)
+    assert not database.cache.get_bar_overview()
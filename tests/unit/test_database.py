@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+数据库加载单元测试
+"""
+
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+from vnpy.trader import database as database_module
+from vnpy.trader import utility
+from vnpy.trader.setting import SETTINGS
+from vnpy_arrow import CacheDatabase
+from vnpy_arrow.arrow_database import ArrowDatabase
+
+
+@pytest.fixture
+def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict:
+    """隔离全局配置、数据库对象和数据目录"""
+    monkeypatch.setattr(database_module, "database", None)
+    monkeypatch.setattr(utility, "TEMP_DIR", tmp_path)
+    monkeypatch.setitem(SETTINGS, "database.cache", True)
+    return SETTINGS
+
+
+def block_modules(monkeypatch: pytest.MonkeyPatch, *names: str) -> None:
+    """模拟未安装的数据库驱动"""
+    def import_func(name: str) -> ModuleType:
+        if name in names:
+            raise ModuleNotFoundError(name)
+        return import_module(name)
+
+    monkeypatch.setattr(database_module, "import_module", import_func)
+
+
+def test_fallback_to_arrow_without_cache(settings: dict, monkeypatch: pytest.MonkeyPatch):
+    """测试驱动和SQLite都未安装时回退到Arrow数据库，且不再包装缓存"""
+    monkeypatch.setitem(settings, "database.name", "missing")
+    block_modules(monkeypatch, "vnpy_missing", "vnpy_sqlite")
+
+    database = database_module.get_database()
+
+    assert isinstance(database, ArrowDatabase)
+    assert not isinstance(database, CacheDatabase)
+
+
+def test_wrap_remote_with_cache(settings: dict, monkeypatch: pytest.MonkeyPatch):
+    """测试其他数据库驱动启用缓存时包装为本地缓存数据库"""
+    module: ModuleType = ModuleType("vnpy_remote")
+    module.Database = lambda: ArrowDatabase(utility.TEMP_DIR.joinpath("remote"))      # type: ignore
+
+    monkeypatch.setitem(settings, "database.name", "remote")
+    monkeypatch.setattr(database_module, "import_module", lambda name: module)
+
+    database = database_module.get_database()
+
+    assert isinstance(database, CacheDatabase)
+    assert database.cache.root == utility.TEMP_DIR.joinpath("arrow_cache")
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+事件引擎单元测试
+"""
+
+import time
+import threading
+from collections import defaultdict
+
+from vnpy.event import Event, EventEngine, ShardedEventEngine
+from vnpy.trader.constant import Exchange, Direction, Status
+from vnpy.trader.event import EVENT_TICK, EVENT_ORDER
+from vnpy.trader.object import TickData, OrderData
+
+
+def create_tick(symbol: str, volume: float = 0) -> TickData:
+    """创建测试用Tick数据"""
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        datetime=None,      # type: ignore
+        volume=volume,
+        gateway_name="TEST"
+    )
+
+
+def create_order(symbol: str, orderid: str) -> OrderData:
+    """创建测试用委托数据"""
+    return OrderData(
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        orderid=orderid,
+        direction=Direction.LONG,
+        status=Status.NOTTRADED,
+        gateway_name="TEST"
+    )
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    """等待条件满足"""
+    end: float = time.time() + timeout
+    while time.time() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_sharded_handler_order():
+    """测试同一事件的处理函数按注册顺序在同一线程中调用"""
+    engine: ShardedEventEngine = ShardedEventEngine(worker_count=4)
+
+    processed: set = set()
+    calls: defaultdict = defaultdict(list)
+    errors: list = []
+
+    def process_oms(event: Event) -> None:
+        time.sleep(0.001)
+        processed.add(id(event))
+        calls[id(event)].append(("oms", threading.get_ident()))
+
+    def process_app(event: Event) -> None:
+        if id(event) not in processed:
+            errors.append(event)
+        calls[id(event)].append(("app", threading.get_ident()))
+
+    for event_type in [EVENT_TICK, EVENT_ORDER]:
+        engine.register(event_type, process_oms)
+        engine.register(event_type, process_app)
+
+    events: list[Event] = []
+    for i in range(50):
+        for symbol in ["rb2501", "hc2501", "cu2501"]:
+            events.append(Event(EVENT_TICK, create_tick(symbol)))
+            events.append(Event(EVENT_ORDER, create_order(symbol, f"{symbol}_{i}")))
+
+    engine.start()
+    for event in events:
+        engine.put(event)
+
+    finished: bool = wait_until(lambda: all(len(calls[id(e)]) == 2 for e in events))
+    engine.stop()
+
+    assert finished
+    assert not errors
+
+    for event in events:
+        (first, first_thread), (second, second_thread) = calls[id(event)]
+        assert (first, second) == ("oms", "app")
+        assert first_thread == second_thread
+
+
+def test_sharded_key_ordering():
+    """测试同一合约的行情和委托事件在同一线程中按顺序处理"""
+    engine: ShardedEventEngine = ShardedEventEngine(worker_count=4)
+
+    received: defaultdict = defaultdict(list)
+    threads: defaultdict = defaultdict(set)
+
+    def process_event(event: Event) -> None:
+        vt_symbol: str = event.data.vt_symbol
+        received[vt_symbol].append(event.data)
+        threads[vt_symbol].add(threading.get_ident())
+
+    engine.register(EVENT_TICK, process_event)
+    engine.register(EVENT_ORDER, process_event)
+
+    symbols: list[str] = [f"rb25{i:02d}" for i in range(1, 13)]
+    count: int = 100
+
+    engine.start()
+    for i in range(count):
+        for symbol in symbols:
+            engine.put(Event(EVENT_TICK, create_tick(symbol, i)))
+            engine.put(Event(EVENT_ORDER, create_order(symbol, str(i))))
+
+    finished: bool = wait_until(lambda: sum(len(v) for v in received.values()) == len(symbols) * count * 2)
+    engine.stop()
+
+    assert finished
+
+    for data_list in received.values():
+        ticks: list[TickData] = [d for d in data_list if isinstance(d, TickData)]
+        orders: list[OrderData] = [d for d in data_list if isinstance(d, OrderData)]
+        assert [t.volume for t in ticks] == list(range(count))
+        assert [o.orderid for o in orders] == [str(i) for i in range(count)]
+
+    # 同一合约的所有事件由同一个线程处理
+    assert all(len(v) == 1 for v in threads.values())
+
+
+def test_sharded_affinity():
+    """测试注册了亲和性的事件类型全部由同一线程按顺序处理"""
+    engine: ShardedEventEngine = ShardedEventEngine(worker_count=4)
+
+    threads: set = set()
+    received: list = []
+
+    def process_tick(event: Event) -> None:
+        threads.add(threading.get_ident())
+        received.append(event.data)
+
+    engine.register(EVENT_TICK, process_tick, "monitor")
+
+    engine.start()
+    for i in range(100):
+        engine.put(Event(EVENT_TICK, create_tick(f"rb25{i % 12 + 1:02d}", i)))
+
+    finished: bool = wait_until(lambda: len(received) == 100)
+    engine.stop()
+
+    assert finished
+    assert len(threads) == 1
+    assert [tick.volume for tick in received] == list(range(100))
+
+
+def test_sharded_unregister_affinity():
+    """测试事件类型的全部处理函数注销后清除亲和性，之后注册的处理函数按路由键分发"""
+    engine: ShardedEventEngine = ShardedEventEngine(worker_count=4)
+
+    def process_monitor(event: Event) -> None:
+        pass
+
+    def process_other(event: Event) -> None:
+        pass
+
+    engine.register(EVENT_TICK, process_monitor, "monitor")
+    engine.register(EVENT_TICK, process_other)
+
+    # 仍有处理函数时保留亲和性
+    engine.unregister(EVENT_TICK, process_monitor)
+    engine.unregister(EVENT_TICK, process_monitor)
+    assert engine._affinities == {EVENT_TICK: "monitor"}
+
+    engine.unregister(EVENT_TICK, process_other)
+    assert not engine._affinities
+
+    threads: dict[str, set] = defaultdict(set)
+    received: list = []
+
+    def process_tick(event: Event) -> None:
+        threads[event.data.vt_symbol].add(threading.get_ident())
+        received.append(event.data)
+
+    engine.register(EVENT_TICK, process_tick)
+
+    engine.start()
+    for i in range(120):
+        engine.put(Event(EVENT_TICK, create_tick(f"rb25{i % 12 + 1:02d}", i)))
+
+    finished: bool = wait_until(lambda: len(received) == 120)
+    engine.stop()
+
+    assert finished
+    assert all(len(idents) == 1 for idents in threads.values())
+    assert len(set.union(*threads.values())) > 1
+
+
+def test_batch_coalesce():
+    """测试批量取出事件时只保留每个合约的最新行情"""
+    engine: EventEngine = EventEngine(batch_size=100, coalesce_prefix=EVENT_TICK)
+
+    events: list[Event] = [
+        Event(EVENT_TICK, create_tick("rb2501", 1)),
+        Event(EVENT_ORDER, create_order("rb2501", "1")),
+        Event(EVENT_TICK, create_tick("hc2501", 1)),
+        Event(EVENT_TICK, create_tick("rb2501", 2)),
+        Event(EVENT_ORDER, create_order("rb2501", "2")),
+        Event(EVENT_TICK, create_tick("rb2501", 3)),
+    ]
+    for event in events:
+        engine.put(event)
+
+    batch: list[Event] = engine._get_batch(engine._queue.get())
+
+    # 委托不会被丢弃，最新行情保持在原来的位置
+    assert batch == [events[1], events[2], events[4], events[5]]
+    assert engine.get_batch_statistics() == {"batch": 1, "event": 6, "coalesced": 2}
+
+
+def test_batch_size_limit():
+    """测试每批取出的事件数量不超过批量大小"""
+    engine: EventEngine = EventEngine(batch_size=4)
+
+    for i in range(10):
+        engine.put(Event(EVENT_TICK, create_tick("rb2501", i)))
+
+    batches: list[list[Event]] = []
+    while not engine._queue.empty():
+        batches.append(engine._get_batch(engine._queue.get()))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [e.data.volume for batch in batches for e in batch] == list(range(10))
+
+
+def test_batch_processing():
+    """测试批量模式下所有委托事件都被处理"""
+    engine: EventEngine = EventEngine(batch_size=50, coalesce_prefix=EVENT_TICK)
+
+    orders: list[OrderData] = []
+    ticks: list[TickData] = []
+    engine.register(EVENT_ORDER, lambda event: orders.append(event.data))
+    engine.register(EVENT_TICK, lambda event: ticks.append(event.data))
+
+    for i in range(1000):
+        engine.put(Event(EVENT_TICK, create_tick("rb2501", i)))
+        engine.put(Event(EVENT_ORDER, create_order("rb2501", str(i))))
+
+    engine.start()
+    finished: bool = wait_until(lambda: len(orders) == 1000)
+    engine.stop()
+
+    assert finished
+    assert [o.orderid for o in orders] == [str(i) for i in range(1000)]
+    assert ticks[-1].volume == 999
+    assert len(ticks) + engine.get_batch_statistics()["coalesced"] == 1000
+
+
+def test_monitor_snapshot():
+    """测试监控数据按事件类型前缀统计，并在重置后重新计数"""
+    engine: EventEngine = EventEngine(monitor=True)
+
+    def process_tick(event: Event) -> None:
+        pass
+
+    engine.register(EVENT_TICK, process_tick)
+
+    for symbol in ["rb2501.SHFE", "hc2501.SHFE", "cu2501.SHFE"]:
+        engine.put(Event(EVENT_TICK + symbol, create_tick(symbol)))
+        engine.put(Event(EVENT_TICK, create_tick(symbol)))
+
+    while not engine._queue.empty():
+        engine._process(engine._queue.get())
+
+    snapshot: dict = engine.get_monitor_snapshot(reset=True)
+    assert list(snapshot["latency"]) == ["eTick"]
+    assert snapshot["latency"]["eTick"]["count"] == 6
+
+    handler_data: dict = next(v for k, v in snapshot["handler"].items() if k.endswith("process_tick"))
+    assert handler_data["count"] == 3
+
+    # 重置后只统计新的事件
+    engine.put(Event(EVENT_TICK, create_tick("rb2501.SHFE")))
+    engine._process(engine._queue.get())
+
+    snapshot = engine.get_monitor_snapshot()
+    assert snapshot["latency"]["eTick"]["count"] == 1
+
+
+def test_sharded_timer_affinity():
+    """测试定时任务在所属组件亲和性的线程中调用"""
+    engine: ShardedEventEngine = ShardedEventEngine(worker_count=4)
+
+    tick_threads: set = set()
+    timer_threads: set = set()
+
+    def process_tick(event: Event) -> None:
+        tick_threads.add(threading.get_ident())
+
+    def process_timer(event: Event) -> None:
+        timer_threads.add(threading.get_ident())
+
+    engine.register(EVENT_TICK, process_tick, "gateway")
+    timer_ids: list[int] = [engine.add_timer(0.02, process_timer, affinity="gateway") for _ in range(3)]
+
+    engine.start()
+    for i in range(100):
+        engine.put(Event(EVENT_TICK, create_tick(f"rb25{i % 12 + 1:02d}", i)))
+
+    finished: bool = wait_until(lambda: len(timer_threads) >= 1 and len(tick_threads) >= 1)
+    time.sleep(0.1)
+    engine.stop()
+
+    assert finished
+    assert len(set(timer_ids)) == 3
+    assert tick_threads == timer_threads
+
+
+def test_add_timer_concurrently():
+    """测试多线程同时添加定时任务时编号不重复"""
+    engine: EventEngine = EventEngine()
+
+    timer_ids: list[int] = []
+
+    def add_timers() -> None:
+        for _ in range(200):
+            timer_ids.append(engine.add_timer(60, lambda event: None))
+
+    threads: list[threading.Thread] = [threading.Thread(target=add_timers) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(timer_ids)) == 1600
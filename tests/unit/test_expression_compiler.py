@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+因子表达式编译单元测试
+"""
+
+import ast
+
+import numpy as np
+import polars as pl
+import pytest
+
+# 因子模块依赖alphalens
+pytest.importorskip("alphalens")
+
+import talib                                                                  # noqa: E402
+
+from vnpy.alpha.dataset.template import calculate_features, sort_by_time      # noqa: E402
+from vnpy.alpha.dataset.utility import (                                      # noqa: E402
+    BINARY_OPERATORS,
+    ExpressionCompiler,
+    get_lookback,
+    get_operators,
+    needs_full_history,
+    parse_expression
+)
+
+
+EXPRESSIONS: dict[str, str] = {
+    "kmid": "(close - open) / open",
+    "neg": "-close + 1",
+    "const_left": "1 / close",
+    "compare": "close > ts_delay(close, 1)",
+    "roc": "ts_delay(close, 5) / close",
+    "std": "ts_std(close, 10) / close",
+    "slope": "ts_slope(close, 20) / close",
+    "rsqr": "ts_rsquare(close, 10)",
+    "resi": "ts_resi(close, 10) / close",
+    "rank": "ts_rank(close, 10)",
+    "imax": "ts_argmax(high, 10)",
+    "quantile": "ts_quantile(close, 10, quantile=0.8) / close",
+    "corr": "ts_corr(close, ts_log(volume + 1), 10)",
+    "cs_rank": "cs_rank(close)",
+    "cs_ts": "cs_rank(ts_mean(close, 5) / close)",
+    "ts_cs": "ts_mean(cs_rank(close), 5)",
+    "ts_cs_ts": "ts_sum(cs_std(ts_delay(close, 1)), 5)",
+    "shared_1": "ts_mean(close, 5) / ts_mean(close, 10)",
+    "shared_2": "ts_mean(close, 5) - cs_mean(ts_mean(close, 5))",
+    "ta_rsi": "ta_rsi(close, 14)",
+    "ta_cs": "cs_rank(ta_atr(high, low, close, 10))",
+}
+
+
+def create_data(symbol_count: int = 5, day_count: int = 80) -> pl.DataFrame:
+    """创建按时间和合约排序的行情数据"""
+    rng: np.random.Generator = np.random.default_rng(7)
+    rows: int = symbol_count * day_count
+
+    close: np.ndarray = 10 + np.abs(np.cumsum(rng.normal(0, 0.2, (symbol_count, day_count)), axis=1))
+    close = close.T.ravel()
+
+    dts: np.ndarray = np.datetime64("2024-01-01", "us") + np.arange(day_count).astype("timedelta64[D]")
+
+    return pl.DataFrame({
+        "datetime": np.repeat(dts, symbol_count),
+        "vt_symbol": [f"{i:06d}.SSE" for i in range(symbol_count)] * day_count,
+        "open": close * (1 + rng.normal(0, 0.01, rows)),
+        "high": close * (1 + np.abs(rng.normal(0, 0.02, rows))),
+        "low": close * (1 - np.abs(rng.normal(0, 0.02, rows))),
+        "close": close,
+        "volume": rng.integers(100, 10000, rows).astype(float),
+    })
+
+
+def evaluate(df: pl.DataFrame, node: ast.expr) -> pl.Series | float:
+    """逐个算子计算并物化中间结果，与编译前基于eval的计算方式相同"""
+    if isinstance(node, ast.Constant):
+        return node.value
+
+    if isinstance(node, ast.Name):
+        return df[node.id]
+
+    if isinstance(node, ast.UnaryOp):
+        return -evaluate(df, node.operand)
+
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPERATORS[type(node.op)](evaluate(df, node.left), evaluate(df, node.right))
+
+    if isinstance(node, ast.Compare):
+        return BINARY_OPERATORS[type(node.ops[0])](evaluate(df, node.left), evaluate(df, node.comparators[0]))
+
+    assert isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+
+    data: pl.DataFrame = df.select("datetime", "vt_symbol")
+
+    def to_arg(value: pl.Series | float, name: str) -> pl.Expr | float:
+        nonlocal data
+        if not isinstance(value, pl.Series):
+            return value
+        data = data.with_columns(value.alias(name))
+        return pl.col(name)
+
+    args: list = [to_arg(evaluate(df, arg), f"arg_{i}") for i, arg in enumerate(node.args)]
+    kwargs: dict = {k.arg: to_arg(evaluate(df, k.value), k.arg) for k in node.keywords if k.arg}
+
+    func = get_operators()[node.func.id]
+    return data.select(func(*args, **kwargs).alias("data"))["data"]
+
+
+def to_numpy(s: pl.Series) -> np.ndarray:
+    """转换为浮点数组，空值转换为NaN"""
+    return s.cast(pl.Float64).fill_null(np.nan).to_numpy()
+
+
+def test_compiled_equivalence():
+    """测试编译为单个查询的结果与逐个算子计算的结果一致"""
+    df: pl.DataFrame = create_data()
+
+    result: pl.DataFrame = calculate_features((df, list(EXPRESSIONS.items())))
+    assert result.columns == list(EXPRESSIONS)
+
+    for name, expression in EXPRESSIONS.items():
+        expected: pl.Series = evaluate(df, parse_expression(expression))       # type: ignore
+        np.testing.assert_allclose(
+            to_numpy(result[name]),
+            to_numpy(expected),
+            rtol=1e-6,
+            atol=1e-9,
+            equal_nan=True,
+            err_msg=expression
+        )
+
+
+def test_compiled_values():
+    """测试时序和截面算子的计算结果"""
+    df: pl.DataFrame = create_data(symbol_count=3, day_count=10)
+
+    result: pl.DataFrame = calculate_features((df, [
+        ("mean", "ts_mean(close, 3)"),
+        ("rank", "cs_rank(close)"),
+        ("delay_rank", "ts_delay(cs_rank(close), 1)"),
+    ]))
+
+    close: np.ndarray = df["close"].to_numpy().reshape(10, 3)
+    mean: np.ndarray = result["mean"].to_numpy().reshape(10, 3)
+    rank: np.ndarray = result["rank"].to_numpy().reshape(10, 3)
+    delay_rank: np.ndarray = to_numpy(result["delay_rank"]).reshape(10, 3)
+
+    for i in range(10):
+        np.testing.assert_allclose(mean[i], close[max(i - 2, 0):i + 1].mean(axis=0), rtol=1e-6)
+        np.testing.assert_array_equal(rank[i], close[i].argsort().argsort() + 1)
+
+    assert np.isnan(delay_rank[0]).all()
+    np.testing.assert_array_equal(delay_rank[1:], rank[:-1])
+
+
+def test_shared_calls():
+    """测试多个因子共用的算子调用只计算一次"""
+    compiler: ExpressionCompiler = ExpressionCompiler()
+    compiler.add_feature("a", "ts_mean(close, 5) / close")
+    compiler.add_feature("b", "ts_mean(close, 5) / ts_mean(close, 10)")
+    compiler.add_feature("c", pl.col("close") * 2)
+
+    # 共3次调用，去重后剩2个
+    assert compiler.get_dedup_ratio() == pytest.approx(1 / 3)
+
+    df: pl.DataFrame = create_data(symbol_count=2, day_count=20)
+    result: pl.DataFrame = compiler.build(df.lazy()).collect()
+
+    # 共用的调用物化为临时列，不出现在结果中
+    assert [list(stage) for stage in compiler.stages] == [["_temp_0"]]
+    assert result.columns == ["a", "b", "c"]
+
+
+TA_OPERATORS: dict[str, tuple] = {
+    "ta_sma": (talib.SMA, ["close"]),
+    "ta_ema": (talib.EMA, ["close"]),
+    "ta_rsi": (talib.RSI, ["close"]),
+    "ta_mom": (talib.MOM, ["close"]),
+    "ta_roc": (talib.ROC, ["close"]),
+    "ta_trix": (talib.TRIX, ["close"]),
+    "ta_atr": (talib.ATR, ["high", "low", "close"]),
+    "ta_natr": (talib.NATR, ["high", "low", "close"]),
+    "ta_adx": (talib.ADX, ["high", "low", "close"]),
+    "ta_cci": (talib.CCI, ["high", "low", "close"]),
+    "ta_willr": (talib.WILLR, ["high", "low", "close"]),
+    "ta_mfi": (talib.MFI, ["high", "low", "close", "volume"]),
+}
+
+
+@pytest.mark.parametrize("name", list(TA_OPERATORS))
+def test_ta_operators(name: str):
+    """测试技术指标算子按合约计算，与对每个合约的数据直接调用talib的结果一致"""
+    func, columns = TA_OPERATORS[name]
+    df: pl.DataFrame = create_data(symbol_count=4, day_count=60)
+
+    # 合约数据交错排列，按合约分别计算
+    result: pl.DataFrame = calculate_features((df, [("data", f"{name}({', '.join(columns)}, 6)")]))
+    df = df.with_columns(result["data"])
+
+    for vt_symbol, symbol_df in df.group_by("vt_symbol", maintain_order=True):
+        expected: np.ndarray = func(*[symbol_df[c].to_numpy() for c in columns], timeperiod=6)
+        np.testing.assert_allclose(
+            to_numpy(symbol_df["data"]),
+            expected,
+            rtol=1e-9,
+            equal_nan=True,
+            err_msg=str(vt_symbol)
+        )
+        assert not np.isnan(expected[-1])
+
+
+def test_ta_operators_unordered():
+    """测试合约数据不连续且顺序打乱时结果按原有行顺序返回"""
+    df: pl.DataFrame = create_data(symbol_count=3, day_count=30)
+    shuffled: pl.DataFrame = df.sample(fraction=1, shuffle=True, seed=3).sort("datetime")
+
+    expected: pl.DataFrame = df.with_columns(calculate_features((df, [("data", "ta_ema(close, 5)")]))["data"])
+    result: pl.DataFrame = shuffled.with_columns(calculate_features((shuffled, [("data", "ta_ema(close, 5)")]))["data"])
+
+    assert sort_by_time(result).equals(sort_by_time(expected))
+
+
+def test_lookback():
+    """测试因子所需的历史数据长度"""
+    assert get_lookback(parse_expression("close / open")) == 0
+    assert get_lookback(parse_expression("ts_mean(ts_delay(close, 5), 10)")) == 15
+    assert get_lookback(parse_expression("ts_mean(close, 5) / ts_std(close, window=20)")) == 20
+    assert get_lookback(parse_expression("ts_delay(close, -5)")) == 0
+    assert get_lookback(parse_expression("cs_rank(ts_delay(close, 3))")) == 3
+    assert get_lookback(parse_expression("ta_rsi(close, 14)")) == 14
+
+
+def test_needs_full_history():
+    """测试递归平滑的技术指标和Polars表达式依赖全部历史数据"""
+    assert needs_full_history("ta_rsi(close, 14)")
+    assert needs_full_history("cs_rank(ts_mean(ta_atr(high, low, close, 14), 5))")
+    assert needs_full_history(pl.col("close").rolling_mean(5))
+    assert not needs_full_history("ts_mean(close, 5) / close")
+
+
+@pytest.mark.parametrize("expression", [
+    "ts_unknown(close, 5)",
+    "close if open else high",
+    "(close - open",
+    "1 < close < 2",
+])
+def test_invalid_expression(expression: str):
+    """测试不支持的表达式抛出异常"""
+    df: pl.DataFrame = create_data(symbol_count=2, day_count=5)
+
+    with pytest.raises(ValueError):
+        calculate_features((df, [("data", expression)]))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+因子特征缓存单元测试
+"""
+
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+# 因子模块依赖alphalens
+pytest.importorskip("alphalens")
+
+from vnpy.alpha.dataset import cache as cache_module                         # noqa: E402
+from vnpy.alpha.dataset.cache import FeatureCache                             # noqa: E402
+
+
+def create_data(close: float = 10) -> pl.DataFrame:
+    """创建测试用行情数据"""
+    dts: np.ndarray = np.datetime64("2024-01-01", "us") + np.arange(5).astype("timedelta64[D]")
+
+    return pl.DataFrame({
+        "datetime": np.repeat(dts, 2),
+        "vt_symbol": ["000001.SZSE", "600000.SSE"] * 5,
+        "close": close + np.arange(10, dtype=float),
+    })
+
+
+def test_load_saved_feature(tmp_path: Path):
+    """测试保存后按表达式读取，表达式中的空格和多余括号不影响缓存键"""
+    cache: FeatureCache = FeatureCache(tmp_path)
+    df: pl.DataFrame = create_data()
+    fingerprint: str = cache.get_fingerprint(df)
+
+    assert cache.load_feature(fingerprint, "ts_mean(close, 5)", df.height) is None
+
+    s: pl.Series = pl.Series("feature", np.arange(10, dtype=float))
+    cache.save_feature(fingerprint, "ts_mean(close, 5)", s)
+
+    loaded: pl.Series | None = cache.load_feature(fingerprint, "(ts_mean( close,5 ))", df.height)
+    assert loaded is not None
+    assert loaded.to_list() == s.to_list()
+
+    # 数据行数不一致时不使用缓存
+    assert cache.load_feature(fingerprint, "ts_mean(close, 5)", df.height + 1) is None
+    assert cache.load_feature(fingerprint, "ts_mean(close, 10)", df.height) is None
+
+
+def test_fingerprint_data(tmp_path: Path):
+    """测试输入数据的数值和行顺序变化时指纹变化"""
+    cache: FeatureCache = FeatureCache(tmp_path)
+    df: pl.DataFrame = create_data()
+
+    assert cache.get_fingerprint(df) == cache.get_fingerprint(create_data())
+    assert cache.get_fingerprint(df) != cache.get_fingerprint(create_data(close=11))
+    assert cache.get_fingerprint(df) != cache.get_fingerprint(df.reverse())
+
+
+def test_invalidate_on_operator_change(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """测试缓存版本或算子实现变化后不再读取旧的缓存"""
+    cache: FeatureCache = FeatureCache(tmp_path)
+    df: pl.DataFrame = create_data()
+
+    fingerprint: str = cache.get_fingerprint(df)
+    cache.save_feature(fingerprint, "ta_rsi(close, 3)", pl.Series(np.arange(10, dtype=float)))
+
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    new_fingerprint: str = cache.get_fingerprint(df)
+    assert new_fingerprint != fingerprint
+    assert cache.load_feature(new_fingerprint, "ta_rsi(close, 3)", df.height) is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(cache_module, "get_operator_hash", lambda: "changed")
+    assert cache.get_fingerprint(df) != fingerprint
+
+
+def test_clear(tmp_path: Path):
+    """测试清空全部缓存"""
+    cache: FeatureCache = FeatureCache(tmp_path.joinpath("cache"))
+    df: pl.DataFrame = create_data()
+
+    fingerprint: str = cache.get_fingerprint(df)
+    cache.save_feature(fingerprint, "close", df["close"])
+    cache.clear()
+
+    assert cache.load_feature(fingerprint, "close", df.height) is None
+    assert not any(cache.cache_path.iterdir())
@@ -0,0 +1,684 @@
+# -*- coding: utf-8 -*-
+"""
+MySQL数据库接口单元测试（不连接数据库，记录执行的SQL语句）
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from collections.abc import Iterator
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+from peewee import Model, SqliteDatabase
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import BarOverview
+from vnpy.trader.object import BarData, TickData, BarBatch, TickBatch
+from vnpy_mysql import mysql_database
+from vnpy_mysql.mysql_database import (
+    MysqlDatabase,
+    DbBarData,
+    DbTickData,
+    DbBarOverview,
+    DbTickOverview,
+    BAR_COLUMNS,
+    TICK_COLUMNS,
+    convert_batch_datetime
+)
+
+
+class FakeCursor:
+    """记录SQL语句的数据库游标"""
+
+    def __init__(self, db: "FakeDb") -> None:
+        """"""
+        self.db: FakeDb = db
+
+    def execute(self, sql: str, params: object = None) -> None:
+        """"""
+        self.db.executed.append((sql, params))
+
+    def executemany(self, sql: str, rows: list) -> None:
+        """"""
+        self.db.executed.append((sql, list(rows)))
+
+    def fetchall(self) -> list:
+        """"""
+        return self.db.results.pop(0) if self.db.results else []
+
+    def fetchmany(self, size: int) -> list:
+        """"""
+        rows: list = self.db.rows[:size]
+        del self.db.rows[:size]
+        self.db.fetch_sizes.append(len(rows))
+        return rows
+
+    def close(self) -> None:
+        """"""
+        self.db.cursor_closed += 1
+
+
+class FakeDb:
+    """记录SQL语句的数据库对象"""
+
+    def __init__(self) -> None:
+        """"""
+        self.executed: list[tuple[str, object]] = []
+        self.results: list[list] = []
+
+        # 流式读取返回的数据行
+        self.rows: list[tuple] = []
+        self.fetch_sizes: list[int] = []
+        self.cursor_closed: int = 0
+
+        # 连接池中当前线程的连接状态
+        self.closed: bool = True
+        self.connect_count: int = 0
+        self.close_count: int = 0
+
+    def is_closed(self) -> bool:
+        """"""
+        return self.closed
+
+    def connect(self) -> None:
+        """"""
+        self.closed = False
+        self.connect_count += 1
+
+    def close(self) -> None:
+        """"""
+        self.closed = True
+        self.close_count += 1
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        """"""
+        yield
+
+    def connection(self) -> "FakeDb":
+        """"""
+        return self
+
+    def cursor(self, cursor_class: type | None = None) -> FakeCursor:
+        """"""
+        return FakeCursor(self)
+
+    def execute_sql(self, sql: str, params: object = None) -> FakeCursor:
+        """"""
+        self.executed.append((sql, params))
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def database(monkeypatch: pytest.MonkeyPatch) -> MysqlDatabase:
+    """创建不连接数据库的接口对象"""
+    monkeypatch.setattr(mysql_database, "PARTITION_MODE", "")
+
+    database: MysqlDatabase = MysqlDatabase.__new__(MysqlDatabase)
+    database.db = FakeDb()        # type: ignore
+    database.pooled = False
+    database.partition_bounds = {}
+    return database
+
+
+@pytest.fixture
+def sqlite_database(monkeypatch: pytest.MonkeyPatch) -> Iterator[MysqlDatabase]:
+    """创建数据表绑定到内存SQLite数据库的接口对象，用于测试汇总信息的维护"""
+    monkeypatch.setattr(mysql_database, "DB_TZ", ZoneInfo("Asia/Shanghai"))
+
+    models: list[type[Model]] = [DbBarData, DbTickData, DbBarOverview, DbTickOverview]
+    sqlite_db: SqliteDatabase = SqliteDatabase(":memory:")
+
+    database: MysqlDatabase = MysqlDatabase.__new__(MysqlDatabase)
+    database.db = sqlite_db         # type: ignore
+    database.pooled = False
+    database.partition_bounds = {}
+
+    # SQLite不支持ON DUPLICATE KEY UPDATE，使用INSERT OR REPLACE写入
+    def insert_rows(model: type[Model], columns: list[str], rows: list[tuple]) -> None:
+        model.insert_many([dict(zip(columns, row)) for row in rows]).on_conflict_replace().execute()
+
+    database.insert_rows = insert_rows       # type: ignore
+
+    with sqlite_db.bind_ctx(models):
+        sqlite_db.create_tables(models)
+        yield database
+
+
+def create_bars(minutes: range, close: float = 0) -> list[BarData]:
+    """创建指定分钟的K线数据"""
+    return [
+        BarData(
+            gateway_name="DB",
+            symbol="rb2501",
+            exchange=Exchange.SHFE,
+            datetime=datetime(2024, 1, 2, 9, 0, tzinfo=ZoneInfo("Asia/Shanghai")) + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            close_price=close + i
+        )
+        for i in minutes
+    ]
+
+
+def get_bar_overview() -> DbBarOverview:
+    """读取测试合约的K线汇总"""
+    return DbBarOverview.get(DbBarOverview.symbol == "rb2501")
+
+
+@pytest.mark.parametrize("tz", [
+    ZoneInfo("America/New_York"),
+    ZoneInfo("Europe/London"),
+    ZoneInfo("Australia/Lord_Howe"),
+    timezone(timedelta(hours=8)),
+])
+@pytest.mark.parametrize("db_tz", ["Asia/Shanghai", "America/New_York", "Asia/Kathmandu"])
+def test_convert_batch_datetime(monkeypatch: pytest.MonkeyPatch, tz, db_tz: str):
+    """测试整列转换时区与逐条转换结果一致，包括夏令时切换时段"""
+    monkeypatch.setattr(mysql_database, "DB_TZ", ZoneInfo(db_tz))
+
+    dts: np.ndarray = np.arange(
+        np.datetime64("2024-03-01"), np.datetime64("2024-12-01"), np.timedelta64(13, "m")
+    ).astype("datetime64[us]")
+    extra: np.ndarray = np.array(
+        ["2024-03-10T02:30", "2024-03-31T01:30", "2024-11-03T01:30:00.500", "1990-06-01T12:34:56.789"],
+        dtype="datetime64[us]"
+    )
+    dts = np.concatenate([dts, extra])
+
+    batch: BarBatch = BarBatch("rb2501", Exchange.SHFE, dts, "DB", tz)
+
+    expected: list[datetime] = [
+        dt.replace(tzinfo=tz).astimezone(ZoneInfo(db_tz)).replace(tzinfo=None)
+        for dt in dts.tolist()
+    ]
+    assert convert_batch_datetime(batch) == expected
+
+
+def test_convert_batch_datetime_same_timezone(monkeypatch: pytest.MonkeyPatch):
+    """测试无时区或与数据库时区相同时不做转换"""
+    monkeypatch.setattr(mysql_database, "DB_TZ", ZoneInfo("Asia/Shanghai"))
+
+    dts: np.ndarray = np.array(["2024-01-02T09:00", "2024-01-02T09:01"], dtype="datetime64[us]")
+
+    for tz in [None, ZoneInfo("Asia/Shanghai")]:
+        batch: BarBatch = BarBatch("rb2501", Exchange.SHFE, dts, "DB", tz)
+        assert convert_batch_datetime(batch) == dts.tolist()
+
+
+def test_insert_rows_upsert(database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch):
+    """测试批量写入使用多行INSERT并在主键冲突时更新"""
+    monkeypatch.setattr(mysql_database, "SAVE_BATCH_SIZE", 2)
+
+    rows: list[tuple] = [
+        ("rb2501", "SHFE", "1m", datetime(2024, 1, 2, 9, i), *range(7))
+        for i in range(5)
+    ]
+    database.insert_rows(DbBarData, BAR_COLUMNS, rows)
+
+    executed: list = database.db.executed       # type: ignore
+    assert [len(params) for _, params in executed] == [2, 2, 1]
+    assert [row for _, params in executed for row in params] == rows
+
+    sql: str = executed[0][0]
+    assert sql.startswith("INSERT INTO `dbbardata` (`symbol`, `exchange`, `interval`, `datetime`, ")
+    assert sql.count("%s") == len(BAR_COLUMNS)
+    assert "ON DUPLICATE KEY UPDATE `symbol` = VALUES(`symbol`)" in sql
+    assert "`close_price` = VALUES(`close_price`)" in sql
+
+
+@pytest.mark.parametrize(("count", "sizes"), [(4, [4]), (5, [4, 1]), (8, [4, 4]), (0, [])])
+def test_insert_rows_batch_size(database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch, count: int, sizes: list[int]):
+    """测试数据行数正好为批次大小及其整数倍时的分批写入"""
+    monkeypatch.setattr(mysql_database, "SAVE_BATCH_SIZE", 4)
+
+    rows: list[tuple] = [
+        ("rb2501", "SHFE", "1m", datetime(2024, 1, 2, 9, i), *range(7))
+        for i in range(count)
+    ]
+    database.insert_rows(DbBarData, BAR_COLUMNS, rows)
+
+    assert [len(params) for _, params in database.db.executed] == sizes       # type: ignore
+
+
+def create_stream_rows(count: int) -> list[tuple]:
+    """创建流式读取返回的K线数据行"""
+    zeros: tuple = (0.0,) * (len(BarBatch.float_columns) - 1)
+    return [(datetime(2024, 1, 2, 9, 0) + timedelta(minutes=i), *zeros, float(i)) for i in range(count)]
+
+
+@pytest.mark.parametrize(("count", "sizes"), [(6, [3, 3]), (7, [3, 3, 1]), (3, [3]), (0, [])])
+def test_iter_rows(database: MysqlDatabase, count: int, sizes: list[int]):
+    """测试流式读取的批次边界，数据行数正好为批次大小的整数倍时不返回空批次"""
+    database.db.rows = create_stream_rows(count)      # type: ignore
+
+    query = DbBarData.select().where(DbBarData.symbol == "rb2501")
+    batches: list[list[tuple]] = list(database.iter_rows(query, 3))
+
+    assert [len(rows) for rows in batches] == sizes
+    assert database.db.cursor_closed == 1      # type: ignore
+
+    # 最后一次读取返回空结果后结束
+    assert database.db.fetch_sizes[-1] == 0        # type: ignore
+
+
+def test_iter_rows_close_early(database: MysqlDatabase):
+    """测试提前结束迭代时关闭服务端游标"""
+    database.db.rows = create_stream_rows(10)     # type: ignore
+
+    query = DbBarData.select().where(DbBarData.symbol == "rb2501")
+    it: Iterator[list[tuple]] = database.iter_rows(query, 3)
+    next(it)
+    it.close()
+
+    assert database.db.cursor_closed == 1      # type: ignore
+
+
+def test_iter_bar_batches(database: MysqlDatabase):
+    """测试流式读取的列式K线数据按批次大小拆分，合并后与全部数据一致"""
+    database.db.rows = create_stream_rows(5)      # type: ignore
+
+    start: datetime = datetime(2024, 1, 2)
+    batches: list[BarBatch] = list(database.iter_bar_batches(
+        "rb2501", Exchange.SHFE, Interval.MINUTE, start, start + timedelta(days=1), batch_size=2
+    ))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert all(batch.meta == {"interval": Interval.MINUTE} for batch in batches)
+    assert batches[-1].close_price.tolist() == [4.0]
+    assert batches[1].datetime[0] == np.datetime64("2024-01-02T09:02")
+
+    batch: BarBatch = mysql_database.concat_batches(batches, BarBatch, "rb2501", Exchange.SHFE, interval=Interval.MINUTE)
+    assert batch.close_price.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_load_bar_batch_empty(database: MysqlDatabase):
+    """测试没有数据时返回空的列式数据"""
+    start: datetime = datetime(2024, 1, 2)
+    batch: BarBatch = database.load_bar_batch("rb2501", Exchange.SHFE, Interval.MINUTE, start, start + timedelta(days=1))
+
+    assert not len(batch)
+    assert batch.datetime.dtype == np.dtype("datetime64[us]")
+    assert batch.tzinfo is mysql_database.DB_TZ
+    assert batch.meta == {"interval": Interval.MINUTE}
+    assert batch.to_bars() == []
+
+
+@pytest.fixture
+def pooled_database(database: MysqlDatabase) -> MysqlDatabase:
+    """创建使用连接池的接口对象"""
+    database.pooled = True
+    return database
+
+
+def test_connection_returned_on_exception(pooled_database: MysqlDatabase):
+    """测试接口函数抛出异常时归还连接"""
+    def insert_rows(model: type[Model], columns: list[str], rows: list[tuple]) -> None:
+        raise RuntimeError("insert failed")
+
+    pooled_database.insert_rows = insert_rows      # type: ignore
+
+    batch: BarBatch = BarBatch.from_bars(create_bars(range(3)), "rb2501", Exchange.SHFE, Interval.MINUTE)
+    with pytest.raises(RuntimeError):
+        pooled_database.save_bar_batch(batch, update_overview=False)
+
+    db: FakeDb = pooled_database.db        # type: ignore
+    assert db.is_closed()
+    assert db.connect_count == db.close_count == 1
+
+
+def test_connection_nested(pooled_database: MysqlDatabase):
+    """测试嵌套调用接口函数时复用同一个连接，由最外层归还"""
+    db: FakeDb = pooled_database.db        # type: ignore
+    db.rows = create_stream_rows(5)
+
+    start: datetime = datetime(2024, 1, 2)
+    batch: BarBatch = pooled_database.load_bar_batch("rb2501", Exchange.SHFE, Interval.MINUTE, start, start + timedelta(days=1))
+
+    assert len(batch) == 5
+    assert db.is_closed()
+    assert db.connect_count == db.close_count == 1
+
+
+def test_connection_generator(pooled_database: MysqlDatabase):
+    """测试流式读取在迭代期间占用连接，提前结束或抛出异常时归还"""
+    db: FakeDb = pooled_database.db        # type: ignore
+    db.rows = create_stream_rows(5)
+
+    start: datetime = datetime(2024, 1, 2)
+    end: datetime = start + timedelta(days=1)
+
+    it: Iterator[BarBatch] = pooled_database.iter_bar_batches("rb2501", Exchange.SHFE, Interval.MINUTE, start, end, 2)
+    assert db.is_closed()
+
+    next(it)
+    assert not db.is_closed()
+
+    it.close()
+    assert db.is_closed()
+    assert db.cursor_closed == 1
+
+    def iter_rows(query: object, batch_size: int) -> Iterator[list[tuple]]:
+        yield create_stream_rows(2)
+        raise RuntimeError("connection lost")
+
+    pooled_database.iter_rows = iter_rows      # type: ignore
+
+    with pytest.raises(RuntimeError):
+        list(pooled_database.iter_bar_batches("rb2501", Exchange.SHFE, Interval.MINUTE, start, end))
+
+    assert db.is_closed()
+    assert db.connect_count == db.close_count == 2
+
+
+def test_connection_not_pooled(database: MysqlDatabase):
+    """测试未使用连接池时不获取和归还连接"""
+    database.db.rows = create_stream_rows(3)      # type: ignore
+
+    start: datetime = datetime(2024, 1, 2)
+    database.load_bar_batch("rb2501", Exchange.SHFE, Interval.MINUTE, start, start + timedelta(days=1))
+
+    assert database.db.connect_count == database.db.close_count == 0        # type: ignore
+    assert database.get_pool_status() == {}
+
+
+def test_save_bar_batch_rows(database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch):
+    """测试列式K线数据转换为写入数据行"""
+    monkeypatch.setattr(mysql_database, "DB_TZ", ZoneInfo("Asia/Shanghai"))
+
+    dts: np.ndarray = np.array(["2024-01-02T01:00", "2024-01-02T01:01"], dtype="datetime64[us]")
+    batch: BarBatch = BarBatch(
+        "rb2501",
+        Exchange.SHFE,
+        dts,
+        "DB",
+        timezone.utc,
+        interval=Interval.MINUTE,
+        close_price=np.array([3000.0, 3001.0])
+    )
+    database.save_bar_batch(batch, update_overview=False)
+
+    (sql, rows), = database.db.executed         # type: ignore
+    assert rows[0][:4] == ("rb2501", "SHFE", "1m", datetime(2024, 1, 2, 9, 0))
+    assert rows[1][BAR_COLUMNS.index("close_price")] == 3001.0
+
+
+def test_save_tick_batch_localtime(database: MysqlDatabase):
+    """测试列式TICK数据写入本地时间，没有本地时间的写入空值"""
+    dts: np.ndarray = np.array(["2024-01-02T09:00:00", "2024-01-02T09:00:01"], dtype="datetime64[us]")
+    localtime: np.ndarray = np.array(["2024-01-02T09:00:00.100", "NaT"], dtype="datetime64[us]")
+
+    batch: TickBatch = TickBatch("rb2501", Exchange.SHFE, dts, name="螺纹钢2501", localtime=localtime)
+    database.save_tick_batch(batch, update_overview=False)
+
+    (sql, rows), = database.db.executed         # type: ignore
+    ix: int = TICK_COLUMNS.index("localtime")
+    assert rows[0][ix] == datetime(2024, 1, 2, 9, 0, 0, 100000)
+    assert rows[1][ix] is None
+    assert rows[0][TICK_COLUMNS.index("name")] == "螺纹钢2501"
+
+
+def test_load_tick_batch_localtime(database: MysqlDatabase):
+    """测试读取的列式TICK数据包含本地时间，多批数据合并后不丢失"""
+    start: datetime = datetime(2024, 1, 2, 9, 0)
+    values: tuple = (1.0,) * len(TickBatch.float_columns)
+
+    batches: list[list[tuple]] = [
+        [(start, *values, "螺纹钢2501", start + timedelta(milliseconds=100))],
+        [(start + timedelta(seconds=1), *values, "螺纹钢2501", None)],
+    ]
+    database.iter_rows = lambda query, batch_size: iter(batches)       # type: ignore
+
+    batch: TickBatch = database.load_tick_batch("rb2501", Exchange.SHFE, start, start + timedelta(days=1))
+
+    assert len(batch) == 2
+    assert batch.meta == {"name": "螺纹钢2501"}
+    assert [tick.localtime for tick in batch] == [start + timedelta(milliseconds=100), None]
+
+
+def test_overview_overlapping_save(sqlite_database: MysqlDatabase):
+    """测试重复保存重叠的时间范围时汇总数量只增加新增的数据"""
+    sqlite_database.save_bar_data(create_bars(range(10)))
+
+    overview: DbBarOverview = get_bar_overview()
+    assert overview.count == 10
+    assert overview.start == datetime(2024, 1, 2, 9, 0)
+    assert overview.end == datetime(2024, 1, 2, 9, 9)
+
+    # 与已有数据重叠5条，新增5条
+    sqlite_database.save_bar_data(create_bars(range(5, 15), close=100))
+    overview = get_bar_overview()
+    assert overview.count == 15
+    assert overview.end == datetime(2024, 1, 2, 9, 14)
+
+    # 完全重复的数据不改变数量
+    sqlite_database.save_bar_data(create_bars(range(15)))
+    assert get_bar_overview().count == 15
+
+    # 在已有数据之前新增
+    sqlite_database.save_bar_data(create_bars(range(-3, 2)))
+    overview = get_bar_overview()
+    assert overview.count == 18
+    assert overview.start == datetime(2024, 1, 2, 8, 57)
+
+    assert DbBarData.select().count() == 18
+
+
+def test_overview_batch_save(sqlite_database: MysqlDatabase):
+    """测试批量导入列式数据时的汇总更新，以及关闭汇总更新后刷新"""
+    batch: BarBatch = BarBatch.from_bars(create_bars(range(10)), "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    sqlite_database.save_bar_batch(batch)
+    sqlite_database.save_bar_batch(batch[5:])
+    assert get_bar_overview().count == 10
+
+    sqlite_database.save_bar_batch(
+        BarBatch.from_bars(create_bars(range(10, 20)), "rb2501", Exchange.SHFE, Interval.MINUTE),
+        update_overview=False
+    )
+    assert get_bar_overview().count == 10
+
+    sqlite_database.refresh_bar_overview("rb2501", Exchange.SHFE, Interval.MINUTE)
+    assert get_bar_overview().count == 20
+
+
+def test_overview_stream_save(sqlite_database: MysqlDatabase):
+    """测试流式写入时直接累加数量并更新结束时间"""
+    sqlite_database.save_bar_data(create_bars(range(10)))
+    sqlite_database.save_bar_data(create_bars(range(10, 12)), stream=True)
+
+    overview: DbBarOverview = get_bar_overview()
+    assert overview.count == 12
+    assert overview.end == datetime(2024, 1, 2, 9, 11)
+
+
+def test_overview_repair(sqlite_database: MysqlDatabase):
+    """测试起止时间水位与数据不一致的汇总被重新统计，缺失的汇总被补充，多余的汇总被删除"""
+    sqlite_database.save_bar_data(create_bars(range(10)))
+
+    # 绕过接口直接删除数据，使汇总过期
+    DbBarData.delete().where(DbBarData.datetime >= datetime(2024, 1, 2, 9, 7)).execute()
+
+    # 没有汇总的数据
+    sqlite_database.insert_rows(DbBarData, BAR_COLUMNS, [
+        ("hc2501", "SHFE", "1m", datetime(2024, 1, 2, 9, i), *[0.0] * len(BarBatch.float_columns))
+        for i in range(3)
+    ])
+
+    # 没有数据的汇总
+    DbBarOverview.insert(
+        symbol="ag2501", exchange="SHFE", interval="1m", count=5,
+        start=datetime(2024, 1, 2), end=datetime(2024, 1, 3)
+    ).execute()
+
+    overviews: dict[str, BarOverview] = {o.symbol: o for o in sqlite_database.get_bar_overview()}
+
+    assert set(overviews) == {"rb2501", "hc2501"}
+    assert overviews["rb2501"].count == 7
+    assert overviews["rb2501"].end == datetime(2024, 1, 2, 9, 6)
+    assert overviews["rb2501"].exchange is Exchange.SHFE
+    assert overviews["hc2501"].count == 3
+
+
+def test_overview_match_watermark(sqlite_database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch):
+    """测试起止时间水位一致的汇总不重新统计"""
+    sqlite_database.save_bar_data(create_bars(range(10)))
+
+    refreshed: list[str] = []
+    monkeypatch.setattr(sqlite_database, "refresh_bar_overview", lambda symbol, *args: refreshed.append(symbol))
+
+    sqlite_database.get_bar_overview()
+    assert not refreshed
+
+
+def test_tick_overview_overlapping_save(sqlite_database: MysqlDatabase):
+    """测试重复保存重叠的TICK数据时汇总数量只增加新增的数据，过期的汇总被重新统计"""
+    ticks: list[TickData] = [
+        TickData(
+            gateway_name="DB",
+            symbol="rb2501",
+            exchange=Exchange.SHFE,
+            datetime=datetime(2024, 1, 2, 9, 0, i, tzinfo=ZoneInfo("Asia/Shanghai")),
+            last_price=3000 + i
+        )
+        for i in range(10)
+    ]
+
+    sqlite_database.save_tick_data(ticks[:6])
+    sqlite_database.save_tick_data(ticks[3:])
+    assert DbTickOverview.get().count == 10
+
+    DbTickData.delete().where(DbTickData.datetime < datetime(2024, 1, 2, 9, 0, 2)).execute()
+
+    overview, = sqlite_database.get_tick_overview()
+    assert overview.count == 8
+    assert overview.start == datetime(2024, 1, 2, 9, 0, 2)
+
+
+def test_partition_definition():
+    """测试分区以包含的最后一个月份命名"""
+    assert mysql_database.get_partition_definition(datetime(2024, 2, 1)) == (
+        "PARTITION p202401 VALUES LESS THAN ('2024-02-01 00:00:00')"
+    )
+    assert mysql_database.get_partition_definition(datetime(2025, 1, 1)) == (
+        "PARTITION p202412 VALUES LESS THAN ('2025-01-01 00:00:00')"
+    )
+    assert mysql_database.get_partition_definition(None) == "PARTITION pmax VALUES LESS THAN (MAXVALUE)"
+
+
+def test_ensure_partitions(database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch):
+    """测试写入新月份数据前拆分最后一个分区"""
+    monkeypatch.setattr(mysql_database, "PARTITION_MODE", "month")
+
+    db: FakeDb = database.db        # type: ignore
+    descriptions: list[tuple] = [("'2024-02-01 00:00:00'",), ("MAXVALUE",)]
+    db.results = [descriptions, descriptions]
+
+    rows: list[tuple] = [
+        ("rb2501", "SHFE", "1m", dt, *range(7))
+        for dt in [datetime(2024, 3, 15), datetime(2024, 4, 2)]
+    ]
+    database.insert_rows(DbBarData, BAR_COLUMNS, rows)
+
+    sqls: list[str] = [sql for sql, _ in db.executed]
+    assert sqls[0].startswith("SELECT PARTITION_DESCRIPTION")
+    assert sqls[1].startswith("SELECT PARTITION_DESCRIPTION")
+    assert sqls[2] == (
+        "ALTER TABLE `dbbardata` REORGANIZE PARTITION pmax INTO ("
+        "PARTITION p202402 VALUES LESS THAN ('2024-03-01 00:00:00'), "
+        "PARTITION p202403 VALUES LESS THAN ('2024-04-01 00:00:00'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+    assert sqls[3] == (
+        "ALTER TABLE `dbbardata` REORGANIZE PARTITION pmax INTO ("
+        "PARTITION p202404 VALUES LESS THAN ('2024-05-01 00:00:00'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+    assert sqls[4].startswith("INSERT INTO `dbbardata`")
+
+    assert database.partition_bounds["dbbardata"] == [
+        datetime(2024, 2, 1), datetime(2024, 3, 1), datetime(2024, 4, 1), datetime(2024, 5, 1), None
+    ]
+
+    # 分区已存在时直接写入
+    db.executed.clear()
+    database.insert_rows(DbBarData, BAR_COLUMNS, rows)
+    assert [sql[:6] for sql, _ in db.executed] == ["INSERT"]
+
+
+def test_ensure_partitions_unpartitioned(database: MysqlDatabase):
+    """测试未分区的数据表不做任何修改"""
+    db: FakeDb = database.db        # type: ignore
+
+    database.ensure_partitions(DbBarData, datetime(2024, 3, 1), datetime(2024, 5, 1))
+
+    assert len(db.executed) == 1
+    assert database.partition_bounds["dbbardata"] == []
+
+
+def test_drop_partitions(database: MysqlDatabase, monkeypatch: pytest.MonkeyPatch):
+    """测试删除截止月份之前的分区"""
+    monkeypatch.setattr(mysql_database, "DB_TZ", ZoneInfo("Asia/Shanghai"))
+
+    db: FakeDb = database.db        # type: ignore
+    db.results = [[
+        ("'2024-02-01 00:00:00'",),
+        ("'2024-03-01 00:00:00'",),
+        ("'2024-04-01 00:00:00'",),
+        ("MAXVALUE",)
+    ]]
+
+    count: int = database.drop_partitions(DbTickData, datetime(2024, 3, 20))
+
+    assert count == 2
+    assert db.executed[-1][0] == "ALTER TABLE `dbtickdata` DROP PARTITION p202401, p202402"
+    assert database.partition_bounds["dbtickdata"] == [datetime(2024, 4, 1), None]
+
+    # 没有需要删除的分区时不执行语句
+    db.results = [[("'2024-04-01 00:00:00'",), ("MAXVALUE",)]]
+    assert database.drop_partitions(DbTickData, datetime(2024, 3, 20)) == 0
+    assert db.executed[-1][0].startswith("SELECT PARTITION_DESCRIPTION")
+
+
+def test_load_bar_data_multi_empty(database: MysqlDatabase):
+    """测试没有合约时直接返回空结果而不查询数据库"""
+    database.iter_rows = None       # type: ignore
+
+    assert database.load_bar_data_multi([], Interval.MINUTE, datetime(2024, 1, 1), datetime(2024, 2, 1)) == {}
+
+
+def test_load_bar_data_multi(database: MysqlDatabase):
+    """测试多合约查询结果按请求的合约拆分，合约代码大小写不同时也能对应"""
+    start: datetime = datetime(2024, 1, 2, 9, 0)
+    zeros: tuple = (0.0,) * (len(BarBatch.float_columns) - 1)
+
+    def create_row(symbol: str, exchange: str, minute: int, close: float) -> tuple:
+        row: dict = dict(zip(BarBatch.float_columns, zeros))
+        row["close_price"] = close
+        return (symbol, exchange, start + timedelta(minutes=minute), *row.values())
+
+    # 数据库排序规则不区分大小写，返回的合约代码可能和请求的不同
+    batches: list[list[tuple]] = [
+        [create_row("IF2501", "CFFEX", 0, 1.0), create_row("if2501", "CFFEX", 1, 2.0)],
+        [create_row("if2501", "CFFEX", 2, 3.0), create_row("rb2501", "shfe", 0, 4.0)],
+        [create_row("xx2501", "SHFE", 0, 5.0)],
+    ]
+    database.iter_rows = lambda query, batch_size: iter(batches)       # type: ignore
+
+    vt_symbols: list[str] = ["IF2501.CFFEX", "rb2501.SHFE", "hc2501.SHFE"]
+    result: dict[str, BarBatch] = database.load_bar_data_multi(
+        vt_symbols, Interval.MINUTE, start, start + timedelta(days=1)
+    )
+
+    assert list(result) == vt_symbols
+
+    batch: BarBatch = result["IF2501.CFFEX"]
+    assert batch.vt_symbol == "IF2501.CFFEX"
+    assert batch.close_price.tolist() == [1.0, 2.0, 3.0]
+    assert batch.datetime.tolist() == [start + timedelta(minutes=i) for i in range(3)]
+
+    batch = result["rb2501.SHFE"]
+    assert batch.exchange is Exchange.SHFE
+    assert batch.close_price.tolist() == [4.0]
+
+    assert len(result["hc2501.SHFE"].datetime) == 0
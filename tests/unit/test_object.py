@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+数据对象单元测试
+"""
+
+from dataclasses import fields
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import (
+    TickData,
+    BarData,
+    CompactTickData,
+    CompactBarData,
+    BarBatch,
+    TickBatch
+)
+
+
+CHINA_TZ: ZoneInfo = ZoneInfo("Asia/Shanghai")
+
+
+def create_bars(count: int, tzinfo: ZoneInfo | None = CHINA_TZ) -> list[BarData]:
+    """创建每分钟一根的K线数据"""
+    return [
+        BarData(
+            gateway_name="CTP",
+            symbol="rb2501",
+            exchange=Exchange.SHFE,
+            datetime=datetime(2025, 1, 2, 9, i, tzinfo=tzinfo),
+            interval=Interval.MINUTE,
+            open_price=3000 + i,
+            close_price=3001 + i,
+            volume=10 * i
+        )
+        for i in range(count)
+    ]
+
+
+def create_ticks() -> list[TickData]:
+    """创建TICK数据，其中一条没有本地时间"""
+    return [
+        TickData(
+            gateway_name="CTP",
+            symbol="rb2501",
+            exchange=Exchange.SHFE,
+            datetime=datetime(2025, 1, 2, 9, 0, i, 500000, tzinfo=CHINA_TZ),
+            name="螺纹钢2501",
+            last_price=3000 + i,
+            bid_price_1=2999 + i,
+            localtime=datetime(2025, 1, 2, 9, 0, i, 600000) if i != 1 else None
+        )
+        for i in range(3)
+    ]
+
+
+@pytest.mark.parametrize(
+    "data_class, compact_class",
+    [(TickData, CompactTickData), (BarData, CompactBarData)]
+)
+def test_compact_fields(data_class: type, compact_class: type):
+    """测试紧凑数据类和原始数据类的字段一致"""
+    compact_fields: dict = {f.name: f for f in fields(compact_class)}
+
+    for f in fields(data_class):
+        compact_field = compact_fields.pop(f.name)
+        assert compact_field.type == f.type
+        assert compact_field.default == f.default
+        assert compact_field.default_factory == f.default_factory
+        assert compact_field.init == f.init
+
+    # 紧凑数据类额外将vt_symbol作为字段
+    assert list(compact_fields) == ["vt_symbol"]
+
+
+def test_compact_slots():
+    """测试紧凑数据对象没有__dict__且共享vt_symbol字符串"""
+    bar1: CompactBarData = CompactBarData(
+        gateway_name="DB",
+        symbol="rb2501",
+        exchange=Exchange.SHFE,
+        datetime=datetime(2025, 1, 2, 9, 0),
+        interval=Interval.MINUTE,
+        close_price=3000
+    )
+    bar2: CompactBarData = CompactBarData(
+        gateway_name="DB",
+        symbol="rb2501",
+        exchange=Exchange.SHFE,
+        datetime=datetime(2025, 1, 2, 9, 1)
+    )
+
+    assert not hasattr(bar1, "__dict__")
+    assert bar1.vt_symbol == "rb2501.SHFE"
+    assert bar1.vt_symbol is bar2.vt_symbol
+    assert bar1.extra is None
+
+    with pytest.raises(AttributeError):
+        bar1.custom = 1     # type: ignore
+
+    tick: CompactTickData = CompactTickData(
+        gateway_name="DB",
+        symbol="rb2501",
+        exchange=Exchange.SHFE,
+        datetime=datetime(2025, 1, 2, 9, 0),
+        last_price=3000
+    )
+    assert not hasattr(tick, "__dict__")
+    assert tick.vt_symbol is bar1.vt_symbol
+
+
+def test_bar_batch_from_bars():
+    """测试K线数据转换为列式数据"""
+    bars: list[BarData] = create_bars(5)
+    batch: BarBatch = BarBatch.from_bars(bars, "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    assert len(batch) == 5
+    assert batch.vt_symbol == "rb2501.SHFE"
+    assert batch.gateway_name == "CTP"
+    assert batch.tzinfo is CHINA_TZ
+    assert batch.meta == {"interval": Interval.MINUTE}
+
+    # 时间列保存为无时区的本地时间
+    assert batch.datetime.dtype == np.dtype("datetime64[us]")
+    assert batch.datetime[0] == np.datetime64("2025-01-02T09:00")
+    assert batch.close_price.tolist() == [3001, 3002, 3003, 3004, 3005]
+    assert batch.high_price.tolist() == [0] * 5
+
+    assert batch.to_bars() == bars
+
+
+def test_bar_batch_index():
+    """测试按行读取和切片"""
+    batch: BarBatch = BarBatch.from_bars(create_bars(5), "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    bar: BarData = batch[-1]
+    assert bar.datetime == datetime(2025, 1, 2, 9, 4, tzinfo=CHINA_TZ)
+    assert bar.datetime.tzinfo is CHINA_TZ
+    assert bar.interval == Interval.MINUTE
+    assert bar.open_price == 3004
+    assert bar.gateway_name == "CTP"
+
+    # 切片不复制数据
+    sliced: BarBatch = batch[1:3]
+    assert isinstance(sliced, BarBatch)
+    assert len(sliced) == 2
+    assert np.shares_memory(sliced.close_price, batch.close_price)
+    assert sliced.tzinfo is CHINA_TZ
+    assert sliced.meta == batch.meta
+    assert [b.close_price for b in sliced] == [3002, 3003]
+
+    assert not len(batch[5:])
+
+
+def test_bar_batch_naive():
+    """测试无时区时间的K线数据"""
+    bars: list[BarData] = create_bars(3, tzinfo=None)
+    batch: BarBatch = BarBatch.from_bars(bars, "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    assert batch.tzinfo is None
+    assert batch[0].datetime.tzinfo is None
+    assert batch.to_bars() == bars
+
+
+def test_bar_batch_empty():
+    """测试空列式数据"""
+    batch: BarBatch = BarBatch.from_bars([], "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    assert not len(batch)
+    assert batch.gateway_name == "DB"
+    assert batch.to_bars() == []
+    assert batch.to_polars().height == 0
+
+
+def test_bar_batch_to_polars():
+    """测试转换为Polars数据表"""
+    batch: BarBatch = BarBatch.from_bars(create_bars(3), "rb2501", Exchange.SHFE, Interval.MINUTE)
+    df: pl.DataFrame = batch.to_polars()
+
+    assert df.columns == ["datetime", *BarBatch.float_columns]
+    assert df.schema["datetime"] == pl.Datetime("us")
+    assert df["datetime"][0] == datetime(2025, 1, 2, 9, 0)
+    assert df["close_price"].to_list() == [3001, 3002, 3003]
+
+
+def test_tick_batch_localtime():
+    """测试TICK列式数据保留合约名称和本地时间"""
+    ticks: list[TickData] = create_ticks()
+    batch: TickBatch = TickBatch.from_ticks(ticks, "rb2501", Exchange.SHFE)
+
+    assert batch.meta == {"name": "螺纹钢2501"}
+    assert batch.localtime.dtype == np.dtype("datetime64[us]")
+    assert np.isnat(batch.localtime[1])
+
+    assert batch.to_ticks() == ticks
+    assert batch[0].localtime == datetime(2025, 1, 2, 9, 0, 0, 600000)
+    assert batch[1].localtime is None
+    assert batch[1:].to_ticks() == ticks[1:]
+
+    df: pl.DataFrame = batch.to_polars()
+    assert df["localtime"].null_count() == 1
+
+
+def test_tick_batch_default_localtime():
+    """测试未传入本地时间时填充为空"""
+    dts: np.ndarray = np.datetime64("2025-01-02T09:00", "us") + np.arange(2).astype("timedelta64[s]")
+    batch: TickBatch = TickBatch("rb2501", Exchange.SHFE, dts, last_price=[1, 2])
+
+    assert np.isnat(batch.localtime).all()
+    assert [tick.localtime for tick in batch] == [None, None]
+    assert batch[0].last_price == 1
+
+
+def test_batch_to_compact():
+    """测试列式数据转换为紧凑数据对象，属性与原始数据对象一致"""
+    batch: BarBatch = BarBatch.from_bars(create_bars(3), "rb2501", Exchange.SHFE, Interval.MINUTE)
+
+    bars: list[BarData] = batch.to_bars()
+    compact_bars: list[CompactBarData] = batch.to_bars(compact=True)
+
+    assert all(type(bar) is CompactBarData for bar in compact_bars)
+    assert compact_bars[0].vt_symbol is compact_bars[1].vt_symbol
+
+    for bar, compact_bar in zip(bars, compact_bars, strict=True):
+        for f in fields(BarData):
+            assert getattr(compact_bar, f.name) == getattr(bar, f.name)
+        assert compact_bar.vt_symbol == bar.vt_symbol
+
+    ticks: list[TickData] = create_ticks()
+    compact_ticks: list[CompactTickData] = TickBatch.from_ticks(ticks, "rb2501", Exchange.SHFE).to_ticks(compact=True)
+
+    assert all(type(tick) is CompactTickData for tick in compact_ticks)
+    assert [tick.localtime for tick in compact_ticks] == [tick.localtime for tick in ticks]
+    assert [tick.name for tick in compact_ticks] == ["螺纹钢2501"] * 3
+    assert [tick.bid_price_1 for tick in compact_ticks] == [tick.bid_price_1 for tick in ticks]
@@ -1,4 +1,5 @@
 from .template import AlphaDataset
+from .cache import FeatureCache
 from .utility import Segment, to_datetime
 from .processor import (
     process_drop_na,
@@ -11,6 +12,7 @@ from .processor import (
 
 __all__ = [
     "AlphaDataset",
+    "FeatureCache",
     "Segment",
     "to_datetime",
     "process_drop_na",
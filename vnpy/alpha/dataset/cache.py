@@ -0,0 +1,96 @@
+import ast
+import shutil
+import hashlib
+import inspect
+from functools import cache
+from pathlib import Path
+
+import polars as pl
+
+from . import ts_function, cs_function, ta_function
+from .utility import parse_expression
+
+
+# Version of feature calculation, increase it when results of the same
+# expression change without changes to the operator modules
+CACHE_VERSION: int = 1
+
+
+@cache
+def get_operator_hash() -> str:
+    """Get hash of operator module sources, which changes with any operator implementation"""
+    hasher = hashlib.sha256()
+
+    for module in [ts_function, cs_function, ta_function]:
+        try:
+            source: str = inspect.getsource(module)
+        except OSError:
+            source = module.__name__
+        hasher.update(source.encode())
+
+    return hasher.hexdigest()[:16]
+
+
+class FeatureCache:
+    """
+    On-disk cache of calculated feature columns
+
+    Each feature is saved as a single column file, keyed by the hash of its
+    normalized expression and the fingerprint of the input data. The fingerprint
+    also covers the cache version and operator sources, so that features cached
+    by older operator implementations are not loaded.
+    """
+
+    def __init__(self, cache_path: Path) -> None:
+        """Constructor"""
+        self.cache_path: Path = cache_path
+
+        if not self.cache_path.exists():
+            self.cache_path.mkdir(parents=True)
+
+    def get_fingerprint(self, df: pl.DataFrame) -> str:
+        """Get fingerprint of input data, covering schema, row order and all values"""
+        hasher = hashlib.sha256()
+        hasher.update(f"{CACHE_VERSION}.{get_operator_hash()}".encode())
+        hasher.update(pl.__version__.encode())
+        hasher.update(str(df.schema).encode())
+        hasher.update(df.hash_rows(seed=0).to_numpy().tobytes())
+        return hasher.hexdigest()[:32]
+
+    def get_file_path(self, fingerprint: str, expression: str) -> Path:
+        """Get cache file path of feature expression"""
+        # Syntax tree dump ignores whitespace and redundant parentheses
+        normalized: str = ast.dump(parse_expression(expression))
+        key: str = hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+        return self.cache_path.joinpath(fingerprint, f"{key}.parquet")
+
+    def load_feature(self, fingerprint: str, expression: str, height: int) -> pl.Series | None:
+        """Load cached feature column, return None if not cached"""
+        file_path: Path = self.get_file_path(fingerprint, expression)
+        if not file_path.exists():
+            return None
+
+        s: pl.Series = pl.read_parquet(file_path).to_series()
+        if len(s) != height:
+            return None
+
+        return s
+
+    def save_feature(self, fingerprint: str, expression: str, s: pl.Series) -> None:
+        """Save feature column into cache"""
+        file_path: Path = self.get_file_path(fingerprint, expression)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to temporary file first to avoid leaving incomplete cache file
+        temp_path: Path = file_path.with_suffix(".tmp")
+        s.alias("data").to_frame().write_parquet(temp_path)
+        temp_path.replace(file_path)
+
+    def clear(self) -> None:
+        """Remove all cached features"""
+        for path in self.cache_path.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
@@ -4,34 +4,17 @@ Cross Section Operators
 
 import polars as pl
 
-from .utility import DataProxy
 
-
-def cs_rank(feature: DataProxy) -> DataProxy:
+def cs_rank(feature: pl.Expr) -> pl.Expr:
     """Perform cross-sectional ranking"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rank().over("datetime")
-    )
-    return DataProxy(df)
+    return feature.rank().over("datetime")
 
 
-def cs_mean(feature: DataProxy) -> DataProxy:
+def cs_mean(feature: pl.Expr) -> pl.Expr:
     """Calculate cross-sectional mean"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").mean().over("datetime")
-    )
-    return DataProxy(df)
+    return feature.mean().over("datetime")
 
 
-def cs_std(feature: DataProxy) -> DataProxy:
+def cs_std(feature: pl.Expr) -> pl.Expr:
     """Calculate cross-sectional standard deviation"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").std().over("datetime")
-    )
-    return DataProxy(df)
+    return feature.std().over("datetime")
@@ -2,41 +2,118 @@
 Technical Analysis Operators
 """
 
+from collections.abc import Callable
+
 import talib
 import polars as pl
-import pandas as pd
-
-from .utility import DataProxy
+import numpy as np
 
 
-def to_pd_series(feature: DataProxy) -> pd.Series:
-    """Convert to pandas.Series data structure"""
-    series: pd.Series = feature.df.to_pandas().set_index(["datetime", "vt_symbol"])["data"]
-    return series
+def ta_sma(close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate SMA indicator by contract"""
+    return apply_by_contract(talib.SMA, [close], timeperiod=window)
 
 
-def to_pl_dataframe(series: pd.Series) -> pl.DataFrame:
-    """Convert to polars.DataFrame data structure"""
-    return pl.from_pandas(series.reset_index().rename(columns={0: "data"}))
+def ta_ema(close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate EMA indicator by contract"""
+    return apply_by_contract(talib.EMA, [close], timeperiod=window)
 
 
-def ta_rsi(close: DataProxy, window: int) -> DataProxy:
+def ta_rsi(close: pl.Expr, window: int) -> pl.Expr:
     """Calculate RSI indicator by contract"""
-    close_: pd.Series = to_pd_series(close)
+    return apply_by_contract(talib.RSI, [close], timeperiod=window)
+
+
+def ta_mom(close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate MOM indicator by contract"""
+    return apply_by_contract(talib.MOM, [close], timeperiod=window)
 
-    result: pd.Series = talib.RSI(close_, timeperiod=window)   # type: ignore
 
-    df: pl.DataFrame = to_pl_dataframe(result)
-    return DataProxy(df)
+def ta_roc(close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate ROC indicator by contract"""
+    return apply_by_contract(talib.ROC, [close], timeperiod=window)
 
 
-def ta_atr(high: DataProxy, low: DataProxy, close: DataProxy, window: int) -> DataProxy:
+def ta_trix(close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate TRIX indicator by contract"""
+    return apply_by_contract(talib.TRIX, [close], timeperiod=window)
+
+
+def ta_atr(high: pl.Expr, low: pl.Expr, close: pl.Expr, window: int) -> pl.Expr:
     """Calculate ATR indicator by contract"""
-    high_: pd.Series = to_pd_series(high)
-    low_: pd.Series = to_pd_series(low)
-    close_: pd.Series = to_pd_series(close)
+    return apply_by_contract(talib.ATR, [high, low, close], timeperiod=window)
+
+
+def ta_natr(high: pl.Expr, low: pl.Expr, close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate NATR indicator by contract"""
+    return apply_by_contract(talib.NATR, [high, low, close], timeperiod=window)
+
+
+def ta_adx(high: pl.Expr, low: pl.Expr, close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate ADX indicator by contract"""
+    return apply_by_contract(talib.ADX, [high, low, close], timeperiod=window)
+
+
+def ta_cci(high: pl.Expr, low: pl.Expr, close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate CCI indicator by contract"""
+    return apply_by_contract(talib.CCI, [high, low, close], timeperiod=window)
+
+
+def ta_willr(high: pl.Expr, low: pl.Expr, close: pl.Expr, window: int) -> pl.Expr:
+    """Calculate WILLR indicator by contract"""
+    return apply_by_contract(talib.WILLR, [high, low, close], timeperiod=window)
+
+
+def ta_mfi(high: pl.Expr, low: pl.Expr, close: pl.Expr, volume: pl.Expr, window: int) -> pl.Expr:
+    """Calculate MFI indicator by contract"""
+    return apply_by_contract(talib.MFI, [high, low, close, volume], timeperiod=window)
+
+
+def apply_by_contract(func: Callable[..., np.ndarray], inputs: list[pl.Expr], **kwargs: int) -> pl.Expr:
+    """
+    Apply talib function on the data of each contract
+
+    Rows are ordered by contract with time order kept, then talib is called on
+    contiguous numpy slices of each contract, so that the indicator state does
+    not leak across contracts. Results are restored to the original row order.
+    """
+    fields: list[str] = [f"input_{i}" for i in range(len(inputs))]
+
+    def apply(s: pl.Series) -> pl.Series:
+        """Calculate indicator for a struct series of contract and inputs"""
+        codes: np.ndarray = s.struct.field("vt_symbol").rank("dense").cast(pl.Int64).to_numpy()
+
+        # Only reorder when rows of each contract are not contiguous already
+        order: np.ndarray | None = None
+
+        if (np.diff(codes) < 0).any():
+            order = np.argsort(codes, kind="stable")
+            s = s.gather(order)
+            codes = codes[order]
+
+        arrays: list[np.ndarray] = [
+            np.ascontiguousarray(s.struct.field(field).cast(pl.Float64).to_numpy()) for field in fields
+        ]
+
+        # Start index of each contract
+        starts: np.ndarray = np.flatnonzero(np.diff(codes, prepend=-1))
+        ends: np.ndarray = np.append(starts[1:], len(s))
+
+        result: np.ndarray = np.full(len(s), np.nan)
+
+        for start, end in zip(starts, ends, strict=True):
+            result[start:end] = func(*[array[start:end] for array in arrays], **kwargs)
+
+        # Restore original row order
+        if order is not None:
+            restored: np.ndarray = np.empty_like(result)
+            restored[order] = result
+            result = restored
 
-    result: pd.Series = talib.ATR(high_, low_, close_, timeperiod=window)   # type: ignore
+        return pl.Series(result)
 
-    df: pl.DataFrame = to_pl_dataframe(result)
-    return DataProxy(df)
+    struct: pl.Expr = pl.struct(
+        pl.col("vt_symbol"),
+        *[expr.alias(field) for expr, field in zip(inputs, fields, strict=True)]
+    )
+    return struct.map_batches(apply, return_dtype=pl.Float64)
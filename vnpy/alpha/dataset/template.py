@@ -1,5 +1,7 @@
 import time
 from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import cast
 from collections.abc import Callable
 from multiprocessing import get_context
@@ -7,16 +9,19 @@ from multiprocessing.context import BaseContext
 
 import polars as pl
 import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc
 from tqdm import tqdm
 from alphalens.utils import get_clean_factor_and_forward_returns    # type: ignore
 from alphalens.tears import create_full_tear_sheet                  # type: ignore
 
 from ..logger import logger
+from .cache import FeatureCache
 from .utility import (
     to_datetime,
     Segment,
-    calculate_by_expression,
-    calculate_by_polars
+    ExpressionCompiler,
+    needs_full_history
 )
 
 
@@ -51,6 +56,9 @@ class AlphaDataset:
         self.feature_results: dict[str, pl.DataFrame] = {}
         self.label_expression: str = ""
 
+        # Ratio of operator calls removed by common subexpression elimination
+        self.dedup_ratio: float = 0
+
         self.process_type: str = process_type
         self.infer_processors: list = []
         self.learn_processors: list = []
@@ -87,63 +95,65 @@ class AlphaDataset:
         else:
             self.learn_processors.append(processor)
 
-    def prepare_data(self, filters: dict | None = None, max_workers: int | None = None) -> None:
+    def prepare_data(
+        self,
+        filters: dict | None = None,
+        max_workers: int | None = None,
+        cache: FeatureCache | None = None
+    ) -> None:
         """
         Generate required data
-        """
-        # List for feature data results
-        results: list = []
 
-        # Iterate through expressions for calculation
-        expressions: list[tuple[str, str | pl.expr.expr.Expr]] = list(self.feature_expressions.items())
-
-        if self.label_expression:
-            expressions.append(("label", self.label_expression))
+        Pass cache to load features calculated before on the same input data,
+        so that only the missing features are calculated. AlphaLab.prepare_dataset
+        passes the feature cache of the lab.
+        """
+        expressions: list[tuple[str, str | pl.expr.expr.Expr]] = self.get_expressions()
 
-        # Create process pool
         logger.info("开始计算表达式因子特征")
+        start: float = time.time()
 
-        args: list[tuple] = [(self.df, name, expression) for name, expression in expressions]
+        columns: dict[str, pl.Series] = {}
 
-        context: BaseContext = get_context("spawn")
+        # Load cached features of string expressions
+        fingerprint: str = ""
 
-        with context.Pool(processes=max_workers) as pool:
-            # Calculate all expressions in parallel
-            it = pool.imap(calculate_feature, args)
+        if cache:
+            fingerprint = cache.get_fingerprint(self.df)
 
-            # Collect results
-            for result in tqdm(it, total=len(args)):
-                results.append(result)
+            for name, expression in expressions:
+                if isinstance(expression, str):
+                    cached: pl.Series | None = cache.load_feature(fingerprint, expression, self.df.height)
+                    if cached is not None:
+                        columns[name] = cached.alias(name)
 
-        self.result_df = self.df.with_columns(results)
+            logger.info(f"从缓存加载因子特征{len(columns)}个")
 
-        # Merge result data factor features
-        logger.info("开始合并结果数据因子特征")
+        # Calculate features not in cache
+        pending: list[tuple[str, str | pl.expr.expr.Expr]] = [
+            (name, expression) for name, expression in expressions if name not in columns
+        ]
 
-        for name, feature_result in tqdm(self.feature_results.items()):
-            feature_result = feature_result.rename({"data": name})
-            self.result_df = self.result_df.join(feature_result, on=["datetime", "vt_symbol"], how="inner")
+        if pending:
+            results: pl.DataFrame = self.calculate_expressions(self.df, pending, max_workers)
 
-        # Generate raw data
-        raw_df = self.result_df.fill_null(float("nan"))
+            for name, expression in pending:
+                columns[name] = results[name]
 
-        if filters:
-            logger.info("开始筛选成分股数据")
+                if cache and isinstance(expression, str):
+                    cache.save_feature(fingerprint, expression, results[name])
 
-            filtered_df = pl.DataFrame()
+        self.result_df = self.df.with_columns([columns[name] for name, _ in expressions])
 
-            for vt_symbol, ranges in tqdm(filters.items(), total=len(filters)):
-                for start, end in ranges:
-                    temp_df = raw_df.filter(
-                        (pl.col("vt_symbol") == vt_symbol) & (pl.col("datetime") >= pl.lit(start)) & (pl.col("datetime") <= pl.lit(end))
-                    )
-                    filtered_df = pl.concat([filtered_df, temp_df])
+        logger.info(f"表达式因子特征计算完成，数量{len(expressions)}，耗时{time.time() - start:.2f}秒")
 
-            raw_df = filtered_df
+        # Merge result data factor features
+        logger.info("开始合并结果数据因子特征")
 
-        # Only keep feature columns
-        select_columns: list[str] = ["datetime", "vt_symbol"] + raw_df.columns[self.df.width:]
-        self.raw_df = raw_df.select(select_columns).sort(["datetime", "vt_symbol"])
+        self.result_df = sort_by_time(self.merge_feature_results(self.result_df))
+
+        # Generate raw data
+        self.raw_df = self.generate_raw_data(self.result_df, filters)
 
         # Generate inference data
         self.infer_df = self.raw_df
@@ -159,6 +169,238 @@ class AlphaDataset:
         for processor in self.learn_processors:
             self.learn_df = processor(df=self.learn_df)
 
+        # Keep data sorted by time, so that segments can be fetched by slicing
+        self.infer_df = sort_by_time(self.infer_df)
+        self.learn_df = sort_by_time(self.learn_df)
+
+    def append_data(self, df: pl.DataFrame, filters: dict | None = None) -> pl.DataFrame:
+        """
+        Append new bar data after prepare_data, and calculate features only for the new rows
+
+        History rows within the max lookback of feature expressions are included in
+        calculation. Features depending on all history rows, such as technical indicators
+        using recursive smoothing, are calculated on the full data, so that results are
+        the same as prepare_data on all rows. Infer processors are applied to the new rows,
+        together with the rows they are fitted on. Return inference data of the new rows.
+
+        Labels of existing rows and learning data are not updated.
+        """
+        # Only keep rows after existing data
+        last_datetime: datetime = cast(datetime, self.df["datetime"].max())
+
+        df = df.select(self.df.columns).cast(self.df.schema)
+        df = df.filter(pl.col("datetime") > last_datetime)
+
+        if df.is_empty():
+            logger.info("没有需要追加的新数据")
+            return self.infer_df.clear()
+
+        expressions: list[tuple[str, str | pl.expr.expr.Expr]] = self.get_expressions()
+        all_df: pl.DataFrame = pl.concat([self.df, df])
+
+        window_expressions: list[tuple[str, str | pl.expr.expr.Expr]] = []
+        full_expressions: list[tuple[str, str | pl.expr.expr.Expr]] = []
+
+        for name, expression in expressions:
+            if needs_full_history(expression):
+                full_expressions.append((name, expression))
+            else:
+                window_expressions.append((name, expression))
+
+        columns: dict[str, pl.Series] = {}
+
+        # Calculate features with required history rows
+        if window_expressions:
+            compiler: ExpressionCompiler = ExpressionCompiler()
+            for name, expression in window_expressions:
+                compiler.add_feature(name, expression)
+
+            history_df: pl.DataFrame = self.get_history(compiler.lookback, df["vt_symbol"].unique().to_list())
+
+            logger.info(f"开始计算追加数据因子特征，新数据{df.height}行，历史数据{history_df.height}行")
+
+            results: pl.DataFrame = self.calculate_expressions(pl.concat([history_df, df]), window_expressions)
+            columns.update(results.tail(df.height).to_dict())
+
+        # Calculate features depending on all history rows with full data
+        if full_expressions:
+            logger.info(f"开始计算依赖全部历史数据的因子特征{len(full_expressions)}个，数据{all_df.height}行")
+
+            results = self.calculate_expressions(all_df, full_expressions)
+            columns.update(results.tail(df.height).to_dict())
+
+        result_df: pl.DataFrame = df.with_columns([columns[name] for name, _ in expressions])
+        result_df = sort_by_time(self.merge_feature_results(result_df))
+
+        raw_df: pl.DataFrame = self.generate_raw_data(result_df, filters)
+
+        # Apply infer processors with rows used for fitting
+        reference_df: pl.DataFrame = self.get_fit_data()
+
+        infer_df: pl.DataFrame = pl.concat([reference_df, raw_df])
+        for processor in self.infer_processors:
+            infer_df = processor(df=infer_df)
+
+        infer_df = sort_by_time(infer_df.filter(pl.col("datetime") > last_datetime))
+
+        # Update data
+        self.df = all_df
+        self.result_df = pl.concat([self.result_df, result_df], how="vertical_relaxed")
+        self.raw_df = pl.concat([self.raw_df, raw_df], how="vertical_relaxed")
+        self.infer_df = pl.concat([self.infer_df, infer_df], how="vertical_relaxed")
+
+        return infer_df
+
+    def get_expressions(self) -> list[tuple[str, str | pl.expr.expr.Expr]]:
+        """
+        Get all feature expressions and label expression
+        """
+        expressions: list[tuple[str, str | pl.expr.expr.Expr]] = list(self.feature_expressions.items())
+
+        if self.label_expression:
+            expressions.append(("label", self.label_expression))
+
+        return expressions
+
+    def get_history(self, lookback: int, vt_symbols: list[str]) -> pl.DataFrame:
+        """
+        Get history rows required for calculating features of new data
+
+        All rows after the earliest start of the last lookback rows of each contract
+        are included, so that cross-sectional operators have complete data on every date.
+        """
+        if not lookback:
+            return self.df.clear()
+
+        starts: pl.DataFrame = (
+            self.df.filter(pl.col("vt_symbol").is_in(vt_symbols))
+            .group_by("vt_symbol")
+            .agg(pl.col("datetime").sort().tail(lookback).first())
+        )
+
+        start: datetime | None = cast(datetime | None, starts["datetime"].min())
+        if start is None:
+            return self.df.clear()
+
+        return self.df.filter(pl.col("datetime") >= start)
+
+    def get_fit_data(self) -> pl.DataFrame:
+        """
+        Get raw data in the fit time ranges of infer processors
+        """
+        condition: pl.Expr = pl.lit(False)
+
+        for processor in self.infer_processors:
+            keywords: dict = getattr(processor, "keywords", {})
+
+            fit_start_time: datetime | str | None = keywords.get("fit_start_time", None)
+            fit_end_time: datetime | str | None = keywords.get("fit_end_time", None)
+
+            if fit_start_time and fit_end_time:
+                condition |= pl.col("datetime").is_between(to_datetime(fit_start_time), to_datetime(fit_end_time))
+
+        return self.raw_df.filter(condition)
+
+    def merge_feature_results(self, result_df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Merge result data factor features
+        """
+        for name, feature_result in self.feature_results.items():
+            feature_result = feature_result.rename({"data": name})
+            result_df = result_df.join(feature_result, on=["datetime", "vt_symbol"], how="inner")
+
+        return result_df
+
+    def generate_raw_data(self, result_df: pl.DataFrame, filters: dict | None = None) -> pl.DataFrame:
+        """
+        Generate raw data with feature columns only
+        """
+        raw_df: pl.DataFrame = result_df.fill_null(float("nan"))
+
+        if filters:
+            logger.info("开始筛选成分股数据")
+
+            raw_df = filter_by_ranges(raw_df, filters)
+
+        select_columns: list[str] = ["datetime", "vt_symbol"] + raw_df.columns[self.df.width:]
+        return sort_by_time(raw_df.select(select_columns))
+
+    def calculate_expressions(
+        self,
+        df: pl.DataFrame,
+        expressions: list[tuple[str, str | pl.expr.expr.Expr]],
+        max_workers: int | None = None
+    ) -> pl.DataFrame:
+        """
+        Calculate feature expressions on input data
+
+        All feature expressions are compiled into one Polars query plan by default,
+        with operator calls shared by features calculated only once. Pass max_workers
+        to split them into chunks calculated in a process pool.
+        """
+        # Find shared subexpressions across all features
+        compiler: ExpressionCompiler = ExpressionCompiler()
+
+        for name, expression in expressions:
+            compiler.add_feature(name, expression)
+
+        self.dedup_ratio = compiler.get_dedup_ratio()
+
+        logger.info(
+            f"公共子表达式消除，算子调用{compiler.total_count}个，"
+            f"去重后{len(compiler.call_counts)}个，去重比例{self.dedup_ratio:.1%}"
+        )
+
+        # Calculate all expressions in a single query plan
+        if not max_workers or max_workers <= 1:
+            return compiler.build(df.lazy()).collect()
+        # Split expressions into chunks and calculate them in process pool
+        else:
+            return self.calculate_in_pool(df, expressions, max_workers)
+
+    def calculate_in_pool(
+        self,
+        df: pl.DataFrame,
+        expressions: list[tuple[str, str | pl.expr.expr.Expr]],
+        max_workers: int
+    ) -> pl.DataFrame:
+        """
+        Calculate expression chunks in process pool
+
+        Input data is written once to an Arrow IPC file which workers open with memory map,
+        and results are returned by files in the same way, instead of pickling DataFrames.
+        """
+        chunks: list[list] = [expressions[i::max_workers] for i in range(max_workers)]
+
+        columns: dict[str, pl.Series] = {}
+
+        with TemporaryDirectory(prefix="alpha_", ignore_cleanup_errors=True) as folder:
+            input_path: Path = Path(folder).joinpath("input.arrow")
+            df.write_ipc(input_path, compression="uncompressed")
+
+            args: list[tuple] = []
+            for i, chunk in enumerate(chunks):
+                if chunk:
+                    result_path: Path = Path(folder).joinpath(f"result_{i}.arrow")
+                    args.append((str(input_path), chunk, str(result_path)))
+
+            context: BaseContext = get_context("spawn")
+
+            with context.Pool(processes=max_workers) as pool:
+                it = pool.imap(calculate_features_file, args)
+
+                for path in tqdm(it, total=len(args)):
+                    # Read into memory so that the file can be removed with the folder
+                    with pa.OSFile(path) as source:
+                        table: pa.Table = ipc.open_file(source).read_all()
+
+                    chunk_df: pl.DataFrame = cast(pl.DataFrame, pl.from_arrow(table))
+
+                    for column in chunk_df.get_columns():
+                        columns[column.name] = column
+
+        return pl.DataFrame([columns[name] for name, _ in expressions])
+
     def fetch_raw(self, segment: Segment) -> pl.DataFrame:
         """
         Get raw data for a specific segment
@@ -248,32 +490,117 @@ class AlphaDataset:
 def query_by_time(df: pl.DataFrame, start: datetime | str = "", end: datetime | str = "") -> pl.DataFrame:
     """
     Filter DataFrame based on time range
+
+    DataFrame sorted by sort_by_time is located with binary search on datetime
+    column and returned as a zero-copy slice. Other DataFrames, such as those
+    assigned by user or loaded from datasets saved before sorting, are filtered
+    and then sorted.
     """
+    datetimes: pl.Series = df["datetime"]
+
+    if not datetimes.flags["SORTED_ASC"]:
+        if start:
+            df = df.filter(pl.col("datetime") >= to_datetime(start))
+        if end:
+            df = df.filter(pl.col("datetime") <= to_datetime(end))
+        return sort_by_time(df)
+
+    offset: int = 0
     if start:
-        start = to_datetime(start)
-        df = df.filter(pl.col("datetime") >= start)
+        offset = datetimes.search_sorted(to_datetime(start), side="left")
 
+    stop: int = df.height
     if end:
-        end = to_datetime(end)
-        df = df.filter(pl.col("datetime") <= end)
+        stop = datetimes.search_sorted(to_datetime(end), side="right")
+
+    return df.slice(offset, max(stop - offset, 0))
+
+
+def sort_by_time(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Sort DataFrame by datetime and vt_symbol for time range query
+    """
+    return df.sort(["datetime", "vt_symbol"]).with_columns(pl.col("datetime").set_sorted())
+
+
+def filter_by_ranges(df: pl.DataFrame, filters: dict[str, list[tuple[datetime, datetime]]]) -> pl.DataFrame:
+    """
+    Filter DataFrame based on time ranges of each contract
+
+    Ranges of each contract are merged to be disjoint, then every row is matched to the
+    latest range starting before it by a single asof join.
+    """
+    symbols: list[str] = []
+    starts: list[datetime] = []
+    ends: list[datetime] = []
+
+    for vt_symbol, ranges in filters.items():
+        for start, end in merge_ranges(ranges):
+            symbols.append(vt_symbol)
+            starts.append(start)
+            ends.append(end)
+
+    dtype: pl.DataType = df.schema["datetime"]
+
+    ranges_df: pl.DataFrame = pl.DataFrame(
+        {"vt_symbol": symbols, "range_start": starts, "range_end": ends},
+        schema={"vt_symbol": df.schema["vt_symbol"], "range_start": dtype, "range_end": dtype}
+    ).sort("range_start")
+
+    df = df.sort("datetime").join_asof(
+        ranges_df,
+        left_on="datetime",
+        right_on="range_start",
+        by="vt_symbol",
+        strategy="backward",
+        check_sortedness=False
+    )
+
+    return df.filter(pl.col("datetime") <= pl.col("range_end")).drop("range_start", "range_end")
+
+
+def merge_ranges(ranges: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """
+    Merge overlapping time ranges
+    """
+    merged: list[tuple[datetime, datetime]] = []
+
+    for start, end in sorted((to_datetime(start), to_datetime(end)) for start, end in ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def calculate_features(args: tuple[pl.DataFrame, list[tuple[str, str | pl.expr.expr.Expr]]]) -> pl.DataFrame:
+    """
+    Calculate features by expressions in a single lazy query
+    """
+    df, expressions = args
+
+    compiler: ExpressionCompiler = ExpressionCompiler()
+
+    for name, expression in expressions:
+        compiler.add_feature(name, expression)
 
-    return df.sort(["datetime", "vt_symbol"])
+    return compiler.build(df.lazy()).collect()
 
 
-def calculate_feature(args: tuple[pl.DataFrame, str, str | pl.expr.expr.Expr]) -> pl.Series:
+def calculate_features_file(args: tuple[str, list[tuple[str, str | pl.expr.expr.Expr]], str]) -> str:
     """
-    Calculate feature by expression
+    Calculate features with input and result data shared by Arrow IPC files
     """
-    start = time.time()
+    input_path, expressions, result_path = args
 
-    df, name, expression = args
+    # Memory map input file without copying data into the worker process
+    with pa.memory_map(input_path) as source:
+        table: pa.Table = ipc.open_file(source).read_all()
 
-    if isinstance(expression, pl.expr.expr.Expr):
-        result = calculate_by_polars(df, expression)["data"].alias(name)
-    else:
-        result = calculate_by_expression(df, expression)["data"].alias(name)
+    df: pl.DataFrame = cast(pl.DataFrame, pl.from_arrow(table))
 
-    end = time.time()
-    print(f"Feature calculation {name} took: {end - start} seconds | {expression}")
+    result_df: pl.DataFrame = calculate_features((df, expressions))
+    result_df.write_ipc(result_path, compression="uncompressed")
 
-    return result
+    return result_path
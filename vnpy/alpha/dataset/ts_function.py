@@ -2,225 +2,204 @@
 Time Series Operators
 """
 
-from typing import cast
+from collections.abc import Callable
 
-from scipy import stats     # type: ignore
 import polars as pl
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from .utility import DataProxy
 
-
-def ts_delay(feature: DataProxy, window: int) -> DataProxy:
+def ts_delay(feature: pl.Expr, window: int) -> pl.Expr:
     """Get the value from a fixed time in the past"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").shift(window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.shift(window).over("vt_symbol")
 
 
-def ts_min(feature: DataProxy, window: int) -> DataProxy:
+def ts_min(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the minimum value over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_min(window, min_samples=1).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.rolling_min(window, min_samples=1).over("vt_symbol")
 
 
-def ts_max(feature: DataProxy, window: int) -> DataProxy:
+def ts_max(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the maximum value over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_max(window, min_samples=1).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.rolling_max(window, min_samples=1).over("vt_symbol")
 
 
-def ts_argmax(feature: DataProxy, window: int) -> DataProxy:
+def ts_argmax(feature: pl.Expr, window: int) -> pl.Expr:
     """Return the index of the maximum value over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: cast(int, s.arg_max()) + 1, window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return rolling_apply(feature, window, argmax_windows)
 
 
-def ts_argmin(feature: DataProxy, window: int) -> DataProxy:
+def ts_argmin(feature: pl.Expr, window: int) -> pl.Expr:
     """Return the index of the minimum value over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: cast(int, s.arg_min()) + 1, window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return rolling_apply(feature, window, lambda windows: argmax_windows(-windows))
 
 
-def ts_rank(feature: DataProxy, window: int) -> DataProxy:
+def ts_rank(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the percentile rank of the current value within the window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: stats.percentileofscore(s, s[-1]) / 100, window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return rolling_apply(feature, window, rank_windows)
 
 
-def ts_sum(feature: DataProxy, window: int) -> DataProxy:
+def ts_sum(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the sum over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_sum(window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.rolling_sum(window).over("vt_symbol")
 
 
-def ts_mean(feature: DataProxy, window: int) -> DataProxy:
+def ts_mean(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the mean over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").cast(pl.Float32).rolling_map(lambda s: np.nanmean(s), window, min_samples=1).over("vt_symbol")
-    )
-    return DataProxy(df)
+    # NaN values are skipped like nulls, as np.nanmean does
+    return feature.cast(pl.Float32).fill_nan(None).rolling_mean(window, min_samples=1).over("vt_symbol")
 
 
-def ts_std(feature: DataProxy, window: int) -> DataProxy:
+def ts_std(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the standard deviation over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: np.nanstd(s, ddof=0), window, min_samples=1).over("vt_symbol")
-    )
-    return DataProxy(df)
+    # NaN values are skipped like nulls, as np.nanstd does
+    return feature.cast(pl.Float64).fill_nan(None).rolling_std(window, min_samples=1, ddof=0).over("vt_symbol")
 
 
-def ts_slope(feature: DataProxy, window: int) -> DataProxy:
+def ts_slope(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the slope of linear regression over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: np.polyfit(np.arange(len(s)), s, 1)[0], window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    _, cov_xy, var_x = get_regression(feature, window)
+    return (cov_xy / var_x).over("vt_symbol")
 
 
-def ts_quantile(feature: DataProxy, window: int, quantile: float) -> DataProxy:
+def ts_quantile(feature: pl.Expr, window: int, quantile: float) -> pl.Expr:
     """Calculate the quantile value over a rolling window"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: s.quantile(quantile=quantile, interpolation="linear"), window).over("vt_symbol")
-    )
-    return DataProxy(df)
+    return rolling_apply(feature, window, lambda windows: quantile_windows(windows, quantile))
 
 
-def ts_rsquare(feature: DataProxy, window: int) -> DataProxy:
+def ts_rsquare(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the R-squared value of linear regression over a rolling window"""
-    def rsquare(s: pl.Series) -> float:
-        """Calculate R-squared value for a series"""
-        if s.std():
-            return float(stats.linregress(np.arange(len(s)), s).rvalue ** 2)
-        else:
-            return float("nan")
+    y: pl.Expr = feature.cast(pl.Float64)
+
+    _, cov_xy, var_x = get_regression(y, window)
+    var_y: pl.Expr = y.rolling_var(window, ddof=0) * window
 
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: rsquare(s), window).over("vt_symbol"))
-    return DataProxy(df)
+    rsquare: pl.Expr = (cov_xy ** 2 / (var_x * var_y)).clip(upper_bound=1)
 
+    # R-squared is undefined for constant values
+    constant: pl.Expr = y.rolling_max(window) == y.rolling_min(window)
+    return pl.when(constant).then(float("nan")).otherwise(rsquare).over("vt_symbol")
 
-def ts_resi(feature: DataProxy, window: int) -> DataProxy:
+
+def ts_resi(feature: pl.Expr, window: int) -> pl.Expr:
     """Calculate the residual of linear regression over a rolling window"""
-    def resi(s: pl.Series) -> float:
-        """Calculate residual for a series"""
-        x: np.ndarray = np.arange(len(s))
-        y: np.ndarray = s.to_numpy()
-        coefficients: np.ndarray = np.polyfit(x, y, 1)
-        predictions: np.ndarray = coefficients[0] * x + coefficients[1]
-        resi: np.ndarray = y - predictions
-        return float(resi[-1])
-
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").rolling_map(lambda s: resi(s), window).over("vt_symbol")
-    )
-    return DataProxy(df)
-
-
-def ts_corr(feature1: DataProxy, feature2: DataProxy, window: int) -> DataProxy:
-    """Calculate the correlation between two features over a rolling window"""
-    df_merged: pl.DataFrame = feature1.df.join(feature2.df, on=["datetime", "vt_symbol"])
+    y: pl.Expr = feature.cast(pl.Float64)
 
-    df: pl.DataFrame = df_merged.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.rolling_corr("data", "data_right", window_size=window, min_samples=1).over("vt_symbol").alias("data")
-    )
+    mean_y, cov_xy, var_x = get_regression(y, window)
 
-    df = df.with_columns(
-        pl.when(pl.col("data").is_infinite()).then(None).otherwise(pl.col("data")).alias("data")
-    )
+    # Residual of the last value in window, whose x is window - 1
+    resi: pl.Expr = y - mean_y - cov_xy / var_x * (window - 1) / 2
+    return resi.over("vt_symbol")
 
-    return DataProxy(df)
 
+def get_regression(y: pl.Expr, window: int) -> tuple[pl.Expr, pl.Expr, float]:
+    """
+    Get rolling mean of y, sum of covariance and sum of x variance for linear regression
 
-def ts_less(feature1: DataProxy, feature2: DataProxy | float) -> DataProxy:
-    """Return the minimum value between two features"""
-    if isinstance(feature2, DataProxy):
-        df_merged: pl.DataFrame = feature1.df.join(feature2.df, on=["datetime", "vt_symbol"])
-    else:
-        df_merged = feature1.df.with_columns(pl.lit(feature2).alias("data_right"))
+    x is the index within window, so the sum of x * y is derived from the rolling sum
+    of row number * y, and only rolling sums are required instead of fitting each window.
+    """
+    y = y.cast(pl.Float64)
+    index: pl.Expr = pl.int_range(pl.len(), dtype=pl.Int64).cast(pl.Float64)
 
-    df: pl.DataFrame = df_merged.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.min_horizontal("data", "data_right").over("vt_symbol").alias("data")
-    )
+    sum_y: pl.Expr = y.rolling_sum(window)
+    sum_xy: pl.Expr = (y * index).rolling_sum(window) - (index - (window - 1)) * sum_y
 
-    return DataProxy(df)
+    # Mean of x is (window - 1) / 2
+    cov_xy: pl.Expr = sum_xy - sum_y * (window - 1) / 2
+    var_x: float = window * (window ** 2 - 1) / 12
 
+    return sum_y / window, cov_xy, var_x
 
-def ts_greater(feature1: DataProxy, feature2: DataProxy | float) -> DataProxy:
-    """Return the maximum value between two features"""
-    if isinstance(feature2, DataProxy):
-        df_merged: pl.DataFrame = feature1.df.join(feature2.df, on=["datetime", "vt_symbol"])
 
-    else:
-        df_merged = feature1.df.with_columns(pl.lit(feature2).alias("data_right"))
+def ts_corr(feature1: pl.Expr, feature2: pl.Expr, window: int) -> pl.Expr:
+    """Calculate the correlation between two features over a rolling window"""
+    corr: pl.Expr = pl.rolling_corr(feature1, feature2, window_size=window, min_samples=1).over("vt_symbol")
+    return pl.when(corr.is_infinite()).then(None).otherwise(corr)
+
+
+def ts_less(feature1: pl.Expr, feature2: pl.Expr | float) -> pl.Expr:
+    """Return the minimum value between two features"""
+    return pl.min_horizontal(feature1, feature2)
 
-    df: pl.DataFrame = df_merged.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.max_horizontal("data", "data_right").over("vt_symbol").alias("data")
-    )
 
-    return DataProxy(df)
+def ts_greater(feature1: pl.Expr, feature2: pl.Expr | float) -> pl.Expr:
+    """Return the maximum value between two features"""
+    return pl.max_horizontal(feature1, feature2)
 
 
-def ts_log(feature: DataProxy) -> DataProxy:
+def ts_log(feature: pl.Expr) -> pl.Expr:
     """Calculate the natural logarithm of the feature"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").log().over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.log()
 
 
-def ts_abs(feature: DataProxy) -> DataProxy:
+def ts_abs(feature: pl.Expr) -> pl.Expr:
     """Calculate the absolute value of the feature"""
-    df: pl.DataFrame = feature.df.select(
-        pl.col("datetime"),
-        pl.col("vt_symbol"),
-        pl.col("data").abs().over("vt_symbol")
-    )
-    return DataProxy(df)
+    return feature.abs()
+
+
+def rolling_apply(feature: pl.Expr, window: int, func: Callable[[np.ndarray], np.ndarray]) -> pl.Expr:
+    """
+    Apply vectorized function on all rolling windows of each contract
+
+    func takes a 2D array with one window per row and returns one value per window.
+    Windows containing null values return null, the same as rolling_map.
+    """
+    def apply(s: pl.Series) -> pl.Series:
+        """Calculate values of all windows in a contract"""
+        values: np.ndarray = s.cast(pl.Float64).to_numpy()
+        result: np.ndarray = np.full(len(values), np.nan)
+
+        if len(values) >= window:
+            result[window - 1:] = func(sliding_window_view(values, window))
+
+        return pl.Series(result)
+
+    full: pl.Expr = feature.is_not_null().cast(pl.Int32).rolling_sum(window) == window
+    return pl.when(full).then(feature.map_batches(apply, return_dtype=pl.Float64)).over("vt_symbol")
+
+
+def argmax_windows(windows: np.ndarray) -> np.ndarray:
+    """Get 1-based index of the first maximum value in each window, NaN values are ignored"""
+    filled: np.ndarray = np.where(np.isnan(windows), -np.inf, windows)
+    index: np.ndarray = filled.argmax(axis=1)
+
+    # Prefer -inf values to NaN values when there is no larger value in window
+    lowest: np.ndarray = filled[np.arange(len(filled)), index] == -np.inf
+    if lowest.any():
+        infinite: np.ndarray = windows[lowest] == -np.inf
+        index[lowest] = np.where(infinite.any(axis=1), infinite.argmax(axis=1), 0)
+
+    return index + 1
+
+
+def rank_windows(windows: np.ndarray) -> np.ndarray:
+    """Get percentile rank of the last value in each window, the same as stats.percentileofscore"""
+    last: np.ndarray = windows[:, -1:]
+
+    left: np.ndarray = np.count_nonzero(windows < last, axis=1)
+    right: np.ndarray = np.count_nonzero(windows <= last, axis=1)
+    percentile: np.ndarray = (left + right + (left < right)) * (50.0 / windows.shape[1])
+
+    # Percentile is NaN if window contains NaN values
+    percentile[np.isnan(windows).any(axis=1)] = np.nan
+
+    return percentile / 100
+
+
+def quantile_windows(windows: np.ndarray, quantile: float) -> np.ndarray:
+    """Get quantile of each window with linear interpolation, NaN values are sorted last"""
+    ordered: np.ndarray = np.sort(windows, axis=1)
+
+    position: float = quantile * (windows.shape[1] - 1)
+    lower: int = int(np.floor(position))
+    upper: int = int(np.ceil(position))
+
+    lower_values: np.ndarray = ordered[:, lower]
+    upper_values: np.ndarray = ordered[:, upper]
+
+    # Skip interpolation between equal values to keep infinite values
+    with np.errstate(invalid="ignore"):
+        interpolated: np.ndarray = lower_values + (upper_values - lower_values) * (position - lower)
+
+    return np.where(lower_values == upper_values, lower_values, interpolated)
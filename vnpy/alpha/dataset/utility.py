@@ -1,155 +1,341 @@
+import ast
+import inspect
+import operator
 from datetime import datetime
 from enum import Enum
-from typing import Union
+from functools import cache
+from collections.abc import Callable
 
 import polars as pl
 
 
-class DataProxy:
-    """Feature data proxy"""
+# Binary operators supported in feature expressions
+BINARY_OPERATORS: dict[type, Callable] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
 
-    def __init__(self, df: pl.DataFrame) -> None:
-        """Constructor"""
-        self.name: str = df.columns[-1]
-        self.df: pl.DataFrame = df.rename({self.name: "data"})
 
-        # Note that for numerical expressions, variables should be placed before numbers. e.g. a * 2
+# Partition columns of operator groups, nested operators with different partitions
+# are calculated in separate stages, since window expressions are evaluated within
+# the groups of the outer window in Polars
+OPERATOR_PARTITIONS: dict[str, str] = {
+    "ts_": "vt_symbol",
+    "cs_": "datetime",
+    "ta_": "vt_symbol",
+}
 
-    def result(self, s: pl.Series) -> "DataProxy":
-        """Convert series data to feature object"""
-        result: pl.DataFrame = self.df[["datetime", "vt_symbol"]]
-        result = result.with_columns(other=s)
 
-        return DataProxy(result)
+@cache
+def get_operators() -> dict[str, Callable]:
+    """Get all operator functions available in feature expressions"""
+    # Import operators locally to avoid circular import
+    from . import ts_function, cs_function, ta_function
 
-    def __add__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Addition operation"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] + other.df["data"]
-        else:
-            s = self.df["data"] + other
-        return self.result(s)
+    operators: dict[str, Callable] = {"abs": abs}
 
-    def __sub__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Subtraction operation"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] - other.df["data"]
-        else:
-            s = self.df["data"] - other
-        return self.result(s)
+    for module in [ts_function, cs_function, ta_function]:
+        for name, func in vars(module).items():
+            if name.startswith(tuple(OPERATOR_PARTITIONS)) and callable(func):
+                operators[name] = func
 
-    def __mul__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Multiplication operation"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] * other.df["data"]
-        else:
-            s = self.df["data"] * other
-        return self.result(s)
+    return operators
 
-    def __rmul__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Right multiplication operation"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] * other.df["data"]
-        else:
-            s = self.df["data"] * other
-        return self.result(s)
 
-    def __truediv__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Division operation"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] / other.df["data"]
-        else:
-            s = self.df["data"] / other
-        return self.result(s)
-
-    def __abs__(self) -> "DataProxy":
-        """Get absolute value"""
-        s: pl.Series = self.df["data"].abs()
-        return self.result(s)
-
-    def __gt__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Greater than comparison"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] > other.df["data"]
-        else:
-            s = self.df["data"] > other
-        return self.result(s)
+class ExpressionCompiler:
+    """
+    Compile feature expression strings into a single Polars query plan
 
-    def __ge__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Greater than or equal comparison"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] >= other.df["data"]
-        else:
-            s = self.df["data"] >= other
-        return self.result(s)
+    Column names are converted to pl.col and operators are called with the compiled
+    arguments. Arguments using window partitions different from the operator are
+    materialized as temporary columns in earlier stages of the plan.
 
-    def __lt__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Less than comparison"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] < other.df["data"]
-        else:
-            s = self.df["data"] < other
-        return self.result(s)
+    Operator calls shared by multiple features are also materialized, so that each
+    unique subexpression is only calculated once.
+    """
 
-    def __le__(self, other: Union["DataProxy", int, float]) -> "DataProxy":
-        """Less than or equal comparison"""
-        if isinstance(other, DataProxy):
-            s: pl.Series = self.df["data"] <= other.df["data"]
-        else:
-            s = self.df["data"] <= other
-        return self.result(s)
+    def __init__(self) -> None:
+        """"""
+        self.stages: list[dict[str, pl.Expr]] = []
+        self.features: dict[str, pl.Expr | tuple[ast.expr, str]] = {}
+
+        self.temp_count: int = 0
+
+        # Operator call counts, key is the dump of syntax tree node
+        self.call_counts: dict[str, int] = {}
+        self.total_count: int = 0
+
+        # History rows of each contract required by all features
+        self.lookback: int = 0
 
-    def __eq__(self, other: Union["DataProxy", int, float]) -> "DataProxy":    # type: ignore
-        """Equal comparison"""
-        if isinstance(other, DataProxy):
-            s = self.df["data"] == other.df["data"]
+        # Compiled results of operator calls
+        self.compiled: dict[str, tuple[pl.Expr | int | float, int, set[str]]] = {}
+
+    def add_feature(self, name: str, expression: str | pl.Expr) -> None:
+        """Add feature expression to the query plan"""
+        if isinstance(expression, str):
+            node: ast.expr = parse_expression(expression)
+
+            self.total_count += count_calls(node)
+            self.count_shared_calls(node)
+            self.lookback = max(self.lookback, get_lookback(node))
+
+            self.features[name] = (node, expression)
         else:
-            s = self.df["data"] == other
-        return self.result(s)
+            self.features[name] = expression.alias(name)
+
+    def count_shared_calls(self, node: ast.AST) -> None:
+        """Count operator calls in syntax tree, calls inside a repeated call are only counted once"""
+        if isinstance(node, ast.Call):
+            key: str = ast.dump(node)
+
+            count: int = self.call_counts.get(key, 0)
+            self.call_counts[key] = count + 1
+
+            if count:
+                return
+
+        for child in ast.iter_child_nodes(node):
+            self.count_shared_calls(child)
+
+    def get_dedup_ratio(self) -> float:
+        """Get the ratio of operator calls removed by common subexpression elimination"""
+        if not self.total_count:
+            return 0
+
+        return 1 - len(self.call_counts) / self.total_count
+
+    def compile(self, node: ast.expr, expression: str) -> pl.Expr:
+        """Compile expression syntax tree into Polars expression"""
+        value, _, _ = self.compile_node(node, expression)
+
+        if not isinstance(value, pl.Expr):
+            value = pl.lit(value)
+
+        return value
+
+    def compile_node(self, node: ast.expr, expression: str) -> tuple[pl.Expr | int | float, int, set[str]]:
+        """
+        Compile expression syntax tree node recursively
+
+        Return compiled value, stage level and window partitions used by the value.
+        """
+        # Numeric constant
+        if isinstance(node, ast.Constant) and isinstance(node.value, int | float) and not isinstance(node.value, bool):
+            return node.value, 0, set()
+
+        # Feature column
+        if isinstance(node, ast.Name):
+            return pl.col(node.id), 0, set()
+
+        # Unary operator
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub | ast.UAdd):
+            operand, level, partitions = self.compile_node(node.operand, expression)
+
+            if isinstance(node.op, ast.USub):
+                operand = -operand
+
+            return operand, level, partitions
+
+        # Binary operator
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            return self.compile_operator(
+                BINARY_OPERATORS[type(node.op)],
+                [node.left, node.right],
+                expression
+            )
+
+        # Comparison operator, chained comparison is not supported
+        if (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and type(node.ops[0]) in BINARY_OPERATORS
+        ):
+            return self.compile_operator(
+                BINARY_OPERATORS[type(node.ops[0])],
+                [node.left, node.comparators[0]],
+                expression
+            )
+
+        # Operator function call
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            name: str = node.func.id
+
+            func: Callable | None = get_operators().get(name, None)
+            if not func:
+                raise ValueError(f"Unknown operator {name} in feature expression: {expression}")
+
+            partition: str | None = None
+            for prefix, column in OPERATOR_PARTITIONS.items():
+                if name.startswith(prefix):
+                    partition = column
+
+            key: str = ast.dump(node)
+            if key in self.compiled:
+                return self.compiled[key]
+
+            keywords: dict[str, ast.expr] = {k.arg: k.value for k in node.keywords if k.arg}
+
+            result: tuple[pl.Expr | int | float, int, set[str]] = self.compile_operator(
+                func, node.args, expression, partition, keywords
+            )
+
+            # Calculate shared operator call only once
+            value, level, _ = result
+            if self.call_counts.get(key, 0) > 1 and isinstance(value, pl.Expr):
+                result = (self.materialize(value, level), level + 1, set())
+
+            self.compiled[key] = result
+            return result
+
+        raise ValueError(f"Unsupported syntax {ast.dump(node)} in feature expression: {expression}")
+
+    def compile_operator(
+        self,
+        func: Callable,
+        nodes: list[ast.expr],
+        expression: str,
+        partition: str | None = None,
+        keywords: dict[str, ast.expr] | None = None
+    ) -> tuple[pl.Expr | int | float, int, set[str]]:
+        """Compile arguments and call operator function"""
+        args: list = []
+        kwargs: dict = {}
+        level: int = 0
+        partitions: set[str] = set()
+
+        items: list[tuple[str | None, ast.expr]] = [(None, n) for n in nodes]
+        if keywords:
+            items.extend(keywords.items())
+
+        for keyword, node in items:
+            value, value_level, value_partitions = self.compile_node(node, expression)
+
+            # Calculate argument in an earlier stage if it uses other window partitions
+            if partition is not None and isinstance(value, pl.Expr) and value_partitions - {partition}:
+                value = self.materialize(value, value_level)
+                value_level += 1
+                value_partitions = set()
+
+            level = max(level, value_level)
+            partitions |= value_partitions
+
+            if keyword:
+                kwargs[keyword] = value
+            else:
+                args.append(value)
+
+        if partition is not None:
+            partitions.add(partition)
+
+        # Keep feature expression on the left to get Polars expression result
+        if len(args) == 2 and not isinstance(args[0], pl.Expr) and isinstance(args[1], pl.Expr):
+            args[0] = pl.lit(args[0])
+
+        return func(*args, **kwargs), level, partitions
+
+    def materialize(self, value: pl.Expr, level: int) -> pl.Expr:
+        """Calculate expression as temporary column in the stage of level"""
+        while len(self.stages) <= level:
+            self.stages.append({})
+
+        name: str = f"_temp_{self.temp_count}"
+        self.temp_count += 1
+
+        self.stages[level][name] = value.alias(name)
+
+        return pl.col(name)
+
+    def build(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        """Build query plan calculating all features"""
+        exprs: list[pl.Expr] = []
+
+        for name, feature in self.features.items():
+            if isinstance(feature, tuple):
+                node, expression = feature
+                feature = self.compile(node, expression).alias(name)
+
+            exprs.append(feature)
+
+        for stage in self.stages:
+            lf = lf.with_columns(list(stage.values()))
+
+        return lf.select(exprs)
+
+
+def parse_expression(expression: str) -> ast.expr:
+    """Parse expression string into syntax tree"""
+    try:
+        return ast.parse(expression.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid feature expression: {expression}") from e
+
+
+def count_calls(node: ast.AST) -> int:
+    """Count all operator calls in syntax tree"""
+    return sum(isinstance(n, ast.Call) for n in ast.walk(node))
+
+
+def get_lookback(node: ast.AST) -> int:
+    """
+    Get number of history rows of each contract required by syntax tree
+
+    Windows of nested operators are added up, negative windows looking into the
+    future are ignored. Technical indicators using recursive smoothing depend on
+    all history rows, which is checked by needs_full_history.
+    """
+    lookback: int = max((get_lookback(child) for child in ast.iter_child_nodes(node)), default=0)
+
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+        return lookback
+
+    func: Callable | None = get_operators().get(node.func.id, None)
+    if not func:
+        return lookback
+
+    try:
+        keywords: dict[str, ast.expr] = {k.arg: k.value for k in node.keywords if k.arg}
+        arguments: dict = inspect.signature(func).bind(*node.args, **keywords).arguments
+        window: int = int(ast.literal_eval(arguments["window"]))
+    except (TypeError, ValueError, KeyError):
+        return lookback
+
+    return lookback + max(window, 0)
+
+
+def needs_full_history(expression: str | pl.Expr) -> bool:
+    """
+    Check whether feature depends on all history rows of each contract
+
+    Technical indicators using recursive smoothing never forget their initial
+    values, and windows of Polars expressions are unknown.
+    """
+    if not isinstance(expression, str):
+        return True
+
+    for node in ast.walk(parse_expression(expression)):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id.startswith("ta_"):
+            return True
+
+    return False
 
 
 def calculate_by_expression(df: pl.DataFrame, expression: str) -> pl.DataFrame:
     """Execute calculation based on expression"""
-    # Import operators locally to avoid polluting global namespace
-    from .ts_function import (              # noqa
-        ts_delay,
-        ts_min, ts_max,
-        ts_argmax, ts_argmin,
-        ts_rank, ts_sum,
-        ts_mean, ts_std,
-        ts_slope, ts_quantile,
-        ts_rsquare, ts_resi,
-        ts_corr,
-        ts_less, ts_greater,
-        ts_log, ts_abs
-    )
-    from .cs_function import (              # noqa
-        cs_rank,
-        cs_mean,
-        cs_std
-    )
-    from .ta_function import (              # noqa
-        ta_rsi,
-        ta_atr
-    )
-
-    # Extract feature objects to local space
-    d: dict = locals()
-
-    for column in df.columns:
-        # Filter index columns
-        if column in {"datetime", "vt_symbol"}:
-            continue
-
-        # Cache feature df
-        column_df = df[["datetime", "vt_symbol", column]]
-        d[column] = DataProxy(column_df)
-
-    # Use eval to execute calculation
-    other: DataProxy = eval(expression, {}, d)
-
-    # Return result DataFrame
-    return other.df
+    compiler: ExpressionCompiler = ExpressionCompiler()
+    compiler.add_feature("datetime", pl.col("datetime"))
+    compiler.add_feature("vt_symbol", pl.col("vt_symbol"))
+    compiler.add_feature("data", expression)
+
+    return compiler.build(df.lazy()).collect()
 
 
 def calculate_by_polars(df: pl.DataFrame, expression: pl.expr.expr.Expr) -> pl.DataFrame:
@@ -8,12 +8,13 @@ from functools import lru_cache
 
 import polars as pl
 
-from vnpy.trader.object import BarData
+from vnpy.trader.object import BarData, BarBatch
 from vnpy.trader.constant import Interval
 from vnpy.trader.utility import extract_vt_symbol
 
 from .logger import logger
-from .dataset import AlphaDataset, to_datetime
+from .dataset import AlphaDataset, FeatureCache, to_datetime
+from .dataset.template import sort_by_time
 from .model import AlphaModel
 
 
@@ -32,6 +33,7 @@ class AlphaLab:
         self.dataset_path: Path = self.lab_path.joinpath("dataset")
         self.model_path: Path = self.lab_path.joinpath("model")
         self.signal_path: Path = self.lab_path.joinpath("signal")
+        self.feature_path: Path = self.lab_path.joinpath("feature")
 
         self.contract_path: Path = self.lab_path.joinpath("contract.json")
 
@@ -48,6 +50,9 @@ class AlphaLab:
             if not path.exists():
                 path.mkdir(parents=True)
 
+        # Cache of calculated features, used by prepare_dataset
+        self.feature_cache: FeatureCache = FeatureCache(self.feature_path)
+
     def save_bar_data(self, bars: list[BarData]) -> None:
         """Save bar data"""
         if not bars:
@@ -153,6 +158,75 @@ class AlphaLab:
 
         return bars
 
+    def load_bar_data_multi(
+        self,
+        vt_symbols: list[str],
+        interval: Interval | str,
+        start: datetime | str,
+        end: datetime | str
+    ) -> dict[str, BarBatch]:
+        """Load bar data of multiple symbols as columnar batches keyed by vt_symbol"""
+        # Convert types
+        if isinstance(interval, str):
+            interval = Interval(interval)
+
+        start = to_datetime(start)
+        end = to_datetime(end)
+
+        # Get folder path
+        if interval == Interval.DAILY:
+            folder_path: Path = self.daily_path
+        elif interval == Interval.MINUTE:
+            folder_path = self.minute_path
+        else:
+            logger.error(f"Unsupported interval {interval.value}")
+            return {}
+
+        # Build lazy query for each existing file
+        queries: dict[str, pl.LazyFrame] = {}
+
+        for vt_symbol in vt_symbols:
+            file_path: Path = folder_path.joinpath(f"{vt_symbol}.parquet")
+            if not file_path.exists():
+                logger.error(f"File {file_path} does not exist")
+                continue
+
+            queries[vt_symbol] = (
+                pl.scan_parquet(file_path)
+                .filter((pl.col("datetime") >= start) & (pl.col("datetime") <= end))
+            )
+
+        # Read all files in parallel
+        dfs: list[pl.DataFrame] = pl.collect_all(list(queries.values()))
+        results: dict[str, pl.DataFrame] = dict(zip(queries.keys(), dfs))
+
+        # Convert to columnar batches
+        batches: dict[str, BarBatch] = {}
+
+        for vt_symbol in vt_symbols:
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+
+            df: pl.DataFrame | None = results.get(vt_symbol, None)
+            if df is None:
+                batches[vt_symbol] = BarBatch(symbol, exchange, [], interval=interval)
+                continue
+
+            batches[vt_symbol] = BarBatch(
+                symbol,
+                exchange,
+                df["datetime"].to_numpy(),
+                interval=interval,
+                open_price=df["open"].to_numpy(),
+                high_price=df["high"].to_numpy(),
+                low_price=df["low"].to_numpy(),
+                close_price=df["close"].to_numpy(),
+                volume=df["volume"].to_numpy(),
+                turnover=df["turnover"].to_numpy(),
+                open_interest=df["open_interest"].to_numpy()
+            )
+
+        return batches
+
     def load_bar_df(
         self,
         vt_symbols: list[str],
@@ -386,6 +460,20 @@ class AlphaLab:
 
         return contracts
 
+    def prepare_dataset(
+        self,
+        dataset: AlphaDataset,
+        filters: dict | None = None,
+        max_workers: int | None = None
+    ) -> None:
+        """
+        Prepare dataset with features cached in the lab
+
+        Features calculated before on the same input data are loaded from the
+        feature cache, so repeated research only calculates new features.
+        """
+        dataset.prepare_data(filters, max_workers, cache=self.feature_cache)
+
     def save_dataset(self, name: str, dataset: AlphaDataset) -> None:
         """Save dataset"""
         file_path: Path = self.dataset_path.joinpath(f"{name}.pkl")
@@ -402,7 +490,14 @@ class AlphaLab:
 
         with open(file_path, mode="rb") as f:
             dataset: AlphaDataset = pickle.load(f)
-            return dataset
+
+        # Datasets saved before sorting are sorted once here for time range queries
+        for attr in ["result_df", "raw_df", "infer_df", "learn_df"]:
+            df: pl.DataFrame | None = getattr(dataset, attr, None)
+            if df is not None and not df["datetime"].flags["SORTED_ASC"]:
+                setattr(dataset, attr, sort_by_time(df))
+
+        return dataset
 
     def remove_dataset(self, name: str) -> bool:
         """Remove dataset"""
@@ -11,7 +11,7 @@ from plotly.subplots import make_subplots       # type: ignore
 from tqdm import tqdm
 
 from vnpy.trader.constant import Direction, Offset, Interval, Status
-from vnpy.trader.object import OrderData, TradeData, BarData
+from vnpy.trader.object import OrderData, TradeData, BarData, BarBatch
 from vnpy.trader.utility import round_to, extract_vt_symbol
 
 from ..logger import logger
@@ -124,15 +124,18 @@ class BacktestingEngine:
         self.history_data.clear()
         self.dts.clear()
 
-        # Load historical data for each symbol
+        # Load historical data of all symbols at once
+        batches: dict[str, BarBatch] = self.lab.load_bar_data_multi(
+            self.vt_symbols,
+            self.interval,
+            self.start,
+            self.end
+        )
+
         empty_symbols: list[str] = []
         for vt_symbol in tqdm(self.vt_symbols, total=len(self.vt_symbols)):
-            data: list[BarData] = self.lab.load_bar_data(
-                vt_symbol,
-                self.interval,
-                self.start,
-                self.end
-            )
+            batch: BarBatch | None = batches.get(vt_symbol, None)
+            data: list[BarData] = batch.to_bars() if batch else []
 
             for bar in data:
                 self.dts.add(bar.datetime)
@@ -1,8 +1,11 @@
-from .engine import Event, EventEngine, EVENT_TIMER
+from .engine import Event, EventEngine, ShardedEventEngine, Timer, EVENT_TIMER, EVENT_SCHEDULE
 
 
 __all__ = [
     "Event",
     "EventEngine",
+    "ShardedEventEngine",
+    "Timer",
     "EVENT_TIMER",
+    "EVENT_SCHEDULE",
 ]
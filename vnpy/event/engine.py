@@ -2,15 +2,18 @@
 Event-driven framework of VeighNa framework.
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from collections.abc import Callable
+from heapq import heappush, heappop
+from math import ceil
 from queue import Empty, Queue
-from threading import Thread
-from time import sleep
+from threading import Condition, Lock, Thread
+from time import time, perf_counter, monotonic
 from typing import Any
 
 
 EVENT_TIMER = "eTimer"
+EVENT_SCHEDULE = "eSchedule"
 
 
 class Event:
@@ -24,25 +27,121 @@ class Event:
         """"""
         self.type: str = type
         self.data: Any = data
+        self.put_time: float = 0
 
 
 # Defines handler function to be used in event engine.
 HandlerType = Callable[[Event], None]
 
 
+class Timer:
+    """
+    Timer registered in the scheduler of event engine.
+
+    Deadlines are kept on the grid of start time plus multiples of
+    interval, so the timer does not drift with event processing.
+    """
+
+    def __init__(
+        self,
+        timer_id: int,
+        interval: float,
+        handler: HandlerType | None,
+        one_shot: bool = False,
+        affinity: str = ""
+    ) -> None:
+        """"""
+        self.timer_id: int = timer_id
+        self.interval: float = interval
+        self.handler: HandlerType | None = handler
+        self.one_shot: bool = one_shot
+        self.affinity: str = affinity
+
+        self.deadline: float = 0
+        self.active: bool = True
+
+
+class Histogram:
+    """
+    Histogram of durations with power of 2 microsecond buckets.
+    """
+
+    bucket_count: int = 32
+
+    def __init__(self) -> None:
+        """"""
+        self.buckets: list[int] = [0] * self.bucket_count
+        self.count: int = 0
+        self.total: float = 0
+        self.max: float = 0
+
+    def add(self, value: float) -> None:
+        """
+        Add a duration value in seconds.
+        """
+        ix: int = int(value * 1_000_000).bit_length()
+        self.buckets[min(ix, self.bucket_count - 1)] += 1
+
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percent: float) -> float:
+        """
+        Get upper bound (in seconds) of the bucket containing percentile.
+        """
+        target: float = self.count * percent / 100
+        accumulated: int = 0
+
+        for ix, n in enumerate(self.buckets):
+            accumulated += n
+            if n and accumulated >= target:
+                return min((1 << ix) / 1_000_000, self.max)
+
+        return self.max
+
+    def get_data(self) -> dict:
+        """
+        Get summary of histogram, durations are in milliseconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count * 1000 if self.count else 0,
+            "p50": self.get_percentile(50) * 1000,
+            "p99": self.get_percentile(99) * 1000,
+            "max": self.max * 1000,
+            "buckets": list(self.buckets),
+        }
+
+
 class EventEngine:
     """
     Event engine distributes event object based on its type
     to those handlers registered.
 
     It also generates timer event by every interval seconds,
-    which can be used for timing purpose.
+    which can be used for timing purpose. Timers of other intervals
+    can be added into its scheduler with add_timer.
     """
 
-    def __init__(self, interval: int = 1) -> None:
+    def __init__(
+        self,
+        interval: int = 1,
+        batch_size: int = 0,
+        coalesce_prefix: str = "",
+        monitor: bool = False
+    ) -> None:
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
+
+        If batch_size is set, events are drained from queue in batches
+        of at most batch_size. Within each batch only the newest event
+        of those types starting with coalesce_prefix (e.g. EVENT_TICK)
+        is kept for each vt_symbol.
+
+        If monitor is set, queue depth, enqueue-to-dispatch latency and
+        handler execution time are recorded, see get_monitor_snapshot.
         """
         self._interval: int = interval
         self._queue: Queue = Queue()
@@ -52,6 +151,26 @@ class EventEngine:
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: list = []
 
+        self._timer_condition: Condition = Condition()
+        self._timer_heap: list[tuple[float, int]] = []             # (deadline, timer_id)
+        self._timers: dict[int, Timer] = {}                         # timer_id: timer
+        self._timer_count: int = 0
+        self._add_timer(Timer(0, interval, None))                    # timer of EVENT_TIMER
+
+        self._handlers[EVENT_SCHEDULE].append(self._process_schedule)
+
+        self._batch_size: int = batch_size
+        self._coalesce_prefix: str = coalesce_prefix
+        self._batch_count: int = 0
+        self._event_count: int = 0
+        self._coalesced_count: int = 0
+
+        self._monitor: bool = monitor
+        self._monitor_lock: Lock = Lock()
+        self._depth_samples: deque = deque(maxlen=3600)             # (timestamp, queue depth)
+        self._latency_histograms: defaultdict = defaultdict(Histogram)     # event type prefix: histogram
+        self._handler_histograms: defaultdict = defaultdict(Histogram)     # handler name: histogram
+
     def _run(self) -> None:
         """
         Get event from queue and then process it.
@@ -59,10 +178,59 @@ class EventEngine:
         while self._active:
             try:
                 event: Event = self._queue.get(block=True, timeout=1)
-                self._process(event)
+
+                if self._batch_size:
+                    for event in self._get_batch(event):
+                        self._process(event)
+                else:
+                    self._process(event)
             except Empty:
                 pass
 
+    def _get_batch(self, event: Event) -> list[Event]:
+        """
+        Drain events left in queue under a single lock acquisition,
+        and then coalesce stale events if required.
+        """
+        with self._queue.mutex:
+            buf: deque = self._queue.queue
+            count: int = min(len(buf), self._batch_size - 1)
+            events: list = [event]
+            events.extend(buf.popleft() for _ in range(count))
+            self._queue.not_full.notify_all()
+
+        self._batch_count += 1
+        self._event_count += len(events)
+
+        if not self._coalesce_prefix:
+            return events
+
+        # Keep the newest event of each key at its latest position, so
+        # that the order relative to other events is not changed.
+        latest: dict[tuple, int] = {}
+
+        for ix, e in enumerate(events):
+            if not e.type.startswith(self._coalesce_prefix):
+                continue
+
+            key: tuple = (e.type, getattr(e.data, "vt_symbol", None))
+            if key in latest:
+                events[latest[key]] = None
+                self._coalesced_count += 1
+            latest[key] = ix
+
+        return [e for e in events if e is not None]
+
+    def get_batch_statistics(self) -> dict[str, int]:
+        """
+        Get counters of batch draining and event coalescing.
+        """
+        return {
+            "batch": self._batch_count,
+            "event": self._event_count,
+            "coalesced": self._coalesced_count,
+        }
+
     def _process(self, event: Event) -> None:
         """
         First distribute event to those handlers registered listening
@@ -71,20 +239,178 @@ class EventEngine:
         Then distribute event to those general handlers which listens
         to all types.
         """
+        if self._monitor:
+            handlers: list = self._handlers.get(event.type, []) + self._general_handlers
+            self._process_monitored(event, handlers)
+            return
+
         if event.type in self._handlers:
             [handler(event) for handler in self._handlers[event.type]]
 
         if self._general_handlers:
             [handler(event) for handler in self._general_handlers]
 
+    def _process_monitored(self, event: Event, handlers: list) -> None:
+        """
+        Call handlers and record latency and execution time of them.
+        """
+        start: float = perf_counter()
+        if event.put_time:
+            # Events of different symbols share histogram of type prefix
+            prefix: str = event.type.split(".", 1)[0]
+
+            with self._monitor_lock:
+                self._latency_histograms[prefix].add(start - event.put_time)
+
+        for handler in handlers:
+            handler(event)
+
+            end: float = perf_counter()
+            name: str = getattr(handler, "__qualname__", repr(handler))
+            with self._monitor_lock:
+                self._handler_histograms[name].add(end - start)
+            start = end
+
     def _run_timer(self) -> None:
         """
-        Sleep by interval second(s) and then generate a timer event.
+        Wait until the nearest deadline and then trigger those due timers.
         """
+        # Timers added before start count from now on
+        with self._timer_condition:
+            now: float = monotonic()
+            self._timer_heap.clear()
+
+            for timer in self._timers.values():
+                timer.deadline = now + timer.interval
+                heappush(self._timer_heap, (timer.deadline, timer.timer_id))
+
         while self._active:
-            sleep(self._interval)
-            event: Event = Event(EVENT_TIMER)
-            self.put(event)
+            with self._timer_condition:
+                now = monotonic()
+
+                while self._timer_heap and self._timer_heap[0][0] <= now:
+                    deadline, timer_id = heappop(self._timer_heap)
+
+                    # Skip removed timer
+                    timer: Timer | None = self._timers.get(timer_id, None)
+                    if not timer:
+                        continue
+
+                    self._trigger_timer(timer)
+
+                    if timer.one_shot:
+                        self._timers.pop(timer_id)
+                        continue
+
+                    # Skip missed deadlines instead of triggering in burst
+                    timer.deadline = deadline + timer.interval
+                    if timer.deadline <= now:
+                        missed: int = ceil((now - timer.deadline) / timer.interval)
+                        timer.deadline += max(missed, 1) * timer.interval
+
+                    heappush(self._timer_heap, (timer.deadline, timer_id))
+
+                timeout: float = 1
+                if self._timer_heap:
+                    timeout = min(self._timer_heap[0][0] - now, timeout)
+
+                self._timer_condition.wait(timeout)
+
+    def _trigger_timer(self, timer: Timer) -> None:
+        """
+        Put timer event into queue.
+        """
+        if timer.handler:
+            self.put(Event(EVENT_SCHEDULE, timer))
+            return
+
+        if self._monitor:
+            self._depth_samples.append((time(), self._get_queue_size()))
+
+        self.put(Event(EVENT_TIMER))
+
+    def _process_schedule(self, event: Event) -> None:
+        """
+        Call handler of the timer triggered.
+        """
+        timer: Timer = event.data
+        if timer.active and timer.handler:
+            timer.handler(event)
+
+    def _add_timer(self, timer: Timer) -> None:
+        """
+        Put timer into scheduler with its first deadline.
+        """
+        with self._timer_condition:
+            timer.deadline = monotonic() + timer.interval
+            self._timers[timer.timer_id] = timer
+            heappush(self._timer_heap, (timer.deadline, timer.timer_id))
+
+            self._timer_condition.notify()
+
+    def add_timer(
+        self,
+        interval: float,
+        handler: HandlerType,
+        one_shot: bool = False,
+        affinity: str = ""
+    ) -> int:
+        """
+        Add a timer calling handler every interval seconds at fixed rate,
+        or only once after interval seconds if one_shot is set.
+
+        Handler is called in event processing thread, with an event of
+        type EVENT_SCHEDULE whose data is the Timer object. Affinity is
+        only used by ShardedEventEngine, which calls the handler in the
+        worker of that affinity.
+
+        Return timer id which can be used for removing the timer.
+        """
+        with self._timer_condition:
+            self._timer_count += 1
+            timer: Timer = Timer(self._timer_count, interval, handler, one_shot, affinity)
+            self._add_timer(timer)
+
+        return timer.timer_id
+
+    def remove_timer(self, timer_id: int) -> None:
+        """
+        Remove an existing timer from scheduler.
+        """
+        with self._timer_condition:
+            timer: Timer | None = self._timers.pop(timer_id, None)
+
+        if timer:
+            timer.active = False
+
+    def _get_queue_size(self) -> int:
+        """
+        Get number of events waiting in queue.
+        """
+        return self._queue.qsize()
+
+    def get_monitor_snapshot(self, reset: bool = False) -> dict:
+        """
+        Get snapshot of queue depth samples, latency histograms of
+        each event type prefix (e.g. eTick) and execution time
+        histograms of each handler.
+
+        Histograms cover the period since the last reset. If reset is
+        set, histograms are cleared after taking the snapshot, so that
+        the next snapshot only covers the following period.
+        """
+        with self._monitor_lock:
+            snapshot: dict = {
+                "queue_depth": list(self._depth_samples),
+                "latency": {k: v.get_data() for k, v in self._latency_histograms.items()},
+                "handler": {k: v.get_data() for k, v in self._handler_histograms.items()},
+            }
+
+            if reset:
+                self._latency_histograms.clear()
+                self._handler_histograms.clear()
+
+        return snapshot
 
     def start(self) -> None:
         """
@@ -99,6 +425,10 @@ class EventEngine:
         Stop event engine.
         """
         self._active = False
+
+        with self._timer_condition:
+            self._timer_condition.notify()
+
         self._timer.join()
         self._thread.join()
 
@@ -106,12 +436,18 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
+        if self._monitor:
+            event.put_time = perf_counter()
+
         self._queue.put(event)
 
-    def register(self, type: str, handler: HandlerType) -> None:
+    def register(self, type: str, handler: HandlerType, affinity: str = "") -> None:
         """
         Register a new handler function for a specific event type. Every
         function can only be registered once for each event type.
+
+        Affinity is only used by ShardedEventEngine, since all events
+        are processed in the same thread here.
         """
         handler_list: list = self._handlers[type]
         if handler not in handler_list:
@@ -143,3 +479,149 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+
+
+def get_event_key(event: Event) -> str:
+    """
+    Get routing key of event: vt_symbol for market and trading data,
+    affinity of timer for schedule event, event type for the rest.
+
+    Orders, trades and positions share the key of their vt_symbol, so
+    that handlers updating states of a contract (e.g. offset converter)
+    get all its events in the same worker.
+    """
+    if isinstance(event.data, Timer) and event.data.affinity:
+        return event.data.affinity
+
+    vt_symbol: str = getattr(event.data, "vt_symbol", "")
+    if vt_symbol:
+        return vt_symbol
+
+    return event.type
+
+
+class ShardedEventEngine(EventEngine):
+    """
+    Event engine distributes events to multiple worker threads.
+
+    Events are routed to workers by key, so that events with the same
+    key are processed in order while those of unrelated keys are
+    processed in parallel.
+
+    All handlers of an event are called in the same worker by the order
+    of registration, the same as EventEngine. So handlers registered
+    earlier (e.g. OmsEngine) have always processed an event before
+    those registered later (e.g. apps).
+
+    Events of a type registered with an affinity string are all routed
+    to the worker of that affinity instead of by key, which is required
+    by handlers sharing state between different keys. Timer handlers
+    added with the same affinity are called in the same worker.
+    """
+
+    def __init__(
+        self,
+        interval: int = 1,
+        worker_count: int = 4,
+        key_func: Callable[[Event], str] = get_event_key,
+        monitor: bool = False
+    ) -> None:
+        """"""
+        super().__init__(interval, monitor=monitor)
+
+        self._worker_count: int = worker_count
+        self._key_func: Callable[[Event], str] = key_func
+
+        self._queues: list[Queue] = [Queue() for _ in range(worker_count)]
+        self._workers: list[Thread] = [
+            Thread(target=self._run_worker, args=(queue,)) for queue in self._queues
+        ]
+
+        self._affinities: dict[str, str] = {}       # event type: affinity
+
+    def _get_index(self, key: str) -> int:
+        """
+        Get worker index of routing key.
+        """
+        return hash(key) % self._worker_count
+
+    def _run_worker(self, queue: Queue) -> None:
+        """
+        Get event and its handlers from worker queue and then call them.
+        """
+        while self._active:
+            try:
+                event, handlers = queue.get(block=True, timeout=1)
+
+                if self._monitor:
+                    self._process_monitored(event, handlers)
+                else:
+                    [handler(event) for handler in handlers]
+            except Empty:
+                pass
+
+    def _get_queue_size(self) -> int:
+        """
+        Get number of events waiting in all worker queues.
+        """
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self) -> None:
+        """
+        Start worker threads to process events and generate timer events.
+        """
+        self._active = True
+
+        for worker in self._workers:
+            worker.start()
+
+        self._timer.start()
+
+    def stop(self) -> None:
+        """
+        Stop event engine.
+        """
+        self._active = False
+
+        with self._timer_condition:
+            self._timer_condition.notify()
+
+        self._timer.join()
+
+        for worker in self._workers:
+            worker.join()
+
+    def put(self, event: Event) -> None:
+        """
+        Put an event object with its handlers into the worker queue.
+        """
+        handlers: list = self._handlers.get(event.type, []) + self._general_handlers
+        if not handlers:
+            return
+
+        if self._monitor:
+            event.put_time = perf_counter()
+
+        key: str = self._affinities.get(event.type, "") or self._key_func(event)
+        self._queues[self._get_index(key)].put((event, handlers))
+
+    def register(self, type: str, handler: HandlerType, affinity: str = "") -> None:
+        """
+        Register a new handler function for a specific event type, with
+        optional affinity deciding which worker processes events of the
+        type. The affinity registered first is kept for each type.
+        """
+        super().register(type, handler)
+
+        if affinity:
+            self._affinities.setdefault(type, affinity)
+
+    def unregister(self, type: str, handler: HandlerType) -> None:
+        """
+        Unregister an existing handler function from event engine. The
+        affinity of the type is cleared when its last handler is removed.
+        """
+        super().unregister(type, handler)
+
+        if type not in self._handlers:
+            self._affinities.pop(type, None)
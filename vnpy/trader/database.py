@@ -1,13 +1,15 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import datetime, timedelta, timezone, tzinfo
 from types import ModuleType
 from dataclasses import dataclass
 from importlib import import_module
 
+import numpy as np
+
 from .constant import Interval, Exchange
-from .object import BarData, TickData
+from .object import BarData, TickData, BarBatch, TickBatch
 from .setting import SETTINGS
-from .utility import ZoneInfo
+from .utility import ZoneInfo, extract_vt_symbol
 from .locale import _
 
 
@@ -22,6 +24,36 @@ def convert_tz(dt: datetime) -> datetime:
     return dt.replace(tzinfo=None)
 
 
+# Length (in minutes) of time buckets sharing the same UTC offset
+OFFSET_BUCKET_MINUTES: int = 15
+
+
+def get_utc_offsets(dts: np.ndarray, tz: tzinfo, local: bool) -> np.ndarray:
+    """
+    Get UTC offsets of datetime64 array in timezone, the array holds
+    naive local time of tz if local is True, otherwise naive UTC time.
+
+    Timezone offsets only change at whole quarter hours, so the offset
+    is calculated once for each 15-minute bucket instead of each row.
+    """
+    buckets: np.ndarray = dts.astype("datetime64[m]").astype(np.int64) // OFFSET_BUCKET_MINUTES
+    keys, inverse = np.unique(buckets, return_inverse=True)
+
+    offsets: np.ndarray = np.empty(len(keys), dtype="timedelta64[us]")
+
+    for i, key in enumerate(keys.tolist()):
+        dt: datetime = datetime(1970, 1, 1) + timedelta(minutes=key * OFFSET_BUCKET_MINUTES)
+
+        if local:
+            offset: timedelta | None = dt.replace(tzinfo=tz).utcoffset()
+        else:
+            offset = dt.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset()
+
+        offsets[i] = offset or timedelta(0)
+
+    return offsets[inverse]
+
+
 @dataclass
 class BarOverview:
     """
@@ -95,6 +127,58 @@ class BaseDatabase(ABC):
         """
         pass
 
+    def load_bar_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarBatch:
+        """
+        Load bar data from database as columnar batch.
+
+        Database which can read columns directly should override this.
+        """
+        bars: list[BarData] = self.load_bar_data(symbol, exchange, interval, start, end)
+        return BarBatch.from_bars(bars, symbol, exchange, interval)
+
+    def load_tick_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> TickBatch:
+        """
+        Load tick data from database as columnar batch.
+
+        Database which can read columns directly should override this.
+        """
+        ticks: list[TickData] = self.load_tick_data(symbol, exchange, start, end)
+        return TickBatch.from_ticks(ticks, symbol, exchange)
+
+    def load_bar_data_multi(
+        self,
+        vt_symbols: list[str],
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> dict[str, BarBatch]:
+        """
+        Load bar data of multiple symbols, return columnar batches keyed
+        by vt_symbol (empty batch for symbol without data).
+
+        Database which can query all symbols at once should override this.
+        """
+        batches: dict[str, BarBatch] = {}
+
+        for vt_symbol in vt_symbols:
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            batches[vt_symbol] = self.load_bar_batch(symbol, exchange, interval, start, end)
+
+        return batches
+
     @abstractmethod
     def delete_bar_data(
         self,
@@ -152,8 +236,21 @@ def get_database() -> BaseDatabase:
         module: ModuleType = import_module(module_name)
     except ModuleNotFoundError:
         print(_("找不到数据库驱动{}，使用默认的SQLite数据库").format(module_name))
-        module = import_module("vnpy_sqlite")
+
+        # Use bundled local Arrow database if SQLite driver is not installed
+        try:
+            module = import_module("vnpy_sqlite")
+        except ModuleNotFoundError:
+            print(_("找不到SQLite数据库驱动，使用本地Arrow文件数据库"))
+            module = import_module("vnpy_arrow")
 
     # Create database object from module
     database = module.Database()
+
+    # Wrap with local read-through cache if enabled, except for the loaded
+    # Arrow database which already stores data in local files
+    if SETTINGS["database.cache"] and module.__name__ != "vnpy_arrow":
+        from vnpy_arrow import CacheDatabase
+        database = CacheDatabase(database)
+
     return database
@@ -2,7 +2,7 @@ from types import ModuleType
 from collections.abc import Callable
 from importlib import import_module
 
-from .object import HistoryRequest, TickData, BarData
+from .object import HistoryRequest, TickData, BarData, BarBatch, TickBatch
 from .setting import SETTINGS
 from .locale import _
 
@@ -32,6 +32,20 @@ class BaseDatafeed:
         output(_("查询Tick数据失败：没有正确配置数据服务"))
         return []
 
+    def query_bar_batch(self, req: HistoryRequest, output: Callable = print) -> BarBatch:
+        """
+        Query history bar data as columnar batch.
+        """
+        bars: list[BarData] = self.query_bar_history(req, output)
+        return BarBatch.from_bars(bars, req.symbol, req.exchange, req.interval)     # type: ignore
+
+    def query_tick_batch(self, req: HistoryRequest, output: Callable = print) -> TickBatch:
+        """
+        Query history tick data as columnar batch.
+        """
+        ticks: list[TickData] = self.query_tick_history(req, output)
+        return TickBatch.from_ticks(ticks, req.symbol, req.exchange)
+
 
 datafeed: BaseDatafeed | None = None
 
@@ -7,11 +7,13 @@ from queue import Empty, Queue
 from threading import Thread
 from typing import TypeVar
 from collections.abc import Callable
+from datetime import time
 
 from vnpy.event import Event, EventEngine
 from .app import BaseApp
 from .event import (
     EVENT_TICK,
+    EVENT_BAR,
     EVENT_ORDER,
     EVENT_TRADE,
     EVENT_POSITION,
@@ -38,8 +40,9 @@ from .object import (
     ContractData,
     Exchange
 )
+from .constant import Interval
 from .setting import SETTINGS
-from .utility import TRADER_DIR
+from .utility import TRADER_DIR, BarGenerator
 from .converter import OffsetConverter
 from .logger import logger, DEBUG, INFO, WARNING, ERROR, CRITICAL
 from .locale import _
@@ -157,6 +160,12 @@ class MainEngine:
         email_engine: EmailEngine = self.add_engine(EmailEngine)
         self.send_email: Callable[[str, str, str | None], None] = email_engine.send_email
 
+        bar_engine: BarEngine = self.add_engine(BarEngine)
+        self.subscribe_bar: Callable[[str, int, Interval, time | None], str] = bar_engine.subscribe_bar
+        self.unsubscribe_bar: Callable[[str], None] = bar_engine.unsubscribe_bar
+
+        self.add_engine(MonitorEngine)
+
     def write_log(self, msg: str, source: str = "") -> None:
         """
         Put log event with specific message.
@@ -408,9 +417,10 @@ class OmsEngine(BaseEngine):
         contract: ContractData = event.data
         self.contracts[contract.vt_symbol] = contract
 
-        # Initialize offset converter for each gateway
+        # Initialize offset converter for each gateway, contract events
+        # may be processed in different threads by ShardedEventEngine
         if contract.gateway_name not in self.offset_converters:
-            self.offset_converters[contract.gateway_name] = OffsetConverter(self)
+            self.offset_converters.setdefault(contract.gateway_name, OffsetConverter(self))
 
     def process_quote_event(self, event: Event) -> None:
         """"""
@@ -617,3 +627,184 @@ class EmailEngine(BaseEngine):
 
         self.active = False
         self.thread.join()
+
+
+def get_bar_event_type(
+    vt_symbol: str,
+    window: int = 0,
+    interval: Interval = Interval.MINUTE,
+    daily_end: time | None = None
+) -> str:
+    """
+    Get type string of bar event pushed by bar engine.
+
+    1 minute bar event is EVENT_BAR + vt_symbol, window bar event
+    has window and interval appended, and daily bar event also has
+    daily end time appended.
+    """
+    if not window:
+        return EVENT_BAR + vt_symbol
+
+    event_type: str = f"{EVENT_BAR}{vt_symbol}.{window}.{interval.value}"
+
+    if interval == Interval.DAILY and daily_end:
+        event_type += f".{daily_end:%H%M%S}"
+
+    return event_type
+
+
+class BarEngine(BaseEngine):
+    """
+    Provides shared bar generation function.
+
+    Each subscribed vt_symbol has only one 1 minute bar generator updated
+    from tick event, and window bars are generated from the 1 minute bars,
+    so that strategies listening to the same symbol do not build the same
+    bar repeatedly.
+
+    The same bar object is pushed to all handlers of the bar event, so
+    handlers should copy it before making any change.
+    """
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine) -> None:
+        """"""
+        super().__init__(main_engine, event_engine, "bar")
+
+        self.minute_generators: dict[str, BarGenerator] = {}                    # vt_symbol: generator
+        self.window_generators: dict[str, dict[str, BarGenerator]] = {}         # vt_symbol: {event type: generator}
+
+        self.subscription_counts: dict[str, int] = {}                           # event type: count
+        self.subscription_symbols: dict[str, str] = {}                          # event type: vt_symbol
+
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+
+    def process_tick_event(self, event: Event) -> None:
+        """"""
+        tick: TickData = event.data
+
+        bg: BarGenerator | None = self.minute_generators.get(tick.vt_symbol, None)
+        if bg:
+            bg.update_tick(tick)
+
+    def subscribe_bar(
+        self,
+        vt_symbol: str,
+        window: int = 0,
+        interval: Interval = Interval.MINUTE,
+        daily_end: time | None = None
+    ) -> str:
+        """
+        Start generating bar of specific vt_symbol, return the
+        event type to be registered for receiving bar update.
+
+        Daily end time is only used by daily bar.
+        """
+        if interval != Interval.DAILY:
+            daily_end = None
+
+        if vt_symbol not in self.minute_generators:
+            self.minute_generators[vt_symbol] = BarGenerator(
+                lambda bar: self.on_minute_bar(vt_symbol, bar)
+            )
+            self.window_generators[vt_symbol] = {}
+
+        event_type: str = get_bar_event_type(vt_symbol, window, interval, daily_end)
+
+        if window and event_type not in self.window_generators[vt_symbol]:
+            # Window generator is only updated with 1 minute bar
+            callback: Callable[[BarData], None] = lambda bar: self.put_bar_event(event_type, bar)
+            bg: BarGenerator = BarGenerator(callback, window, callback, interval, daily_end)
+            self.window_generators[vt_symbol][event_type] = bg
+
+        self.subscription_counts[event_type] = self.subscription_counts.get(event_type, 0) + 1
+        self.subscription_symbols[event_type] = vt_symbol
+
+        return event_type
+
+    def unsubscribe_bar(self, event_type: str) -> None:
+        """
+        Cancel a subscription of bar event type, and stop generating
+        the bar after all its subscriptions are cancelled.
+        """
+        count: int = self.subscription_counts.get(event_type, 0)
+        if not count:
+            return
+
+        if count > 1:
+            self.subscription_counts[event_type] = count - 1
+            return
+
+        self.subscription_counts.pop(event_type)
+        vt_symbol: str = self.subscription_symbols.pop(event_type)
+
+        self.window_generators[vt_symbol].pop(event_type, None)
+
+        # Stop generating 1 minute bar if no bar of the symbol is subscribed
+        if vt_symbol not in self.subscription_symbols.values():
+            self.minute_generators.pop(vt_symbol)
+            self.window_generators.pop(vt_symbol)
+
+    def on_minute_bar(self, vt_symbol: str, bar: BarData) -> None:
+        """
+        Push 1 minute bar and update it into window bar generators.
+        """
+        self.put_bar_event(get_bar_event_type(vt_symbol), bar)
+
+        generators: dict[str, BarGenerator] = self.window_generators.get(vt_symbol, {})
+        for bg in list(generators.values()):
+            bg.update_bar(bar)
+
+    def put_bar_event(self, event_type: str, bar: BarData) -> None:
+        """"""
+        event: Event = Event(event_type, bar)
+        self.event_engine.put(event)
+
+
+class MonitorEngine(BaseEngine):
+    """
+    Provides periodic log output of event engine monitor snapshot.
+
+    Nothing is logged unless event engine is created with monitor enabled.
+    """
+
+    log_interval: int = 60          # seconds
+    handler_count: int = 5          # number of slowest handlers logged
+
+    def __init__(self, main_engine: MainEngine, event_engine: EventEngine) -> None:
+        """"""
+        super().__init__(main_engine, event_engine, "monitor")
+
+        self.event_engine.add_timer(self.log_interval, self.process_timer_event)
+
+    def process_timer_event(self, event: Event) -> None:
+        """"""
+        for msg in self.get_snapshot_messages():
+            self.main_engine.write_log(msg, "MONITOR")
+
+    def get_snapshot_messages(self) -> list[str]:
+        """
+        Convert monitor snapshot of the last log interval into log messages.
+        """
+        snapshot: dict = self.event_engine.get_monitor_snapshot(reset=True)
+        msgs: list[str] = []
+
+        depths: list[int] = [depth for _, depth in snapshot["queue_depth"][-self.log_interval:]]
+        if depths:
+            msgs.append(_("事件队列深度：当前{}，最大{}").format(depths[-1], max(depths)))
+
+        for type, data in snapshot["latency"].items():
+            msgs.append(
+                _("事件{}延时：次数{}，p50 {:.3f}ms，p99 {:.3f}ms，最大{:.3f}ms").format(
+                    type, data["count"], data["p50"], data["p99"], data["max"]
+                )
+            )
+
+        handlers: list = sorted(snapshot["handler"].items(), key=lambda item: item[1]["p99"], reverse=True)
+        for name, data in handlers[:self.handler_count]:
+            msgs.append(
+                _("处理函数{}耗时：次数{}，p50 {:.3f}ms，p99 {:.3f}ms，最大{:.3f}ms").format(
+                    name, data["count"], data["p50"], data["p99"], data["max"]
+                )
+            )
+
+        return msgs
@@ -2,8 +2,12 @@
 Basic data structure used for general trading function in the trading platform.
 """
 
-from dataclasses import dataclass, field
-from datetime import datetime as Datetime
+from collections.abc import Iterator
+from dataclasses import dataclass, field, fields
+from datetime import datetime as Datetime, tzinfo as TzInfo
+from typing import Any
+
+import numpy as np
 
 from .constant import Direction, Exchange, Interval, Offset, Status, Product, OptionType, OrderType
 
@@ -108,6 +112,121 @@ class BarData(BaseData):
         self.vt_symbol: str = f"{self.symbol}.{self.exchange.value}"
 
 
+_vt_symbols: dict[Exchange, dict[str, str]] = {exchange: {} for exchange in Exchange}
+
+
+def _compact_post_init(self: "CompactBaseData") -> None:
+    """
+    Share the same vt_symbol string object between compact data objects.
+    """
+    symbols: dict[str, str] = _vt_symbols[self.exchange]     # type: ignore
+
+    vt_symbol: str | None = symbols.get(self.symbol, None)      # type: ignore
+    if not vt_symbol:
+        vt_symbol = symbols[self.symbol] = f"{self.symbol}.{self.exchange.value}"     # type: ignore
+
+    self.vt_symbol = vt_symbol      # type: ignore
+
+
+# Opt-in compact data classes for holding large amount of ticks and bars,
+# which have the same fields as TickData and BarData but use __slots__
+# instead of per-instance __dict__, so arbitrary attributes cannot be
+# added to their objects. They are created by BarBatch.to_bars and
+# TickBatch.to_ticks with compact set.
+@dataclass(slots=True)
+class CompactBaseData:
+    """
+    Compact version of BaseData using __slots__.
+    """
+
+    gateway_name: str
+
+    extra: dict | None = field(default=None, init=False)
+
+
+@dataclass(slots=True)
+class CompactTickData(CompactBaseData):
+    """
+    Compact version of TickData using __slots__.
+    """
+
+    symbol: str
+    exchange: Exchange
+    datetime: Datetime
+
+    name: str = ""
+    volume: float = 0
+    turnover: float = 0
+    open_interest: float = 0
+    last_price: float = 0
+    last_volume: float = 0
+    limit_up: float = 0
+    limit_down: float = 0
+
+    open_price: float = 0
+    high_price: float = 0
+    low_price: float = 0
+    pre_close: float = 0
+
+    bid_price_1: float = 0
+    bid_price_2: float = 0
+    bid_price_3: float = 0
+    bid_price_4: float = 0
+    bid_price_5: float = 0
+
+    ask_price_1: float = 0
+    ask_price_2: float = 0
+    ask_price_3: float = 0
+    ask_price_4: float = 0
+    ask_price_5: float = 0
+
+    bid_volume_1: float = 0
+    bid_volume_2: float = 0
+    bid_volume_3: float = 0
+    bid_volume_4: float = 0
+    bid_volume_5: float = 0
+
+    ask_volume_1: float = 0
+    ask_volume_2: float = 0
+    ask_volume_3: float = 0
+    ask_volume_4: float = 0
+    ask_volume_5: float = 0
+
+    localtime: Datetime | None = None
+
+    vt_symbol: str = field(default="", init=False)
+
+    def __post_init__(self) -> None:
+        """"""
+        _compact_post_init(self)
+
+
+@dataclass(slots=True)
+class CompactBarData(CompactBaseData):
+    """
+    Compact version of BarData using __slots__.
+    """
+
+    symbol: str
+    exchange: Exchange
+    datetime: Datetime
+
+    interval: Interval | None = None
+    volume: float = 0
+    turnover: float = 0
+    open_interest: float = 0
+    open_price: float = 0
+    high_price: float = 0
+    low_price: float = 0
+    close_price: float = 0
+
+    vt_symbol: str = field(default="", init=False)
+
+    def __post_init__(self) -> None:
+        """"""
+        _compact_post_init(self)
+
+
 @dataclass
 class OrderData(BaseData):
     """
@@ -425,3 +544,260 @@ class QuoteRequest:
             gateway_name=gateway_name,
         )
         return quote
+
+
+class BaseBatch:
+    """
+    Columnar container of data of a single symbol, which stores each
+    float field in a NumPy array and datetime in a datetime64 array.
+    Optional datetime fields are stored in datetime64 arrays of naive
+    time with NaT for None.
+
+    Data objects are only created when rows are accessed, and slicing
+    returns a new batch sharing the same arrays.
+    """
+
+    data_class: type = BaseData
+    compact_class: type = CompactBaseData
+    float_columns: tuple[str, ...] = ()
+    datetime_columns: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        datetime: np.ndarray,
+        gateway_name: str = "DB",
+        tzinfo: TzInfo | None = None,
+        **columns: Any
+    ) -> None:
+        """
+        Datetime array holds naive local time of tzinfo, float columns
+        not passed are filled with zero and datetime columns with NaT.
+        """
+        self.symbol: str = symbol
+        self.exchange: Exchange = exchange
+        self.vt_symbol: str = f"{symbol}.{exchange.value}"
+        self.gateway_name: str = gateway_name
+        self.tzinfo: TzInfo | None = tzinfo
+
+        self.datetime: np.ndarray = np.asarray(datetime, dtype="datetime64[us]")
+
+        for name in self.float_columns:
+            value: Any = columns.pop(name, None)
+            if value is None:
+                array: np.ndarray = np.zeros(len(self.datetime))
+            else:
+                array = np.asarray(value, dtype=np.float64)
+            setattr(self, name, array)
+
+        for name in self.datetime_columns:
+            value = columns.pop(name, None)
+            if value is None:
+                array = np.full(len(self.datetime), np.datetime64("NaT"), dtype="datetime64[us]")
+            else:
+                array = np.asarray(value, dtype="datetime64[us]")
+            setattr(self, name, array)
+
+        self.meta: dict[str, Any] = columns
+
+    @classmethod
+    def from_data(
+        cls,
+        data: list,
+        symbol: str,
+        exchange: Exchange,
+        gateway_name: str = "",
+        **meta: Any
+    ) -> "BaseBatch":
+        """
+        Create batch from list of data objects, gateway_name of the
+        first object is used if not specified.
+        """
+        tzinfo: TzInfo | None = None
+
+        if data:
+            tzinfo = data[0].datetime.tzinfo
+            gateway_name = gateway_name or data[0].gateway_name
+
+        if not gateway_name:
+            gateway_name = "DB"
+
+        dts: list[Datetime] = [d.datetime.replace(tzinfo=None) for d in data]
+        columns: dict[str, np.ndarray] = {
+            name: np.fromiter((getattr(d, name) for d in data), np.float64, len(data))
+            for name in cls.float_columns
+        }
+
+        for name in cls.datetime_columns:
+            values: list[Datetime | None] = [getattr(d, name) for d in data]
+            columns[name] = np.array(
+                [dt.replace(tzinfo=None) if dt else None for dt in values],
+                dtype="datetime64[us]"
+            )
+
+        return cls(symbol, exchange, np.array(dts, dtype="datetime64[us]"), gateway_name, tzinfo, **meta, **columns)
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.datetime)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """
+        Return data object of a row, or a batch of sliced rows.
+        """
+        if isinstance(index, slice):
+            return self.slice(index)
+
+        dt: Datetime = self.datetime[index].item().replace(tzinfo=self.tzinfo)
+        values: dict[str, Any] = {name: float(getattr(self, name)[index]) for name in self.float_columns}
+        for name in self.datetime_columns:
+            values[name] = getattr(self, name)[index].item()
+
+        return self.data_class(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            datetime=dt,
+            gateway_name=self.gateway_name,
+            **self.meta,
+            **values
+        )
+
+    def __iter__(self) -> Iterator:
+        """"""
+        for ix in range(len(self)):
+            yield self[ix]
+
+    def slice(self, index: slice) -> "BaseBatch":
+        """
+        Get rows of slice without copying arrays.
+        """
+        columns: dict[str, np.ndarray] = {
+            name: getattr(self, name)[index] for name in self.float_columns + self.datetime_columns
+        }
+
+        return type(self)(
+            self.symbol,
+            self.exchange,
+            self.datetime[index],
+            self.gateway_name,
+            self.tzinfo,
+            **self.meta,
+            **columns
+        )
+
+    def to_data(self, compact: bool = False) -> list:
+        """
+        Convert all rows into list of data objects, or compact data
+        objects using __slots__ if compact is set.
+        """
+        data_class: type = self.compact_class if compact else self.data_class
+
+        dts: list[Datetime] = [dt.replace(tzinfo=self.tzinfo) for dt in self.datetime.tolist()]
+
+        # NaT is converted into None by tolist
+        names: tuple[str, ...] = self.float_columns + self.datetime_columns
+        columns: list[list] = [getattr(self, name).tolist() for name in names]
+
+        data: list = []
+        for dt, *values in zip(dts, *columns):
+            d = data_class(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                gateway_name=self.gateway_name,
+                **self.meta,
+                **dict(zip(names, values))
+            )
+            data.append(d)
+
+        return data
+
+    def get_columns(self) -> dict[str, np.ndarray]:
+        """
+        Get all arrays of batch with datetime as the first column.
+        """
+        columns: dict[str, np.ndarray] = {"datetime": self.datetime}
+        for name in self.float_columns + self.datetime_columns:
+            columns[name] = getattr(self, name)
+        return columns
+
+    def to_polars(self) -> Any:
+        """
+        Convert into polars DataFrame, NumPy buffers are reused if possible.
+        """
+        import polars as pl
+
+        return pl.DataFrame(self.get_columns())
+
+    def to_pandas(self) -> Any:
+        """
+        Convert into pandas DataFrame without copying arrays.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.get_columns(), copy=False)
+
+
+class BarBatch(BaseBatch):
+    """
+    Columnar container of bar data, interval is passed as keyword.
+    """
+
+    data_class: type = BarData
+    compact_class: type = CompactBarData
+    float_columns: tuple[str, ...] = tuple(f.name for f in fields(BarData) if f.type is float)
+
+    @classmethod
+    def from_bars(
+        cls,
+        bars: list[BarData],
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        gateway_name: str = ""
+    ) -> "BarBatch":
+        """
+        Create batch from list of bar data.
+        """
+        return cls.from_data(bars, symbol, exchange, gateway_name, interval=interval)      # type: ignore
+
+    def to_bars(self, compact: bool = False) -> list[BarData]:
+        """
+        Convert into list of bar data, or CompactBarData objects with
+        the same attributes if compact is set, which take less memory
+        when holding a large amount of bars (e.g. in backtesting).
+        """
+        return self.to_data(compact)
+
+
+class TickBatch(BaseBatch):
+    """
+    Columnar container of tick data, localtime is stored as datetime column.
+    """
+
+    data_class: type = TickData
+    compact_class: type = CompactTickData
+    float_columns: tuple[str, ...] = tuple(f.name for f in fields(TickData) if f.type is float)
+    datetime_columns: tuple[str, ...] = ("localtime",)
+
+    @classmethod
+    def from_ticks(
+        cls,
+        ticks: list[TickData],
+        symbol: str,
+        exchange: Exchange,
+        gateway_name: str = ""
+    ) -> "TickBatch":
+        """
+        Create batch from list of tick data.
+        """
+        name: str = ticks[0].name if ticks else ""
+        return cls.from_data(ticks, symbol, exchange, gateway_name, name=name)       # type: ignore
+
+    def to_ticks(self, compact: bool = False) -> list[TickData]:
+        """
+        Convert into list of tick data, or CompactTickData objects with
+        the same attributes if compact is set.
+        """
+        return self.to_data(compact)
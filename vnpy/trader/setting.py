@@ -34,7 +34,10 @@ SETTINGS: dict = {
     "database.host": "",
     "database.port": 0,
     "database.user": "",
-    "database.password": ""
+    "database.password": "",
+    "database.partition": "",
+    "database.pool_size": 0,
+    "database.cache": False
 }
 
 
@@ -0,0 +1,682 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pyarrow as pa
+from pyarrow import ipc
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData, BarBatch, TickBatch
+from vnpy.trader.database import (
+    BaseDatabase,
+    BarOverview,
+    TickOverview,
+    DB_TZ,
+    convert_tz,
+    get_utc_offsets
+)
+from vnpy.trader.utility import get_folder_path
+
+
+# 数据文件后缀
+FILE_SUFFIX: str = ".arrow"
+
+# 流式写入的暂存文件后缀
+STAGE_SUFFIX: str = ".stage"
+
+
+class ArrowDatabase(BaseDatabase):
+    """
+    Arrow文件数据库接口
+
+    数据按合约/周期/月份存储为无压缩的Arrow IPC文件，文件内按时间排序：
+    bar/交易所/代码/周期/YYYYMM.arrow
+    tick/交易所/代码/YYYYMM.arrow
+
+    读取时通过文件名过滤月份，再对内存映射的时间列二分查找，只访问所需范围的数据。
+    汇总信息随写入和删除同步更新，保存在bar_overview.json和tick_overview.json中。
+
+    流式写入（stream=True）只将数据追加到月份的暂存文件YYYYMM.stage，不重写数据文件，
+    读取或非流式写入时再合并到数据文件。暂存数据合并前可能包含重复时间，
+    汇总信息中的数据量在合并后修正。
+
+    读取和写入都在锁内进行，读取的数据复制后即释放内存映射，
+    替换数据文件时本进程内不会仍有映射旧文件的读取（Windows下无法替换已映射的文件）。
+    """
+
+    def __init__(self, root: Path | None = None) -> None:
+        """默认存储在.vntrader/arrow文件夹下"""
+        if root:
+            root.mkdir(parents=True, exist_ok=True)
+            self.root: Path = root
+        else:
+            self.root = get_folder_path("arrow")
+
+        self.bar_path: Path = self.root.joinpath("bar")
+        self.tick_path: Path = self.root.joinpath("tick")
+        self.bar_overview_path: Path = self.root.joinpath("bar_overview.json")
+        self.tick_overview_path: Path = self.root.joinpath("tick_overview.json")
+
+        self.lock: Lock = Lock()
+
+        self.bar_overviews: dict[tuple, BarOverview] = {}
+        self.tick_overviews: dict[tuple, TickOverview] = {}
+
+        self.load_overview()
+
+    def save_bar_data(self, bars: list[BarData], stream: bool = False) -> bool:
+        """保存K线数据"""
+        bar: BarData = bars[0]
+        batch: BarBatch = BarBatch.from_bars(bars, bar.symbol, bar.exchange, bar.interval)
+        return self.save_bar_batch(batch, stream)
+
+    def save_tick_data(self, ticks: list[TickData], stream: bool = False) -> bool:
+        """保存TICK数据"""
+        tick: TickData = ticks[0]
+        batch: TickBatch = TickBatch.from_ticks(ticks, tick.symbol, tick.exchange)
+        return self.save_tick_batch(batch, stream)
+
+    def save_bar_batch(self, batch: BarBatch, stream: bool = False) -> bool:
+        """保存列式K线数据，stream为True时追加到暂存文件"""
+        if not len(batch):
+            return False
+
+        interval: Interval = batch.meta["interval"]
+        folder: Path = self.get_bar_folder(batch.symbol, batch.exchange, interval)
+
+        with self.lock:
+            count, start, end = self.write_batch(folder, batch, {}, stream)
+
+            key: tuple = (batch.symbol, batch.exchange.value, interval.value)
+            overview: BarOverview | None = self.bar_overviews.get(key, None)
+
+            if not overview:
+                overview = BarOverview(
+                    symbol=batch.symbol,
+                    exchange=batch.exchange,
+                    interval=interval,
+                    start=start,
+                    end=end
+                )
+                self.bar_overviews[key] = overview
+
+            update_overview(overview, count, start, end)
+            self.save_overview()
+
+        return True
+
+    def save_tick_batch(self, batch: TickBatch, stream: bool = False) -> bool:
+        """保存列式TICK数据，不保存本地时间字段，stream为True时追加到暂存文件"""
+        if not len(batch):
+            return False
+
+        folder: Path = self.get_tick_folder(batch.symbol, batch.exchange)
+        metadata: dict = {"name": batch.meta.get("name", "")}
+
+        with self.lock:
+            count, start, end = self.write_batch(folder, batch, metadata, stream)
+
+            key: tuple = (batch.symbol, batch.exchange.value)
+            overview: TickOverview | None = self.tick_overviews.get(key, None)
+
+            if not overview:
+                overview = TickOverview(
+                    symbol=batch.symbol,
+                    exchange=batch.exchange,
+                    start=start,
+                    end=end
+                )
+                self.tick_overviews[key] = overview
+
+            update_overview(overview, count, start, end)
+            self.save_overview()
+
+        return True
+
+    def write_batch(
+        self,
+        folder: Path,
+        batch: BarBatch | TickBatch,
+        metadata: dict,
+        stream: bool
+    ) -> tuple[int, datetime, datetime]:
+        """按月份写入数据文件，返回新增数据量以及写入数据的起止时间"""
+        folder.mkdir(parents=True, exist_ok=True)
+
+        dts: np.ndarray = convert_batch_datetime(batch)
+        columns: dict[str, np.ndarray] = batch.get_columns()
+        columns["datetime"] = dts
+
+        months: np.ndarray = dts.astype("datetime64[M]")
+        added: int = 0
+
+        for month in np.unique(months):
+            mask: np.ndarray = months == month
+            new: dict[str, np.ndarray] = {k: v[mask] for k, v in columns.items()}
+
+            path: Path = folder.joinpath(get_file_name(month))
+
+            # 流式写入只追加到暂存文件，避免每次都重写整个月份的数据文件
+            if stream:
+                append_stage(path.with_suffix(STAGE_SUFFIX), new, metadata)
+                added += len(new["datetime"])
+            else:
+                added += merge_month(path, metadata, new)
+
+        return added, dts.min().item(), dts.max().item()
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> list[BarData]:
+        """读取K线数据"""
+        batch: BarBatch = self.load_bar_batch(symbol, exchange, interval, start, end)
+        return batch.to_bars()
+
+    def load_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> list[TickData]:
+        """读取TICK数据"""
+        batch: TickBatch = self.load_tick_batch(symbol, exchange, start, end)
+        return batch.to_ticks()
+
+    def load_bar_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarBatch:
+        """读取K线数据，返回列式数据"""
+        folder: Path = self.get_bar_folder(symbol, exchange, interval)
+        key: tuple = (symbol, exchange.value, interval.value)
+
+        with self.lock:
+            self.compact_folder(folder, self.bar_overviews.get(key, None))
+            columns, _ = self.read_range(folder, BarBatch, start, end)
+
+        return BarBatch(symbol, exchange, gateway_name="DB", tzinfo=DB_TZ, interval=interval, **columns)
+
+    def load_tick_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> TickBatch:
+        """读取TICK数据，返回列式数据"""
+        folder: Path = self.get_tick_folder(symbol, exchange)
+        key: tuple = (symbol, exchange.value)
+
+        with self.lock:
+            self.compact_folder(folder, self.tick_overviews.get(key, None))
+            columns, metadata = self.read_range(folder, TickBatch, start, end)
+
+        return TickBatch(symbol, exchange, gateway_name="DB", tzinfo=DB_TZ, name=metadata.get("name", ""), **columns)
+
+    def compact_folder(self, folder: Path, overview: BarOverview | TickOverview | None) -> None:
+        """合并文件夹中流式写入的暂存文件，并修正汇总信息中的数据量"""
+        count: int = compact_folder(folder)
+
+        if count and overview:
+            overview.count += count
+            self.save_overview()
+
+    def read_range(
+        self,
+        folder: Path,
+        batch_class: type[BarBatch | TickBatch],
+        start: datetime,
+        end: datetime
+    ) -> tuple[dict[str, np.ndarray], dict]:
+        """读取时间范围内的数据列，以及数据文件的元数据"""
+        start64: np.datetime64 = to_datetime64(start)
+        end64: np.datetime64 = to_datetime64(end)
+
+        first: str = get_file_name(start64.astype("datetime64[M]"))
+        last: str = get_file_name(end64.astype("datetime64[M]"))
+
+        parts: list[dict[str, np.ndarray]] = []
+        metadata: dict = {}
+
+        if folder.exists():
+            for path in sorted(folder.glob("*" + FILE_SUFFIX)):
+                if not first <= path.name <= last:
+                    continue
+
+                part, metadata = read_slice(path, batch_class, start64, end64)
+                if part:
+                    parts.append(part)
+
+        columns: dict[str, np.ndarray] = {}
+        columns["datetime"] = np.concatenate([p["datetime"] for p in parts]) if parts else np.array([], dtype="datetime64[us]")
+        for name in batch_class.float_columns:
+            columns[name] = np.concatenate([p[name] for p in parts]) if parts else np.array([], dtype=np.float64)
+        for name in batch_class.datetime_columns:
+            columns[name] = np.concatenate([p[name] for p in parts]) if parts else np.array([], dtype="datetime64[us]")
+
+        return columns, metadata
+
+    def delete_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval
+    ) -> int:
+        """删除K线数据"""
+        folder: Path = self.get_bar_folder(symbol, exchange, interval)
+
+        with self.lock:
+            count: int = count_rows(folder)
+            shutil.rmtree(folder, ignore_errors=True)
+
+            self.bar_overviews.pop((symbol, exchange.value, interval.value), None)
+            self.save_overview()
+
+        return count
+
+    def delete_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange
+    ) -> int:
+        """删除TICK数据"""
+        folder: Path = self.get_tick_folder(symbol, exchange)
+
+        with self.lock:
+            count: int = count_rows(folder)
+            shutil.rmtree(folder, ignore_errors=True)
+
+            self.tick_overviews.pop((symbol, exchange.value), None)
+            self.save_overview()
+
+        return count
+
+    def get_bar_overview(self) -> list[BarOverview]:
+        """查询数据库中的K线汇总信息"""
+        return list(self.bar_overviews.values())
+
+    def get_tick_overview(self) -> list[TickOverview]:
+        """查询数据库中的Tick汇总信息"""
+        return list(self.tick_overviews.values())
+
+    def get_bar_folder(self, symbol: str, exchange: Exchange, interval: Interval) -> Path:
+        """获取K线数据文件夹"""
+        return self.bar_path.joinpath(exchange.value, symbol, interval.value)
+
+    def get_tick_folder(self, symbol: str, exchange: Exchange) -> Path:
+        """获取TICK数据文件夹"""
+        return self.tick_path.joinpath(exchange.value, symbol)
+
+    def load_overview(self) -> None:
+        """加载汇总信息，汇总文件不存在时扫描数据文件重建"""
+        if self.bar_overview_path.exists():
+            with open(self.bar_overview_path, encoding="UTF-8") as f:
+                for d in json.load(f):
+                    overview: BarOverview = BarOverview(
+                        symbol=d["symbol"],
+                        exchange=Exchange(d["exchange"]),
+                        interval=Interval(d["interval"]),
+                        count=d["count"],
+                        start=datetime.fromisoformat(d["start"]),
+                        end=datetime.fromisoformat(d["end"])
+                    )
+                    self.bar_overviews[(d["symbol"], d["exchange"], d["interval"])] = overview
+        else:
+            self.init_bar_overview()
+
+        if self.tick_overview_path.exists():
+            with open(self.tick_overview_path, encoding="UTF-8") as f:
+                for d in json.load(f):
+                    tick_overview: TickOverview = TickOverview(
+                        symbol=d["symbol"],
+                        exchange=Exchange(d["exchange"]),
+                        count=d["count"],
+                        start=datetime.fromisoformat(d["start"]),
+                        end=datetime.fromisoformat(d["end"])
+                    )
+                    self.tick_overviews[(d["symbol"], d["exchange"])] = tick_overview
+        else:
+            self.init_tick_overview()
+
+    def save_overview(self) -> None:
+        """保存汇总信息"""
+        bar_data: list[dict] = [
+            {
+                "symbol": o.symbol,
+                "exchange": k[1],
+                "interval": k[2],
+                "count": o.count,
+                "start": o.start.isoformat(),
+                "end": o.end.isoformat()
+            }
+            for k, o in self.bar_overviews.items()
+        ]
+        save_json(self.bar_overview_path, bar_data)
+
+        tick_data: list[dict] = [
+            {
+                "symbol": o.symbol,
+                "exchange": k[1],
+                "count": o.count,
+                "start": o.start.isoformat(),
+                "end": o.end.isoformat()
+            }
+            for k, o in self.tick_overviews.items()
+        ]
+        save_json(self.tick_overview_path, tick_data)
+
+    def init_bar_overview(self) -> None:
+        """扫描数据文件初始化K线汇总信息"""
+        for folder in self.bar_path.glob("*/*/*"):
+            exchange, symbol, interval = folder.relative_to(self.bar_path).parts
+
+            compact_folder(folder)
+            result: tuple | None = scan_folder(folder)
+            if not result:
+                continue
+
+            count, start, end = result
+            self.bar_overviews[(symbol, exchange, interval)] = BarOverview(
+                symbol=symbol,
+                exchange=Exchange(exchange),
+                interval=Interval(interval),
+                count=count,
+                start=start,
+                end=end
+            )
+
+    def init_tick_overview(self) -> None:
+        """扫描数据文件初始化Tick汇总信息"""
+        for folder in self.tick_path.glob("*/*"):
+            exchange, symbol = folder.relative_to(self.tick_path).parts
+
+            compact_folder(folder)
+            result: tuple | None = scan_folder(folder)
+            if not result:
+                continue
+
+            count, start, end = result
+            self.tick_overviews[(symbol, exchange)] = TickOverview(
+                symbol=symbol,
+                exchange=Exchange(exchange),
+                count=count,
+                start=start,
+                end=end
+            )
+
+
+def get_file_name(month: np.datetime64) -> str:
+    """获取月份对应的数据文件名，例如202401.arrow"""
+    return str(month).replace("-", "") + FILE_SUFFIX
+
+
+def to_datetime64(dt: datetime) -> np.datetime64:
+    """转换为数据库时区的无时区datetime64"""
+    if dt.tzinfo:
+        dt = convert_tz(dt)
+    return np.datetime64(dt, "us")
+
+
+def convert_batch_datetime(batch: BarBatch | TickBatch) -> np.ndarray:
+    """将列式数据的时间转换为数据库时区的无时区时间"""
+    if batch.tzinfo is None or batch.tzinfo == DB_TZ:
+        return batch.datetime
+
+    # 整列加减时区偏移，先转为UTC时间，再转为数据库时区时间
+    utc_dts: np.ndarray = batch.datetime - get_utc_offsets(batch.datetime, batch.tzinfo, True)
+    return utc_dts + get_utc_offsets(utc_dts, DB_TZ, False)
+
+
+def read_table(path: Path, memory_map: bool = False) -> pa.Table:
+    """
+    读取数据文件
+
+    memory_map为True时以内存映射方式读取，数据只在访问时才从磁盘加载，
+    返回的数据表被释放前会一直映射数据文件。
+    """
+    source: pa.NativeFile = pa.memory_map(str(path)) if memory_map else pa.OSFile(str(path))
+    with source:
+        return ipc.open_file(source).read_all()
+
+
+def read_slice(
+    path: Path,
+    batch_class: type[BarBatch | TickBatch],
+    start64: np.datetime64,
+    end64: np.datetime64
+) -> tuple[dict[str, np.ndarray] | None, dict]:
+    """
+    读取数据文件中时间范围内的数据，复制出所需范围的数据后即释放内存映射
+
+    早期写入的数据文件中没有的时间列填充为NaT
+    """
+    table: pa.Table = read_table(path, memory_map=True)
+    metadata: dict = get_metadata(table)
+
+    # 时间列已排序，二分查找数据范围
+    dts: np.ndarray = table.column("datetime").to_numpy()
+    ix: int = np.searchsorted(dts, start64, "left")
+    jx: int = np.searchsorted(dts, end64, "right")
+    if ix == jx:
+        return None, metadata
+
+    part: dict[str, np.ndarray] = {"datetime": dts[ix:jx].copy()}
+    for name in batch_class.float_columns:
+        part[name] = table.column(name).to_numpy()[ix:jx].copy()
+
+    for name in batch_class.datetime_columns:
+        if name in table.column_names:
+            part[name] = table.column(name).to_numpy()[ix:jx].astype("datetime64[us]")
+        else:
+            part[name] = np.full(jx - ix, np.datetime64("NaT"), dtype="datetime64[us]")
+
+    return part, metadata
+
+
+def get_metadata(table: pa.Table) -> dict:
+    """读取数据文件中保存的元数据"""
+    metadata: dict = table.schema.metadata or {}
+    return {k.decode(): v.decode() for k, v in metadata.items()}
+
+
+def read_columns(path: Path) -> tuple[dict[str, np.ndarray], dict]:
+    """读取数据文件的全部数据列和元数据"""
+    table: pa.Table = read_table(path)
+    return to_columns(table), get_metadata(table)
+
+
+def read_stage(path: Path) -> tuple[dict[str, np.ndarray], dict]:
+    """读取暂存文件的全部数据列和元数据，写入中断导致的不完整记录批次会被忽略"""
+    with pa.OSFile(str(path)) as source:
+        reader: ipc.RecordBatchStreamReader = ipc.open_stream(source)
+
+        batches: list[pa.RecordBatch] = []
+        while True:
+            try:
+                batches.append(reader.read_next_batch())
+            except (StopIteration, OSError):
+                break
+
+        table: pa.Table = pa.Table.from_batches(batches, reader.schema)
+
+    return to_columns(table), get_metadata(table)
+
+
+def append_stage(path: Path, columns: dict[str, np.ndarray], metadata: dict) -> None:
+    """
+    追加数据到暂存文件，无需读取已有数据
+
+    暂存文件为不含结束标记的Arrow IPC流，新建时先写入表结构，之后每次追加一个记录批次。
+    """
+    table: pa.Table = to_table(columns, metadata)
+
+    data: bytes = b"" if path.exists() else table.schema.serialize().to_pybytes()
+    for batch in table.to_batches():
+        data += batch.serialize().to_pybytes()
+
+    with open(path, mode="ab") as f:
+        f.write(data)
+
+
+def merge_month(path: Path, metadata: dict | None = None, new: dict[str, np.ndarray] | None = None) -> int:
+    """
+    合并月份的数据文件、暂存文件和新数据，写入数据文件后删除暂存文件
+
+    metadata为None时保留已有文件的元数据，返回数据量相对原有文件数据量之和的变化
+    """
+    stage_path: Path = path.with_suffix(STAGE_SUFFIX)
+
+    parts: list[dict[str, np.ndarray]] = []
+    file_metadata: dict = {}
+
+    if path.exists():
+        columns, file_metadata = read_columns(path)
+        parts.append(columns)
+
+    if stage_path.exists():
+        columns, file_metadata = read_stage(stage_path)
+        parts.append(columns)
+
+    count: int = sum(len(p["datetime"]) for p in parts)
+
+    if new:
+        parts.append(new)
+
+    if not parts:
+        return 0
+
+    data: dict[str, np.ndarray] = merge_columns(*parts)
+    write_columns(path, data, file_metadata if metadata is None else metadata)
+    stage_path.unlink(missing_ok=True)
+
+    return len(data["datetime"]) - count
+
+
+def compact_folder(folder: Path) -> int:
+    """合并文件夹中全部暂存文件，返回数据量的变化（暂存数据中的重复时间被去除）"""
+    if not folder.exists():
+        return 0
+
+    count: int = 0
+    for stage_path in sorted(folder.glob("*" + STAGE_SUFFIX)):
+        count += merge_month(stage_path.with_suffix(FILE_SUFFIX))
+    return count
+
+
+def to_columns(table: pa.Table) -> dict[str, np.ndarray]:
+    """转换数据表为数据列"""
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def to_table(columns: dict[str, np.ndarray], metadata: dict) -> pa.Table:
+    """转换数据列为数据表，datetime64数据列保存为时间戳（NaT保存为空值），其他均保存为浮点数"""
+    arrays: dict[str, pa.Array] = {"datetime": pa.array(columns["datetime"], type=pa.timestamp("us"))}
+    for name, array in columns.items():
+        if name == "datetime":
+            continue
+        elif array.dtype.kind == "M":
+            arrays[name] = pa.array(array, type=pa.timestamp("us"))
+        else:
+            arrays[name] = pa.array(array, type=pa.float64())
+
+    return pa.table(arrays).replace_schema_metadata(metadata)
+
+
+def merge_columns(*parts: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    合并数据并按时间排序，时间重复时保留后面的数据
+
+    早期写入的数据中没有的时间列填充为NaT
+    """
+    names: dict[str, np.dtype] = {}
+    for p in parts:
+        for name, array in p.items():
+            names.setdefault(name, array.dtype)
+
+    columns: dict[str, np.ndarray] = {}
+    for name, dtype in names.items():
+        arrays: list[np.ndarray] = []
+        for p in parts:
+            if name in p:
+                arrays.append(p[name])
+            else:
+                arrays.append(np.full(len(p["datetime"]), np.datetime64("NaT"), dtype=dtype))
+        columns[name] = np.concatenate(arrays)
+
+    dts: np.ndarray = columns["datetime"]
+    ix: np.ndarray = np.argsort(dts, kind="stable")
+
+    # 稳定排序后重复时间的最后一条即为最新数据
+    sorted_dts: np.ndarray = dts[ix]
+    keep: np.ndarray = np.append(sorted_dts[1:] != sorted_dts[:-1], True)
+    ix = ix[keep]
+
+    return {name: array[ix] for name, array in columns.items()}
+
+
+def write_columns(path: Path, columns: dict[str, np.ndarray], metadata: dict) -> None:
+    """写入数据文件，先写临时文件再替换，避免写入中断损坏已有数据"""
+    table: pa.Table = to_table(columns, metadata)
+
+    temp_path: Path = path.with_suffix(".tmp")
+    with pa.OSFile(str(temp_path), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    os.replace(temp_path, path)
+
+
+def count_rows(folder: Path) -> int:
+    """统计文件夹中全部数据文件的数据量"""
+    if not folder.exists():
+        return 0
+
+    count: int = sum(read_table(path, memory_map=True).num_rows for path in folder.glob("*" + FILE_SUFFIX))
+    for path in folder.glob("*" + STAGE_SUFFIX):
+        columns, _ = read_stage(path)
+        count += len(columns["datetime"])
+    return count
+
+
+def scan_folder(folder: Path) -> tuple[int, datetime, datetime] | None:
+    """扫描文件夹中的数据文件，返回数据量和起止时间"""
+    paths: list[Path] = sorted(folder.glob("*" + FILE_SUFFIX))
+    if not paths:
+        return None
+
+    count: int = 0
+    for path in paths:
+        count += read_table(path, memory_map=True).num_rows
+
+    start: datetime = read_table(paths[0], memory_map=True).column("datetime")[0].as_py()
+    end: datetime = read_table(paths[-1], memory_map=True).column("datetime")[-1].as_py()
+    return count, start, end
+
+
+def update_overview(overview: BarOverview | TickOverview, count: int, start: datetime, end: datetime) -> None:
+    """根据新写入的数据更新汇总信息"""
+    overview.count += count
+    overview.start = min(start, overview.start)
+    overview.end = max(end, overview.end)
+
+
+def save_json(path: Path, data: list) -> None:
+    """保存汇总数据到JSON文件"""
+    temp_path: Path = path.with_suffix(".tmp")
+    with open(temp_path, mode="w+", encoding="UTF-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(temp_path, path)
@@ -0,0 +1,416 @@
+import json
+import os
+from collections.abc import Callable
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData, BarBatch, TickBatch
+from vnpy.trader.database import (
+    BaseDatabase,
+    BarOverview,
+    TickOverview,
+    convert_tz
+)
+from vnpy.trader.utility import get_folder_path
+
+from .arrow_database import ArrowDatabase
+
+
+class CacheDatabase(BaseDatabase):
+    """
+    带有本地缓存的数据库接口
+
+    从远程数据库读取过的时间范围会保存到本地Arrow文件，再次读取时只查询缺失的部分。
+    定期比较远程汇总信息中的end和count水位，判断缓存数据是否仍然有效：
+    只在end之后追加了数据时保留缓存，其他变化则删除该合约的缓存。
+
+    保存数据时只更新已有缓存记录的合约，使删除缓存时能找到写入的数据。
+    远程数据库在保存范围内可能还有其他数据，因此不扩展已缓存的时间范围。
+    """
+
+    def __init__(
+        self,
+        database: BaseDatabase,
+        root: Path | None = None,
+        check_interval: int = 60
+    ) -> None:
+        """check_interval为检查远程汇总水位的最短间隔（秒）"""
+        self.database: BaseDatabase = database
+        self.cache: ArrowDatabase = ArrowDatabase(root or get_folder_path("arrow_cache"))
+
+        self.check_interval: int = check_interval
+        self.check_time: float = 0
+
+        self.lock: Lock = Lock()
+
+        # 远程汇总水位，键为缓存键，值为(end, count)
+        self.watermarks: dict[str, tuple[datetime, int]] = {}
+
+        # 缓存记录，包括合约信息、已缓存的时间范围和缓存时的远程水位
+        self.records: dict[str, dict] = {}
+        self.records_path: Path = self.cache.root.joinpath("cache_records.json")
+        self.load_records()
+
+    def save_bar_data(self, bars: list[BarData], stream: bool = False) -> bool:
+        """保存K线数据到远程数据库，已有缓存记录时同时更新本地缓存"""
+        result: bool = self.database.save_bar_data(bars, stream)
+
+        bar: BarData = bars[0]
+        key: str = get_bar_key(bar.symbol, bar.exchange.value, bar.interval.value)      # type: ignore
+
+        with self.lock:
+            if key in self.records:
+                self.cache.save_bar_data(bars, stream)
+
+        return result
+
+    def save_tick_data(self, ticks: list[TickData], stream: bool = False) -> bool:
+        """保存TICK数据到远程数据库，已有缓存记录时同时更新本地缓存"""
+        result: bool = self.database.save_tick_data(ticks, stream)
+
+        tick: TickData = ticks[0]
+        key: str = get_tick_key(tick.symbol, tick.exchange.value)
+
+        with self.lock:
+            if key in self.records:
+                self.cache.save_tick_data(ticks, stream)
+
+        return result
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> list[BarData]:
+        """读取K线数据"""
+        batch: BarBatch = self.load_bar_batch(symbol, exchange, interval, start, end)
+        return batch.to_bars()
+
+    def load_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> list[TickData]:
+        """读取TICK数据"""
+        batch: TickBatch = self.load_tick_batch(symbol, exchange, start, end)
+        return batch.to_ticks()
+
+    def load_bar_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarBatch:
+        """读取K线数据，缓存中缺失的时间范围从远程数据库读取"""
+        key: str = get_bar_key(symbol, exchange.value, interval.value)
+        start = to_db_datetime(start)
+        end = to_db_datetime(end)
+
+        self.check_watermarks()
+
+        cached: bool = self.fill_gaps(
+            key,
+            start,
+            end,
+            partial(self.database.load_bar_batch, symbol, exchange, interval),
+            self.cache.save_bar_batch,
+            symbol=symbol,
+            exchange=exchange.value,
+            interval=interval.value
+        )
+        if not cached:
+            return self.database.load_bar_batch(symbol, exchange, interval, start, end)
+
+        return self.cache.load_bar_batch(symbol, exchange, interval, start, end)
+
+    def load_tick_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> TickBatch:
+        """读取TICK数据，缓存中缺失的时间范围从远程数据库读取"""
+        key: str = get_tick_key(symbol, exchange.value)
+        start = to_db_datetime(start)
+        end = to_db_datetime(end)
+
+        self.check_watermarks()
+
+        cached: bool = self.fill_gaps(
+            key,
+            start,
+            end,
+            partial(self.database.load_tick_batch, symbol, exchange),
+            self.cache.save_tick_batch,
+            symbol=symbol,
+            exchange=exchange.value
+        )
+        if not cached:
+            return self.database.load_tick_batch(symbol, exchange, start, end)
+
+        return self.cache.load_tick_batch(symbol, exchange, start, end)
+
+    def delete_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval
+    ) -> int:
+        """删除K线数据"""
+        count: int = self.database.delete_bar_data(symbol, exchange, interval)
+
+        with self.lock:
+            self.invalidate(get_bar_key(symbol, exchange.value, interval.value))
+            self.save_records()
+
+        return count
+
+    def delete_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange
+    ) -> int:
+        """删除TICK数据"""
+        count: int = self.database.delete_tick_data(symbol, exchange)
+
+        with self.lock:
+            self.invalidate(get_tick_key(symbol, exchange.value))
+            self.save_records()
+
+        return count
+
+    def get_bar_overview(self) -> list[BarOverview]:
+        """查询远程数据库中的K线汇总信息"""
+        return self.database.get_bar_overview()
+
+    def get_tick_overview(self) -> list[TickOverview]:
+        """查询远程数据库中的Tick汇总信息"""
+        return self.database.get_tick_overview()
+
+    def check_watermarks(self, force: bool = False) -> None:
+        """查询远程汇总水位，删除数据发生变化的缓存"""
+        if not force and monotonic() - self.check_time < self.check_interval:
+            return
+        self.check_time = monotonic()
+
+        watermarks: dict[str, tuple[datetime, int]] = {}
+
+        for bar_overview in self.database.get_bar_overview():
+            key: str = get_bar_key(bar_overview.symbol, bar_overview.exchange.value, bar_overview.interval.value)
+            watermarks[key] = (to_db_datetime(bar_overview.end), bar_overview.count)
+
+        for tick_overview in self.database.get_tick_overview():
+            key = get_tick_key(tick_overview.symbol, tick_overview.exchange.value)
+            watermarks[key] = (to_db_datetime(tick_overview.end), tick_overview.count)
+
+        with self.lock:
+            self.watermarks = watermarks
+
+            for key, record in list(self.records.items()):
+                watermark: tuple[datetime, int] | None = watermarks.get(key, None)
+
+                # 远程数据已删除
+                if not watermark:
+                    self.invalidate(key)
+                    continue
+
+                # 缓存时远程还没有数据
+                if not record["end"]:
+                    continue
+
+                end, count = watermark
+                cache_end: datetime = datetime.fromisoformat(record["end"])
+                cache_count: int = record["count"]
+
+                # 只在已缓存数据之后追加了新数据，已缓存的范围仍然有效
+                if (end == cache_end and count == cache_count) or (end > cache_end and count > cache_count):
+                    record["end"] = end.isoformat()
+                    record["count"] = count
+                    continue
+
+                self.invalidate(key)
+
+            self.save_records()
+
+    def fill_gaps(
+        self,
+        key: str,
+        start: datetime,
+        end: datetime,
+        load_func: Callable[[datetime, datetime], BarBatch | TickBatch],
+        save_func: Callable[[BarBatch | TickBatch], bool],
+        **info: str
+    ) -> bool:
+        """
+        从远程数据库读取缓存中缺失的时间范围并写入缓存
+
+        只在计算缺失范围和写入缓存时持有锁，远程读取期间不阻塞其他读取。
+        读取期间缓存被删除时，读取到的数据可能已经过期，不写入缓存并返回False。
+        """
+        with self.lock:
+            record: dict = self.get_record(key, **info)
+            gaps: list[tuple[datetime, datetime]] = subtract_ranges(record["ranges"], start, end)
+
+        if not gaps:
+            return True
+
+        batches: list[BarBatch | TickBatch] = [load_func(gap_start, gap_end) for gap_start, gap_end in gaps]
+
+        with self.lock:
+            if self.records.get(key, None) is not record:
+                return False
+
+            for (gap_start, gap_end), batch in zip(gaps, batches):
+                if len(batch):
+                    save_func(batch)
+                self.add_range(key, gap_start, gap_end)
+
+            self.save_records()
+
+        return True
+
+    def get_record(self, key: str, **info: str) -> dict:
+        """获取缓存记录，不存在则创建"""
+        record: dict | None = self.records.get(key, None)
+
+        if not record:
+            record = {"ranges": [], "end": "", "count": 0, **info}
+            self.records[key] = record
+
+        return record
+
+    def add_range(self, key: str, start: datetime, end: datetime) -> None:
+        """
+        记录已缓存的时间范围
+
+        范围截止到远程水位end为止，之后可能有新数据写入，下次读取时仍需查询
+        """
+        watermark: tuple[datetime, int] | None = self.watermarks.get(key, None)
+        if not watermark:
+            return
+
+        watermark_end, count = watermark
+        end = min(end, watermark_end)
+        if end < start:
+            return
+
+        record: dict = self.records[key]
+        record["ranges"] = merge_ranges(record["ranges"] + [(start, end)])
+
+        # 已有缓存的水位由check_watermarks负责更新
+        if not record["end"]:
+            record["end"] = watermark_end.isoformat()
+            record["count"] = count
+
+    def invalidate(self, key: str) -> None:
+        """删除合约的全部缓存数据"""
+        record: dict | None = self.records.pop(key, None)
+        if not record:
+            return
+
+        exchange: Exchange = Exchange(record["exchange"])
+
+        if "interval" in record:
+            self.cache.delete_bar_data(record["symbol"], exchange, Interval(record["interval"]))
+        else:
+            self.cache.delete_tick_data(record["symbol"], exchange)
+
+    def load_records(self) -> None:
+        """加载缓存记录"""
+        if not self.records_path.exists():
+            return
+
+        with open(self.records_path, encoding="UTF-8") as f:
+            data: dict = json.load(f)
+
+        for key, record in data.items():
+            record["ranges"] = [
+                (datetime.fromisoformat(s), datetime.fromisoformat(e)) for s, e in record["ranges"]
+            ]
+            self.records[key] = record
+
+    def save_records(self) -> None:
+        """保存缓存记录"""
+        data: dict = {}
+        for key, record in self.records.items():
+            data[key] = {
+                **record,
+                "ranges": [(s.isoformat(), e.isoformat()) for s, e in record["ranges"]]
+            }
+
+        temp_path: Path = self.records_path.with_suffix(".tmp")
+        with open(temp_path, mode="w+", encoding="UTF-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, self.records_path)
+
+
+def get_bar_key(symbol: str, exchange: str, interval: str) -> str:
+    """获取K线数据的缓存键"""
+    return f"bar.{symbol}.{exchange}.{interval}"
+
+
+def get_tick_key(symbol: str, exchange: str) -> str:
+    """获取TICK数据的缓存键"""
+    return f"tick.{symbol}.{exchange}"
+
+
+def to_db_datetime(dt: datetime) -> datetime:
+    """转换为数据库时区的无时区时间"""
+    if dt.tzinfo:
+        return convert_tz(dt)
+    return dt
+
+
+def merge_ranges(ranges: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """合并重叠的时间范围"""
+    merged: list[tuple[datetime, datetime]] = []
+
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def subtract_ranges(
+    ranges: list[tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime
+) -> list[tuple[datetime, datetime]]:
+    """计算[start, end]中未被已缓存范围覆盖的部分"""
+    if start == end:
+        if any(s <= start <= e for s, e in ranges):
+            return []
+        return [(start, end)]
+
+    gaps: list[tuple[datetime, datetime]] = []
+    cursor: datetime = start
+
+    for range_start, range_end in ranges:
+        if range_end < cursor:
+            continue
+        if range_start > end:
+            break
+
+        if range_start > cursor:
+            gaps.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+
+    if cursor < end:
+        gaps.append((cursor, end))
+
+    return gaps
@@ -2,7 +2,8 @@ from collections import defaultdict
 from datetime import (
     date as Date,
     datetime,
-    timedelta
+    timedelta,
+    time
 )
 from typing import cast, Any
 from collections.abc import Callable
@@ -24,7 +25,7 @@ from vnpy.trader.constant import (
 )
 from vnpy.trader.database import get_database, BaseDatabase
 from vnpy.trader.object import OrderData, TradeData, BarData, TickData
-from vnpy.trader.utility import round_to, extract_vt_symbol
+from vnpy.trader.utility import round_to, extract_vt_symbol, BarGenerator
 from vnpy.trader.optimize import (
     OptimizationSetting,
     check_optimization_setting,
@@ -77,6 +78,7 @@ class BacktestingEngine:
         self.days: int = 0
         self.callback: Callable
         self.history_data: list = []
+        self.bar_generators: list[BarGenerator] = []
 
         self.stop_order_count: int = 0
         self.stop_orders: dict[str, StopOrder] = {}
@@ -155,6 +157,7 @@ class BacktestingEngine:
     def add_strategy(self, strategy_class: type[CtaTemplate], setting: dict) -> None:
         """"""
         self.strategy_class = strategy_class
+        self.bar_generators.clear()
         self.strategy = strategy_class(
             self, strategy_class.__name__, self.vt_symbol, setting
         )
@@ -622,6 +625,11 @@ class BacktestingEngine:
         self.cross_stop_order()
         self.strategy.on_bar(bar)
 
+        # Strategy on_bar has already been called with 1 minute bar
+        for bg in self.bar_generators:
+            if bg.window or bg.on_bar != self.strategy.on_bar:
+                bg.on_bar(bar)
+
         self.update_daily_close(bar.close_price)
 
     def new_tick(self, tick: TickData) -> None:
@@ -633,6 +641,9 @@ class BacktestingEngine:
         self.cross_stop_order()
         self.strategy.on_tick(tick)
 
+        for bg in self.bar_generators:
+            bg.update_tick(tick)
+
         self.update_daily_close(tick.last_price)
 
     def cross_limit_order(self) -> None:
@@ -822,6 +833,25 @@ class BacktestingEngine:
 
         return bars
 
+    def subscribe_bar(
+        self,
+        strategy: CtaTemplate,
+        window: int,
+        interval: Interval,
+        callback: Callable,
+        daily_end: time | None = None
+    ) -> None:
+        """
+        Generate subscribed bar locally to simulate the bar engine.
+        """
+        bg: BarGenerator = BarGenerator(callback, window, callback, interval, daily_end)
+
+        # 1 minute bar is updated into window bar generator
+        if window:
+            bg.on_bar = bg.update_bar
+
+        self.bar_generators.append(bg)
+
     def load_tick(self, vt_symbol: str, days: int, callback: Callable) -> list[TickData]:
         """"""
         self.callback = callback
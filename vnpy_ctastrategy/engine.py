@@ -5,7 +5,7 @@ from pathlib import Path
 from types import ModuleType
 from typing import Any
 from collections.abc import Callable
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from glob import glob
@@ -85,6 +85,7 @@ class CtaEngine(BaseEngine):
         self.strategies: dict = {}                                      # strategy_name: strategy
 
         self.symbol_strategy_map: defaultdict = defaultdict(list)       # vt_symbol: strategy list
+        self.bar_callback_map: defaultdict = defaultdict(list)          # bar event type: (strategy, callback) list
         self.orderid_strategy_map: dict = {}                            # vt_orderid: strategy
         self.strategy_orderid_map: defaultdict = defaultdict(set)       # strategy_name: orderid set
 
@@ -113,6 +114,8 @@ class CtaEngine(BaseEngine):
 
     def register_event(self) -> None:
         """"""
+        # Strategy state is shared by tick, order and trade events, so
+        # all handlers are called in the same worker of event engine.
         self.event_engine.register(EVENT_TICK, self.process_tick_event)
         self.event_engine.register(EVENT_ORDER, self.process_order_event)
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
@@ -158,6 +161,15 @@ class CtaEngine(BaseEngine):
             if strategy.inited:
                 self.call_strategy_func(strategy, strategy.on_tick, tick)
 
+    def process_bar_event(self, event: Event) -> None:
+        """"""
+        bar: BarData = event.data
+
+        # Each strategy gets its own copy of the shared bar object
+        for strategy, callback in self.bar_callback_map.get(event.type, []):
+            if strategy.inited:
+                self.call_strategy_func(strategy, callback, copy(bar))
+
     def process_order_event(self, event: Event) -> None:
         """"""
         order: OrderData = event.data
@@ -586,6 +598,24 @@ class CtaEngine(BaseEngine):
 
         return bars
 
+    def subscribe_bar(
+        self,
+        strategy: CtaTemplate,
+        window: int,
+        interval: Interval,
+        callback: Callable[[BarData], None],
+        daily_end: time | None = None
+    ) -> None:
+        """
+        Subscribe bar generated by the shared bar engine.
+        """
+        event_type: str = self.main_engine.subscribe_bar(strategy.vt_symbol, window, interval, daily_end)
+
+        if event_type not in self.bar_callback_map:
+            self.event_engine.register(event_type, self.process_bar_event)
+
+        self.bar_callback_map[event_type].append((strategy, callback))
+
     def load_tick(
         self,
         vt_symbol: str,
@@ -770,6 +800,18 @@ class CtaEngine(BaseEngine):
         strategies: list = self.symbol_strategy_map[strategy.vt_symbol]
         strategies.remove(strategy)
 
+        # Remove from bar callback map and cancel bar subscriptions
+        for event_type, callbacks in list(self.bar_callback_map.items()):
+            for c in callbacks:
+                if c[0] is strategy:
+                    self.main_engine.unsubscribe_bar(event_type)
+
+            callbacks[:] = [c for c in callbacks if c[0] is not strategy]
+
+            if not callbacks:
+                self.event_engine.unregister(event_type, self.process_bar_event)
+                self.bar_callback_map.pop(event_type)
+
         # Remove from active orderid map
         if strategy_name in self.strategy_orderid_map:
             vt_orderids: set = self.strategy_orderid_map.pop(strategy_name)
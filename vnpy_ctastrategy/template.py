@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from copy import copy
+from datetime import time
 from typing import Any, cast
 from collections.abc import Callable
 
@@ -307,6 +308,22 @@ class CtaTemplate(ABC):
         for bar in bars:
             callback(bar)
 
+    def subscribe_bar(
+        self,
+        window: int = 0,
+        interval: Interval = Interval.MINUTE,
+        callback: Callable | None = None,
+        daily_end: time | None = None
+    ) -> None:
+        """
+        Subscribe bar data generated by engine instead of using
+        a BarGenerator of strategy itself.
+        """
+        if not callback:
+            callback = self.on_bar
+
+        self.cta_engine.subscribe_bar(self, window, interval, callback, daily_end)
+
     def load_tick(self, days: int) -> None:
         """
         Load historical tick data for initializing strategy.
@@ -26,7 +26,6 @@ from vnpy.trader.object import (
     SubscribeRequest,
 )
 from vnpy.trader.utility import get_folder_path, ZoneInfo
-from vnpy.trader.event import EVENT_TIMER
 
 from ..api import (
     MdApi,
@@ -157,7 +156,7 @@ class CtpGateway(BaseGateway):
         self.td_api: CtpTdApi = CtpTdApi(self)
         self.md_api: CtpMdApi = CtpMdApi(self)
 
-        self.count: int = 0
+        self.query_timer_id: int = 0
 
     def connect(self, setting: dict) -> None:
         """连接交易接口"""
@@ -210,6 +209,10 @@ class CtpGateway(BaseGateway):
 
     def close(self) -> None:
         """关闭接口"""
+        if self.query_timer_id:
+            self.event_engine.remove_timer(self.query_timer_id)
+            self.query_timer_id = 0
+
         self.td_api.close()
         self.md_api.close()
 
@@ -223,11 +226,6 @@ class CtpGateway(BaseGateway):
 
     def process_timer_event(self, event: Event) -> None:
         """定时事件处理"""
-        self.count += 1
-        if self.count < 2:
-            return
-        self.count = 0
-
         func = self.query_functions.pop(0)
         func()
         self.query_functions.append(func)
@@ -237,7 +235,9 @@ class CtpGateway(BaseGateway):
     def init_query(self) -> None:
         """初始化查询任务"""
         self.query_functions: list = [self.query_account, self.query_position]
-        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+
+        if not self.query_timer_id:
+            self.query_timer_id = self.event_engine.add_timer(2, self.process_timer_event, affinity=self.gateway_name)
 
 
 class CtpMdApi(MdApi):
@@ -1,5 +1,15 @@
-from datetime import datetime
-
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+from inspect import isgeneratorfunction
+from itertools import groupby, repeat
+from operator import itemgetter
+from threading import Lock
+from time import perf_counter
+
+import numpy as np
+from pymysql.cursors import SSCursor
 from peewee import (
     AutoField,
     CharField,
@@ -12,34 +22,124 @@ from peewee import (
     ModelDelete,
     chunked,
     fn,
-    Asc,
-    Desc
+    Tuple
 )
+from playhouse.pool import PooledMySQLDatabase, MaxConnectionsExceeded
 from playhouse.shortcuts import ReconnectMixin
 
 from vnpy.trader.constant import Exchange, Interval
-from vnpy.trader.object import BarData, TickData
+from vnpy.trader.object import BarData, TickData, BarBatch, TickBatch
 from vnpy.trader.database import (
     BaseDatabase,
     BarOverview,
     TickOverview,
     DB_TZ,
-    convert_tz
+    convert_tz,
+    get_utc_offsets
 )
 from vnpy.trader.setting import SETTINGS
+from vnpy.trader.utility import extract_vt_symbol
 
 
 class ReconnectMySQLDatabase(ReconnectMixin, PeeweeMySQLDatabase):
     """带有重连混入的MySQL数据库类"""
     pass
 
-db = ReconnectMySQLDatabase(
-    database=SETTINGS["database.database"],
-    user=SETTINGS["database.user"],
-    password=SETTINGS["database.password"],
-    host=SETTINGS["database.host"],
-    port=SETTINGS["database.port"]
-)
+
+class ReconnectPooledMySQLDatabase(ReconnectMixin, PooledMySQLDatabase):
+    """带有重连混入的MySQL连接池数据库类，统计获取连接的等待时间"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        """"""
+        super().__init__(*args, **kwargs)
+
+        self.stats_lock: Lock = Lock()
+        self.acquire_count: int = 0
+        self.timeout_count: int = 0
+        self.wait_total: float = 0
+        self.wait_max: float = 0
+
+    def connect(self, reuse_if_open: bool = False) -> bool:
+        """从连接池获取连接，连接池已满时等待其他线程归还"""
+        start: float = perf_counter()
+
+        try:
+            return super().connect(reuse_if_open)
+        except MaxConnectionsExceeded:
+            with self.stats_lock:
+                self.timeout_count += 1
+            raise
+        finally:
+            wait: float = perf_counter() - start
+
+            with self.stats_lock:
+                self.acquire_count += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+    def get_pool_status(self) -> dict:
+        """获取连接池状态，等待时间单位为毫秒"""
+        with self.stats_lock:
+            count: int = self.acquire_count
+            wait_avg: float = self.wait_total / count if count else 0
+
+            return {
+                "size": self._max_connections,
+                "active": len(self._in_use),
+                "idle": len(self._connections),
+                "acquire_count": count,
+                "timeout_count": self.timeout_count,
+                "wait_avg": wait_avg * 1000,
+                "wait_max": self.wait_max * 1000,
+            }
+
+
+# 连接池大小，为0时不使用连接池，每个线程各自持有一个长连接
+POOL_SIZE: int = SETTINGS["database.pool_size"]
+
+# 连接池已满时获取连接的最长等待时间（秒）
+POOL_TIMEOUT: int = 30
+
+# 空闲连接超过该时间（秒）后关闭重建，避免被服务端断开
+POOL_STALE_TIMEOUT: int = 3600
+
+if POOL_SIZE:
+    db: PeeweeMySQLDatabase = ReconnectPooledMySQLDatabase(
+        database=SETTINGS["database.database"],
+        user=SETTINGS["database.user"],
+        password=SETTINGS["database.password"],
+        host=SETTINGS["database.host"],
+        port=SETTINGS["database.port"],
+        max_connections=POOL_SIZE,
+        stale_timeout=POOL_STALE_TIMEOUT,
+        timeout=POOL_TIMEOUT
+    )
+else:
+    db = ReconnectMySQLDatabase(
+        database=SETTINGS["database.database"],
+        user=SETTINGS["database.user"],
+        password=SETTINGS["database.password"],
+        host=SETTINGS["database.host"],
+        port=SETTINGS["database.port"]
+    )
+
+
+def use_connection(func: Callable) -> Callable:
+    """使用连接池时，在数据库接口函数（包括生成器）执行期间占用当前线程的连接"""
+    if isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(self: "MysqlDatabase", *args, **kwargs) -> Iterator:
+            with self.connection():
+                yield from func(self, *args, **kwargs)
+
+        return generator_wrapper
+
+    @wraps(func)
+    def wrapper(self: "MysqlDatabase", *args, **kwargs) -> object:
+        with self.connection():
+            return func(self, *args, **kwargs)
+
+    return wrapper
 
 
 class DateTimeMillisecondField(DateTimeField):
@@ -160,18 +260,69 @@ class DbTickOverview(Model):
         indexes: tuple = ((("symbol", "exchange"), True),)
 
 
+# 流式读取时每批返回的数据行数
+STREAM_BATCH_SIZE: int = 100_000
+
+# 批量写入时每次提交的数据行数
+SAVE_BATCH_SIZE: int = 10_000
+
+# 批量写入时的数据表字段
+BAR_COLUMNS: list[str] = ["symbol", "exchange", "interval", "datetime", *BarBatch.float_columns]
+TICK_COLUMNS: list[str] = ["symbol", "exchange", "datetime", "name", "localtime", *TickBatch.float_columns]
+
+# 数据表分区模式，month为按月范围分区，留空则不分区
+PARTITION_MODE: str = SETTINGS["database.partition"]
+
+
 class MysqlDatabase(BaseDatabase):
     """Mysql数据库接口"""
 
     def __init__(self) -> None:
         """"""
         self.db: PeeweeMySQLDatabase = db
-        self.db.connect()
+        self.pooled: bool = isinstance(db, PooledMySQLDatabase)
+
+        # 不使用连接池时保持原有的长连接
+        if not self.pooled:
+            self.db.connect()
+
+        # 各数据表的分区上边界缓存，None表示MAXVALUE
+        self.partition_bounds: dict[str, list[datetime | None]] = {}
 
         # 如果数据表不存在，则执行创建初始化
-        if not DbBarData.table_exists():
-            self.db.create_tables([DbBarData, DbTickData, DbBarOverview, DbTickOverview])
+        with self.connection():
+            if not DbBarData.table_exists():
+                self.db.create_tables([DbBarData, DbTickData, DbBarOverview, DbTickOverview])
+
+                # 新建数据表时按设置启用分区
+                if PARTITION_MODE == "month":
+                    self.init_partition(DbBarData)
+                    self.init_partition(DbTickData)
+
+    @contextmanager
+    def connection(self) -> Iterator[None]:
+        """
+        从连接池获取当前线程的连接，退出时归还
+
+        当前线程已持有连接时（嵌套调用）直接复用，由最外层负责归还
+        """
+        if not self.pooled or not self.db.is_closed():
+            yield
+            return
 
+        self.db.connect()
+        try:
+            yield
+        finally:
+            self.db.close()
+
+    def get_pool_status(self) -> dict:
+        """获取连接池状态，未使用连接池时返回空字典"""
+        if not self.pooled:
+            return {}
+        return self.db.get_pool_status()
+
+    @use_connection
     def save_bar_data(self, bars: list[BarData], stream: bool = False) -> bool:
         """保存K线数据"""
         # 读取主键参数
@@ -180,58 +331,34 @@ class MysqlDatabase(BaseDatabase):
         exchange: Exchange = bar.exchange
         interval: Interval = bar.interval
 
-        # 将BarData数据转换为字典，并调整时区
-        data: list = []
+        # 将BarData数据转换为元组，并调整时区（不修改原始数据）
+        rows: list[tuple] = [
+            (
+                bar.symbol,
+                bar.exchange.value,
+                bar.interval.value,
+                to_db_datetime(bar.datetime),
+                *[getattr(bar, name) for name in BarBatch.float_columns]
+            )
+            for bar in bars
+        ]
 
-        for bar in bars:
-            bar.datetime = convert_tz(bar.datetime)
+        start: datetime = rows[0][3]
+        end: datetime = rows[-1][3]
 
-            d: dict = bar.__dict__
-            d["exchange"] = d["exchange"].value
-            d["interval"] = d["interval"].value
-            d.pop("gateway_name")
-            d.pop("vt_symbol")
-            d.pop("extra", None)
-            data.append(d)
+        # 写入前统计时间范围内的已有数据量，用于增量更新汇总
+        existing: int = 0
+        if not stream:
+            existing = self.count_bar_data(symbol, exchange, interval, start, end)
 
-        # 使用upsert操作将数据更新到数据库中
-        with self.db.atomic():
-            for c in chunked(data, 50):
-                DbBarData.insert_many(c).on_conflict_replace().execute()
+        self.insert_rows(DbBarData, BAR_COLUMNS, rows)
 
         # 更新K线汇总数据
-        overview: DbBarOverview = DbBarOverview.get_or_none(
-            DbBarOverview.symbol == symbol,
-            DbBarOverview.exchange == exchange.value,
-            DbBarOverview.interval == interval.value,
-        )
-
-        if not overview:
-            overview = DbBarOverview()
-            overview.symbol = symbol
-            overview.exchange = exchange.value
-            overview.interval = interval.value
-            overview.start = bars[0].datetime
-            overview.end = bars[-1].datetime
-            overview.count = len(bars)
-        elif stream:
-            overview.end = bars[-1].datetime
-            overview.count += len(bars)
-        else:
-            overview.start = min(bars[0].datetime, overview.start)
-            overview.end = max(bars[-1].datetime, overview.end)
-
-            s: ModelSelect = DbBarData.select().where(
-                (DbBarData.symbol == symbol)
-                & (DbBarData.exchange == exchange.value)
-                & (DbBarData.interval == interval.value)
-            )
-            overview.count = s.count()
-
-        overview.save()
+        self.update_bar_overview(symbol, exchange, interval, start, end, len(rows), existing, stream)
 
         return True
 
+    @use_connection
     def save_tick_data(self, ticks: list[TickData], stream: bool = False) -> bool:
         """保存TICK数据"""
         # 读取主键参数
@@ -239,93 +366,440 @@ class MysqlDatabase(BaseDatabase):
         symbol: str = tick.symbol
         exchange: Exchange = tick.exchange
 
-        # 将TickData数据转换为字典，并调整时区
-        data: list = []
+        # 将TickData数据转换为元组，并调整时区（不修改原始数据）
+        rows: list[tuple] = [
+            (
+                tick.symbol,
+                tick.exchange.value,
+                to_db_datetime(tick.datetime),
+                tick.name,
+                tick.localtime,
+                *[getattr(tick, name) for name in TickBatch.float_columns]
+            )
+            for tick in ticks
+        ]
 
-        for tick in ticks:
-            tick.datetime = convert_tz(tick.datetime)
+        start: datetime = rows[0][2]
+        end: datetime = rows[-1][2]
 
-            d: dict = tick.__dict__
-            d["exchange"] = d["exchange"].value
-            d.pop("gateway_name")
-            d.pop("vt_symbol")
-            d.pop("extra", None)
-            data.append(d)
+        # 写入前统计时间范围内的已有数据量，用于增量更新汇总
+        existing: int = 0
+        if not stream:
+            existing = self.count_tick_data(symbol, exchange, start, end)
 
-        # 使用upsert操作将数据更新到数据库中
-        with self.db.atomic():
-            for c in chunked(data, 50):
-                DbTickData.insert_many(c).on_conflict_replace().execute()
+        self.insert_rows(DbTickData, TICK_COLUMNS, rows)
 
         # 更新Tick汇总数据
+        self.update_tick_overview(symbol, exchange, start, end, len(rows), existing, stream)
+
+        return True
+
+    @use_connection
+    def save_bar_batch(self, batch: BarBatch, update_overview: bool = True) -> bool:
+        """
+        批量导入列式K线数据
+
+        大量导入时可以关闭汇总更新，全部导入完成后再调用refresh_bar_overview
+        """
+        if not len(batch):
+            return False
+
+        interval: Interval = batch.meta["interval"]
+        dts: list[datetime] = convert_batch_datetime(batch)
+
+        rows: list[tuple] = list(zip(
+            repeat(batch.symbol),
+            repeat(batch.exchange.value),
+            repeat(interval.value),
+            dts,
+            *[getattr(batch, name).tolist() for name in BarBatch.float_columns]
+        ))
+
+        existing: int = 0
+        if update_overview:
+            existing = self.count_bar_data(batch.symbol, batch.exchange, interval, dts[0], dts[-1])
+
+        self.insert_rows(DbBarData, BAR_COLUMNS, rows)
+
+        if update_overview:
+            self.update_bar_overview(batch.symbol, batch.exchange, interval, dts[0], dts[-1], len(rows), existing)
+
+        return True
+
+    @use_connection
+    def save_tick_batch(self, batch: TickBatch, update_overview: bool = True) -> bool:
+        """
+        批量导入列式TICK数据
+
+        大量导入时可以关闭汇总更新，全部导入完成后再调用refresh_tick_overview
+        """
+        if not len(batch):
+            return False
+
+        dts: list[datetime] = convert_batch_datetime(batch)
+
+        rows: list[tuple] = list(zip(
+            repeat(batch.symbol),
+            repeat(batch.exchange.value),
+            dts,
+            repeat(batch.meta.get("name", "")),
+            batch.localtime.tolist(),
+            *[getattr(batch, name).tolist() for name in TickBatch.float_columns]
+        ))
+
+        existing: int = 0
+        if update_overview:
+            existing = self.count_tick_data(batch.symbol, batch.exchange, dts[0], dts[-1])
+
+        self.insert_rows(DbTickData, TICK_COLUMNS, rows)
+
+        if update_overview:
+            self.update_tick_overview(batch.symbol, batch.exchange, dts[0], dts[-1], len(rows), existing)
+
+        return True
+
+    def insert_rows(self, model: type[Model], columns: list[str], rows: list[tuple]) -> None:
+        """使用多行INSERT语句批量写入数据，已存在的数据会被更新"""
+        table: str = model._meta.table_name
+        names: str = ", ".join(f"`{c}`" for c in columns)
+        values: str = ", ".join(["%s"] * len(columns))
+        updates: str = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in columns)
+
+        sql: str = f"INSERT INTO `{table}` ({names}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}"
+
+        # 分区表写入前确保数据所在月份的分区已存在
+        if PARTITION_MODE:
+            i: int = columns.index("datetime")
+            dts: list[datetime] = [row[i] for row in rows]
+            self.ensure_partitions(model, min(dts), max(dts))
+
+        with self.db.atomic():
+            cursor = self.db.connection().cursor()
+            for c in chunked(rows, SAVE_BATCH_SIZE):
+                cursor.executemany(sql, c)
+            cursor.close()
+
+    @use_connection
+    def init_partition(self, model: type[Model]) -> None:
+        """
+        将数据表转换为按月范围分区
+
+        MySQL要求分区字段包含在所有唯一键中，因此主键调整为(id, datetime)。
+        已有数据时会按数据的起止月份创建分区并重建整张表，需在维护时段执行。
+        """
+        table: str = model._meta.table_name
+
+        data: Model = model.select(
+            fn.MIN(model.datetime).alias("start"),
+            fn.MAX(model.datetime).alias("end")
+        ).first()
+
+        bounds: list[datetime | None] = []
+        if data and data.start:
+            month: datetime = get_month_start(data.start)
+            while month <= data.end:
+                month = get_next_month(month)
+                bounds.append(month)
+        bounds.append(None)
+
+        definitions: str = ", ".join(get_partition_definition(b) for b in bounds)
+
+        self.db.execute_sql(f"ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `datetime`)")
+        self.db.execute_sql(f"ALTER TABLE `{table}` PARTITION BY RANGE COLUMNS(`datetime`) ({definitions})")
+
+        self.partition_bounds[table] = bounds
+
+    def get_partition_bounds(self, model: type[Model], reload: bool = False) -> list[datetime | None]:
+        """查询数据表各分区的上边界，未分区的数据表返回空列表"""
+        table: str = model._meta.table_name
+
+        if reload or table not in self.partition_bounds:
+            cursor = self.db.execute_sql(
+                "SELECT PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION",
+                (table,)
+            )
+
+            bounds: list[datetime | None] = []
+            for (description,) in cursor.fetchall():
+                if description == "MAXVALUE":
+                    bounds.append(None)
+                else:
+                    bounds.append(datetime.fromisoformat(description.strip("'")))
+
+            self.partition_bounds[table] = bounds
+
+        return self.partition_bounds[table]
+
+    def ensure_partitions(self, model: type[Model], start: datetime, end: datetime) -> None:
+        """确保[start, end]范围内每个月份都有独立的分区"""
+        bounds: list[datetime | None] = self.get_partition_bounds(model)
+        if not bounds:
+            return
+
+        months: list[datetime] = []
+        month: datetime = get_month_start(start)
+        while month <= end:
+            months.append(month)
+            month = get_next_month(month)
+
+        missing: list[datetime] = [m for m in months if not has_month_partition(bounds, m)]
+        if not missing:
+            return
+
+        # 其他进程可能已经创建了分区，重新读取后再检查
+        bounds = self.get_partition_bounds(model, reload=True)
+
+        for month in missing:
+            if not has_month_partition(bounds, month):
+                self.add_month_partition(model, month)
+
+    def add_month_partition(self, model: type[Model], month: datetime) -> None:
+        """拆分月份所在的分区，为该月份创建独立分区"""
+        table: str = model._meta.table_name
+        bounds: list[datetime | None] = self.partition_bounds[table]
+
+        i: int = find_partition(bounds, month)
+        upper: datetime | None = bounds[i]
+        lower: datetime | None = bounds[i - 1] if i else None
+        next_month: datetime = get_next_month(month)
+
+        # 拆分为[lower, month)、[month, next_month)、[next_month, upper)三段
+        parts: list[datetime | None] = []
+        if lower is None or lower < month:
+            parts.append(month)
+        parts.append(next_month)
+        if upper is None or upper > next_month:
+            parts.append(upper)
+
+        definitions: str = ", ".join(get_partition_definition(b) for b in parts)
+        self.db.execute_sql(
+            f"ALTER TABLE `{table}` REORGANIZE PARTITION {get_partition_name(upper)} INTO ({definitions})"
+        )
+
+        bounds[i:i + 1] = parts
+
+    @use_connection
+    def drop_bar_partitions(self, end: datetime) -> int:
+        """删除end所在月份之前的全部K线数据，整个分区直接删除，返回删除的分区数量"""
+        count: int = self.drop_partitions(DbBarData, end)
+        if count:
+            self.check_bar_overview()
+        return count
+
+    @use_connection
+    def drop_tick_partitions(self, end: datetime) -> int:
+        """删除end所在月份之前的全部Tick数据，整个分区直接删除，返回删除的分区数量"""
+        count: int = self.drop_partitions(DbTickData, end)
+        if count:
+            self.check_tick_overview()
+        return count
+
+    def drop_partitions(self, model: type[Model], end: datetime) -> int:
+        """删除上边界不晚于end所在月份的分区"""
+        table: str = model._meta.table_name
+        bounds: list[datetime | None] = self.get_partition_bounds(model, reload=True)
+
+        if end.tzinfo:
+            end = convert_tz(end)
+        month: datetime = get_month_start(end)
+
+        dropped: list[datetime] = [b for b in bounds if b is not None and b <= month]
+        if not dropped:
+            return 0
+
+        names: str = ", ".join(get_partition_name(b) for b in dropped)
+        self.db.execute_sql(f"ALTER TABLE `{table}` DROP PARTITION {names}")
+
+        del bounds[:len(dropped)]
+        return len(dropped)
+
+    def update_bar_overview(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        count: int,
+        existing: int = 0,
+        stream: bool = False
+    ) -> None:
+        """
+        根据新写入的数据增量更新K线汇总
+
+        existing为写入前[start, end]范围内的已有数据量，只需统计该范围即可得到新增数量
+        """
+        overview: DbBarOverview = DbBarOverview.get_or_none(
+            DbBarOverview.symbol == symbol,
+            DbBarOverview.exchange == exchange.value,
+            DbBarOverview.interval == interval.value,
+        )
+
+        # 汇总缺失时只统计该合约的数据
+        if not overview:
+            self.refresh_bar_overview(symbol, exchange, interval)
+            return
+
+        if stream:
+            overview.end = end
+            overview.count += count
+        else:
+            overview.start = min(start, overview.start)
+            overview.end = max(end, overview.end)
+            overview.count += self.count_bar_data(symbol, exchange, interval, start, end) - existing
+
+        overview.save()
+
+    def update_tick_overview(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        count: int,
+        existing: int = 0,
+        stream: bool = False
+    ) -> None:
+        """
+        根据新写入的数据增量更新Tick汇总
+
+        existing为写入前[start, end]范围内的已有数据量，只需统计该范围即可得到新增数量
+        """
         overview: DbTickOverview = DbTickOverview.get_or_none(
             DbTickOverview.symbol == symbol,
             DbTickOverview.exchange == exchange.value,
         )
 
+        # 汇总缺失时只统计该合约的数据
         if not overview:
-            overview = DbTickOverview()
-            overview.symbol = symbol
-            overview.exchange = exchange.value
-            overview.start = ticks[0].datetime
-            overview.end = ticks[-1].datetime
-            overview.count = len(ticks)
-        elif stream:
-            overview.end = ticks[-1].datetime
-            overview.count += len(ticks)
-        else:
-            overview.start = min(ticks[0].datetime, overview.start)
-            overview.end = max(ticks[-1].datetime, overview.end)
+            self.refresh_tick_overview(symbol, exchange)
+            return
 
-            s: ModelSelect = DbTickData.select().where(
-                (DbTickData.symbol == symbol)
-                & (DbTickData.exchange == exchange.value)
-            )
-            overview.count = s.count()
+        if stream:
+            overview.end = end
+            overview.count += count
+        else:
+            overview.start = min(start, overview.start)
+            overview.end = max(end, overview.end)
+            overview.count += self.count_tick_data(symbol, exchange, start, end) - existing
 
         overview.save()
 
-        return True
-
-    def load_bar_data(
+    def count_bar_data(
         self,
         symbol: str,
         exchange: Exchange,
         interval: Interval,
         start: datetime,
         end: datetime
-    ) -> list[BarData]:
-        """"""
-        s: ModelSelect = (
-            DbBarData.select().where(
+    ) -> int:
+        """统计时间范围内的K线数量（走唯一索引的范围扫描）"""
+        s: ModelSelect = DbBarData.select().where(
+            (DbBarData.symbol == symbol)
+            & (DbBarData.exchange == exchange.value)
+            & (DbBarData.interval == interval.value)
+            & (DbBarData.datetime >= start)
+            & (DbBarData.datetime <= end)
+        )
+        return s.count()
+
+    def count_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> int:
+        """统计时间范围内的Tick数量（走唯一索引的范围扫描）"""
+        s: ModelSelect = DbTickData.select().where(
+            (DbTickData.symbol == symbol)
+            & (DbTickData.exchange == exchange.value)
+            & (DbTickData.datetime >= start)
+            & (DbTickData.datetime <= end)
+        )
+        return s.count()
+
+    @use_connection
+    def refresh_bar_overview(self, symbol: str, exchange: Exchange, interval: Interval) -> None:
+        """使用单条聚合查询重新计算指定合约的K线汇总"""
+        data: DbBarData | None = (
+            DbBarData.select(
+                fn.COUNT(DbBarData.id).alias("count"),
+                fn.MIN(DbBarData.datetime).alias("start"),
+                fn.MAX(DbBarData.datetime).alias("end")
+            ).where(
                 (DbBarData.symbol == symbol)
                 & (DbBarData.exchange == exchange.value)
                 & (DbBarData.interval == interval.value)
-                & (DbBarData.datetime >= start)
-                & (DbBarData.datetime <= end)
-            ).order_by(DbBarData.datetime)
+            ).first()
         )
 
+        if not data or not data.count:
+            DbBarOverview.delete().where(
+                (DbBarOverview.symbol == symbol)
+                & (DbBarOverview.exchange == exchange.value)
+                & (DbBarOverview.interval == interval.value)
+            ).execute()
+            return
+
+        DbBarOverview.insert(
+            symbol=symbol,
+            exchange=exchange.value,
+            interval=interval.value,
+            count=data.count,
+            start=data.start,
+            end=data.end
+        ).on_conflict_replace().execute()
+
+    @use_connection
+    def refresh_tick_overview(self, symbol: str, exchange: Exchange) -> None:
+        """使用单条聚合查询重新计算指定合约的Tick汇总"""
+        data: DbTickData | None = (
+            DbTickData.select(
+                fn.COUNT(DbTickData.id).alias("count"),
+                fn.MIN(DbTickData.datetime).alias("start"),
+                fn.MAX(DbTickData.datetime).alias("end")
+            ).where(
+                (DbTickData.symbol == symbol)
+                & (DbTickData.exchange == exchange.value)
+            ).first()
+        )
+
+        if not data or not data.count:
+            DbTickOverview.delete().where(
+                (DbTickOverview.symbol == symbol)
+                & (DbTickOverview.exchange == exchange.value)
+            ).execute()
+            return
+
+        DbTickOverview.insert(
+            symbol=symbol,
+            exchange=exchange.value,
+            count=data.count,
+            start=data.start,
+            end=data.end
+        ).on_conflict_replace().execute()
+
+    @use_connection
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> list[BarData]:
+        """读取K线数据"""
         bars: list[BarData] = []
-        for db_bar in s:
-            bar: BarData = BarData(
-                symbol=db_bar.symbol,
-                exchange=Exchange(db_bar.exchange),
-                datetime=datetime.fromtimestamp(db_bar.datetime.timestamp(), DB_TZ),
-                interval=Interval(db_bar.interval),
-                volume=db_bar.volume,
-                turnover=db_bar.turnover,
-                open_interest=db_bar.open_interest,
-                open_price=db_bar.open_price,
-                high_price=db_bar.high_price,
-                low_price=db_bar.low_price,
-                close_price=db_bar.close_price,
-                gateway_name="DB"
-            )
-            bars.append(bar)
+
+        for batch in self.iter_bar_batches(symbol, exchange, interval, start, end):
+            bars.extend(batch.to_bars())
 
         return bars
 
+    @use_connection
     def load_tick_data(
         self,
         symbol: str,
@@ -335,7 +809,8 @@ class MysqlDatabase(BaseDatabase):
     ) -> list[TickData]:
         """读取TICK数据"""
         s: ModelSelect = (
-            DbTickData.select().where(
+            DbTickData.select(*self.get_tick_fields(), DbTickData.name, DbTickData.localtime)
+            .where(
                 (DbTickData.symbol == symbol)
                 & (DbTickData.exchange == exchange.value)
                 & (DbTickData.datetime >= start)
@@ -343,51 +818,218 @@ class MysqlDatabase(BaseDatabase):
             ).order_by(DbTickData.datetime)
         )
 
+        columns: tuple[str, ...] = TickBatch.float_columns
         ticks: list[TickData] = []
-        for db_tick in s:
-            tick: TickData = TickData(
-                symbol=db_tick.symbol,
-                exchange=Exchange(db_tick.exchange),
-                datetime=datetime.fromtimestamp(db_tick.datetime.timestamp(), DB_TZ),
-                name=db_tick.name,
-                volume=db_tick.volume,
-                turnover=db_tick.turnover,
-                open_interest=db_tick.open_interest,
-                last_price=db_tick.last_price,
-                last_volume=db_tick.last_volume,
-                limit_up=db_tick.limit_up,
-                limit_down=db_tick.limit_down,
-                open_price=db_tick.open_price,
-                high_price=db_tick.high_price,
-                low_price=db_tick.low_price,
-                pre_close=db_tick.pre_close,
-                bid_price_1=db_tick.bid_price_1,
-                bid_price_2=db_tick.bid_price_2,
-                bid_price_3=db_tick.bid_price_3,
-                bid_price_4=db_tick.bid_price_4,
-                bid_price_5=db_tick.bid_price_5,
-                ask_price_1=db_tick.ask_price_1,
-                ask_price_2=db_tick.ask_price_2,
-                ask_price_3=db_tick.ask_price_3,
-                ask_price_4=db_tick.ask_price_4,
-                ask_price_5=db_tick.ask_price_5,
-                bid_volume_1=db_tick.bid_volume_1,
-                bid_volume_2=db_tick.bid_volume_2,
-                bid_volume_3=db_tick.bid_volume_3,
-                bid_volume_4=db_tick.bid_volume_4,
-                bid_volume_5=db_tick.bid_volume_5,
-                ask_volume_1=db_tick.ask_volume_1,
-                ask_volume_2=db_tick.ask_volume_2,
-                ask_volume_3=db_tick.ask_volume_3,
-                ask_volume_4=db_tick.ask_volume_4,
-                ask_volume_5=db_tick.ask_volume_5,
-                localtime=db_tick.localtime,
-                gateway_name="DB"
-            )
-            ticks.append(tick)
+
+        for rows in self.iter_rows(s, STREAM_BATCH_SIZE):
+            for dt, *values, name, localtime in rows:
+                tick: TickData = TickData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    datetime=dt.replace(tzinfo=DB_TZ),
+                    name=name,
+                    localtime=localtime,
+                    gateway_name="DB",
+                    **{k: v or 0 for k, v in zip(columns, values)}
+                )
+                ticks.append(tick)
 
         return ticks
 
+    @use_connection
+    def load_bar_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarBatch:
+        """读取K线数据，返回列式数据"""
+        batches: list[BarBatch] = list(self.iter_bar_batches(symbol, exchange, interval, start, end))
+        return concat_batches(batches, BarBatch, symbol, exchange, interval=interval)
+
+    @use_connection
+    def load_tick_batch(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> TickBatch:
+        """读取TICK数据，返回列式数据"""
+        batches: list[TickBatch] = list(self.iter_tick_batches(symbol, exchange, start, end))
+        return concat_batches(batches, TickBatch, symbol, exchange)
+
+    @use_connection
+    def load_bar_data_multi(
+        self,
+        vt_symbols: list[str],
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> dict[str, BarBatch]:
+        """使用单次查询读取多个合约的K线数据，返回以vt_symbol为键的列式数据"""
+        if not vt_symbols:
+            return {}
+
+        keys: list[tuple[str, Exchange]] = [extract_vt_symbol(vt_symbol) for vt_symbol in vt_symbols]
+        fields: list = [getattr(DbBarData, name) for name in BarBatch.float_columns]
+
+        s: ModelSelect = (
+            DbBarData.select(DbBarData.symbol, DbBarData.exchange, DbBarData.datetime, *fields)
+            .where(
+                (Tuple(DbBarData.symbol, DbBarData.exchange).in_([(sym, ex.value) for sym, ex in keys]))
+                & (DbBarData.interval == interval.value)
+                & (DbBarData.datetime >= start)
+                & (DbBarData.datetime <= end)
+            ).order_by(DbBarData.symbol, DbBarData.exchange, DbBarData.datetime)
+        )
+
+        # 数据库排序规则可能不区分大小写，返回的合约代码按统一小写后映射回请求的合约
+        requested: dict[tuple[str, str], tuple[str, Exchange]] = {
+            (symbol.lower(), exchange.value.lower()): (symbol, exchange) for symbol, exchange in keys
+        }
+        parts: dict[tuple[str, str], list[BarBatch]] = {key: [] for key in requested}
+
+        # 按合约排序后流式读取，每批数据中按合约拆分
+        for rows in self.iter_rows(s, STREAM_BATCH_SIZE):
+            for (symbol, exchange), group in groupby(rows, key=itemgetter(0, 1)):
+                key: tuple[str, str] = (symbol.lower(), exchange.lower())
+                if key not in parts:
+                    continue
+
+                _, _, dts, *values = zip(*group)
+
+                batch: BarBatch = BarBatch(
+                    *requested[key],
+                    np.array(dts, dtype="datetime64[us]"),
+                    "DB",
+                    DB_TZ,
+                    interval=interval,
+                    **dict(zip(BarBatch.float_columns, values))
+                )
+                parts[key].append(batch)
+
+        batches: dict[str, BarBatch] = {}
+        for (symbol, exchange), vt_symbol in zip(keys, vt_symbols):
+            batches[vt_symbol] = concat_batches(
+                parts[(symbol.lower(), exchange.value.lower())],
+                BarBatch,
+                symbol,
+                exchange,
+                interval=interval
+            )
+
+        return batches
+
+    @use_connection
+    def iter_bar_batches(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[BarBatch]:
+        """
+        流式读取K线数据，每次返回最多batch_size条数据的列式数据
+
+        迭代结束前当前连接无法执行其他查询
+        """
+        fields: list = [getattr(DbBarData, name) for name in BarBatch.float_columns]
+
+        s: ModelSelect = (
+            DbBarData.select(DbBarData.datetime, *fields)
+            .where(
+                (DbBarData.symbol == symbol)
+                & (DbBarData.exchange == exchange.value)
+                & (DbBarData.interval == interval.value)
+                & (DbBarData.datetime >= start)
+                & (DbBarData.datetime <= end)
+            ).order_by(DbBarData.datetime)
+        )
+
+        for rows in self.iter_rows(s, batch_size):
+            dts, *values = zip(*rows)
+
+            yield BarBatch(
+                symbol,
+                exchange,
+                np.array(dts, dtype="datetime64[us]"),
+                "DB",
+                DB_TZ,
+                interval=interval,
+                **dict(zip(BarBatch.float_columns, values))
+            )
+
+    @use_connection
+    def iter_tick_batches(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[TickBatch]:
+        """
+        流式读取TICK数据，每次返回最多batch_size条数据的列式数据
+
+        迭代结束前当前连接无法执行其他查询
+        """
+        s: ModelSelect = (
+            DbTickData.select(*self.get_tick_fields(), DbTickData.name, DbTickData.localtime)
+            .where(
+                (DbTickData.symbol == symbol)
+                & (DbTickData.exchange == exchange.value)
+                & (DbTickData.datetime >= start)
+                & (DbTickData.datetime <= end)
+            ).order_by(DbTickData.datetime)
+        )
+
+        for rows in self.iter_rows(s, batch_size):
+            dts, *values, names, localtimes = zip(*rows)
+
+            # 空值字段转换为0
+            columns: dict[str, np.ndarray] = {}
+            for name, value in zip(TickBatch.float_columns, values):
+                array: np.ndarray = np.array(value, dtype=np.float64)
+                array[np.isnan(array)] = 0
+                columns[name] = array
+
+            yield TickBatch(
+                symbol,
+                exchange,
+                np.array(dts, dtype="datetime64[us]"),
+                "DB",
+                DB_TZ,
+                name=names[0],
+                localtime=np.array(localtimes, dtype="datetime64[us]"),
+                **columns
+            )
+
+    def iter_rows(self, query: ModelSelect, batch_size: int) -> Iterator[list[tuple]]:
+        """使用服务端游标流式读取查询结果，每次返回最多batch_size行元组"""
+        sql, params = query.sql()
+
+        cursor: SSCursor = self.db.connection().cursor(SSCursor)
+        try:
+            cursor.execute(sql, params)
+
+            while True:
+                rows: list[tuple] = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def get_tick_fields(self) -> list:
+        """获取TICK数据的时间和数值字段"""
+        return [DbTickData.datetime] + [getattr(DbTickData, name) for name in TickBatch.float_columns]
+
+    @use_connection
     def delete_bar_data(
         self,
         symbol: str,
@@ -395,50 +1037,50 @@ class MysqlDatabase(BaseDatabase):
         interval: Interval
     ) -> int:
         """删除K线数据"""
-        d: ModelDelete = DbBarData.delete().where(
-            (DbBarData.symbol == symbol)
-            & (DbBarData.exchange == exchange.value)
-            & (DbBarData.interval == interval.value)
-        )
-        count: int = d.execute()
+        with self.db.atomic():
+            d: ModelDelete = DbBarData.delete().where(
+                (DbBarData.symbol == symbol)
+                & (DbBarData.exchange == exchange.value)
+                & (DbBarData.interval == interval.value)
+            )
+            count: int = d.execute()
 
-        # 删除K线汇总数据
-        d2: ModelDelete = DbBarOverview.delete().where(
-            (DbBarOverview.symbol == symbol)
-            & (DbBarOverview.exchange == exchange.value)
-            & (DbBarOverview.interval == interval.value)
-        )
-        d2.execute()
+            # 删除K线汇总数据
+            d2: ModelDelete = DbBarOverview.delete().where(
+                (DbBarOverview.symbol == symbol)
+                & (DbBarOverview.exchange == exchange.value)
+                & (DbBarOverview.interval == interval.value)
+            )
+            d2.execute()
         return count
 
+    @use_connection
     def delete_tick_data(
         self,
         symbol: str,
         exchange: Exchange
     ) -> int:
         """删除TICK数据"""
-        d: ModelDelete = DbTickData.delete().where(
-            (DbTickData.symbol == symbol)
-            & (DbTickData.exchange == exchange.value)
-        )
-
-        count: int = d.execute()
+        with self.db.atomic():
+            d: ModelDelete = DbTickData.delete().where(
+                (DbTickData.symbol == symbol)
+                & (DbTickData.exchange == exchange.value)
+            )
+            count: int = d.execute()
 
-        # 删除Tick汇总数据
-        d2: ModelDelete = DbTickOverview.delete().where(
-            (DbTickOverview.symbol == symbol)
-            & (DbTickOverview.exchange == exchange.value)
-        )
-        d2.execute()
+            # 删除Tick汇总数据
+            d2: ModelDelete = DbTickOverview.delete().where(
+                (DbTickOverview.symbol == symbol)
+                & (DbTickOverview.exchange == exchange.value)
+            )
+            d2.execute()
         return count
 
+    @use_connection
     def get_bar_overview(self) -> list[BarOverview]:
         """查询数据库中的K线汇总信息"""
-        # 如果已有K线，但缺失汇总信息，则执行初始化
-        data_count: int = DbBarData.select().count()
-        overview_count: int = DbBarOverview.select().count()
-        if data_count and not overview_count:
-            self.init_bar_overview()
+        # 按各合约的时间水位检查汇总信息，仅重新统计不一致的合约
+        self.check_bar_overview()
 
         s: ModelSelect = DbBarOverview.select()
         overviews: list[BarOverview] = []
@@ -448,8 +1090,11 @@ class MysqlDatabase(BaseDatabase):
             overviews.append(overview)
         return overviews
 
+    @use_connection
     def get_tick_overview(self) -> list[TickOverview]:
         """查询数据库中的Tick汇总信息"""
+        self.check_tick_overview()
+
         s: ModelSelect = DbTickOverview.select()
         overviews: list = []
         for overview in s:
@@ -457,14 +1102,21 @@ class MysqlDatabase(BaseDatabase):
             overviews.append(overview)
         return overviews
 
-    def init_bar_overview(self) -> None:
-        """初始化数据库中的K线汇总信息"""
+    @use_connection
+    def check_bar_overview(self) -> None:
+        """
+        检查K线汇总信息与数据是否一致
+
+        对唯一索引按合约分组查询起止时间，MySQL可使用松散索引扫描，
+        无需遍历全表。起止时间水位不一致或缺失汇总的合约才重新统计数量。
+        """
         s: ModelSelect = (
             DbBarData.select(
                 DbBarData.symbol,
                 DbBarData.exchange,
                 DbBarData.interval,
-                fn.COUNT(DbBarData.id).alias("count")
+                fn.MIN(DbBarData.datetime).alias("start"),
+                fn.MAX(DbBarData.datetime).alias("end")
             ).group_by(
                 DbBarData.symbol,
                 DbBarData.exchange,
@@ -472,35 +1124,176 @@ class MysqlDatabase(BaseDatabase):
             )
         )
 
+        overviews: dict[tuple, DbBarOverview] = {
+            (o.symbol, o.exchange, o.interval): o for o in DbBarOverview.select()
+        }
+
         for data in s:
-            overview: DbBarOverview = DbBarOverview()
-            overview.symbol = data.symbol
-            overview.exchange = data.exchange
-            overview.interval = data.interval
-            overview.count = data.count
-
-            start_bar: DbBarData = (
-                DbBarData.select()
-                .where(
-                    (DbBarData.symbol == data.symbol)
-                    & (DbBarData.exchange == data.exchange)
-                    & (DbBarData.interval == data.interval)
-                )
-                .order_by(Asc(DbBarData.datetime))
-                .first()
-            )
-            overview.start = start_bar.datetime
-
-            end_bar: DbBarData = (
-                DbBarData.select()
-                .where(
-                    (DbBarData.symbol == data.symbol)
-                    & (DbBarData.exchange == data.exchange)
-                    & (DbBarData.interval == data.interval)
-                )
-                .order_by(Desc(DbBarData.datetime))
-                .first()
+            key: tuple = (data.symbol, data.exchange, data.interval)
+            overview: DbBarOverview | None = overviews.pop(key, None)
+
+            if overview and match_watermark(overview, data):
+                continue
+
+            self.refresh_bar_overview(data.symbol, Exchange(data.exchange), Interval(data.interval))
+
+        # 删除已无对应数据的汇总
+        for overview in overviews.values():
+            overview.delete_instance()
+
+    @use_connection
+    def check_tick_overview(self) -> None:
+        """检查Tick汇总信息与数据是否一致，逻辑同check_bar_overview"""
+        s: ModelSelect = (
+            DbTickData.select(
+                DbTickData.symbol,
+                DbTickData.exchange,
+                fn.MIN(DbTickData.datetime).alias("start"),
+                fn.MAX(DbTickData.datetime).alias("end")
+            ).group_by(
+                DbTickData.symbol,
+                DbTickData.exchange
             )
-            overview.end = end_bar.datetime
+        )
+
+        overviews: dict[tuple, DbTickOverview] = {
+            (o.symbol, o.exchange): o for o in DbTickOverview.select()
+        }
+
+        for data in s:
+            key: tuple = (data.symbol, data.exchange)
+            overview: DbTickOverview | None = overviews.pop(key, None)
+
+            if overview and match_watermark(overview, data):
+                continue
+
+            self.refresh_tick_overview(data.symbol, Exchange(data.exchange))
+
+        for overview in overviews.values():
+            overview.delete_instance()
+
+    @use_connection
+    def init_bar_overview(self) -> None:
+        """初始化数据库中的K线汇总信息"""
+        s: ModelSelect = (
+            DbBarData.select(
+                DbBarData.symbol,
+                DbBarData.exchange,
+                DbBarData.interval,
+                fn.COUNT(DbBarData.id).alias("count"),
+                fn.MIN(DbBarData.datetime).alias("start"),
+                fn.MAX(DbBarData.datetime).alias("end")
+            ).group_by(
+                DbBarData.symbol,
+                DbBarData.exchange,
+                DbBarData.interval
+            ).dicts()
+        )
+
+        # 单次分组查询同时得到数量和起止时间
+        with self.db.atomic():
+            for rows in chunked(s, 1000):
+                DbBarOverview.insert_many(rows).on_conflict_replace().execute()
 
-            overview.save()
+
+def concat_batches(
+    batches: list,
+    batch_class: type,
+    symbol: str,
+    exchange: Exchange,
+    **meta
+) -> BarBatch | TickBatch:
+    """合并多个列式数据"""
+    if not batches:
+        return batch_class(symbol, exchange, np.array([], dtype="datetime64[us]"), "DB", DB_TZ, **meta)
+
+    if len(batches) == 1:
+        return batches[0]
+
+    columns: dict[str, np.ndarray] = {
+        name: np.concatenate([getattr(b, name) for b in batches])
+        for name in batch_class.float_columns + batch_class.datetime_columns
+    }
+
+    return batch_class(
+        symbol,
+        exchange,
+        np.concatenate([b.datetime for b in batches]),
+        "DB",
+        DB_TZ,
+        **batches[0].meta,
+        **columns
+    )
+
+
+def to_db_datetime(dt: datetime) -> datetime:
+    """转换为数据库时区的无时区时间，已是数据库时区时直接去掉时区信息"""
+    if dt.tzinfo is DB_TZ:
+        return dt.replace(tzinfo=None)
+    return convert_tz(dt)
+
+
+def convert_batch_datetime(batch: BarBatch | TickBatch) -> list[datetime]:
+    """将列式数据的时间转换为数据库时区的无时区时间"""
+    dts: np.ndarray = batch.datetime.astype("datetime64[us]")
+
+    # 无时区或与数据库时区相同时无需转换
+    if batch.tzinfo is None or batch.tzinfo == DB_TZ:
+        return dts.tolist()
+
+    # 整列加减时区偏移，先转为UTC时间，再转为数据库时区时间
+    utc_dts: np.ndarray = dts - get_utc_offsets(dts, batch.tzinfo, True)
+    db_dts: np.ndarray = utc_dts + get_utc_offsets(utc_dts, DB_TZ, False)
+    return db_dts.tolist()
+
+
+def match_watermark(overview: Model, data: Model) -> bool:
+    """比较汇总与数据的起止时间，汇总表时间字段不含毫秒，允许1秒内的误差"""
+    tolerance: timedelta = timedelta(seconds=1)
+    return (
+        abs(overview.start - data.start) < tolerance
+        and abs(overview.end - data.end) < tolerance
+    )
+
+
+def get_month_start(dt: datetime) -> datetime:
+    """获取时间所在月份的第一天"""
+    return datetime(dt.year, dt.month, 1)
+
+
+def get_next_month(month: datetime) -> datetime:
+    """获取下个月份的第一天"""
+    if month.month == 12:
+        return datetime(month.year + 1, 1, 1)
+    return datetime(month.year, month.month + 1, 1)
+
+
+def get_partition_name(bound: datetime | None) -> str:
+    """分区以其包含的最后一个月份命名，例如上边界为2024-02-01的分区名为p202401"""
+    if bound is None:
+        return "pmax"
+    return "p" + (bound - timedelta(days=1)).strftime("%Y%m")
+
+
+def get_partition_definition(bound: datetime | None) -> str:
+    """生成分区定义语句"""
+    if bound is None:
+        value: str = "MAXVALUE"
+    else:
+        value = f"'{bound:%Y-%m-%d %H:%M:%S}'"
+    return f"PARTITION {get_partition_name(bound)} VALUES LESS THAN ({value})"
+
+
+def find_partition(bounds: list[datetime | None], dt: datetime) -> int:
+    """查找时间所在分区的位置"""
+    for i, bound in enumerate(bounds):
+        if bound is None or dt < bound:
+            return i
+    return len(bounds) - 1
+
+
+def has_month_partition(bounds: list[datetime | None], month: datetime) -> bool:
+    """检查月份是否已有独立分区"""
+    i: int = find_partition(bounds, month)
+    lower: datetime | None = bounds[i - 1] if i else None
+    return lower == month and bounds[i] == get_next_month(month)